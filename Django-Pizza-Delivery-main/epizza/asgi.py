@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "epizza.settings")
 
 application = get_asgi_application()
+
+# load the catalog and templates before serving the first requests
+from epizza.warmup import warm_up_on_start  # noqa: E402
+
+warm_up_on_start()
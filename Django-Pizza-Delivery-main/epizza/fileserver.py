@@ -0,0 +1,273 @@
+"""
+Serving of static and media files.
+
+Replaces the static() urlpatterns, which only work in DEBUG and read
+whole files through Python:
+
+- file contents are not copied through Python: FileResponse hands the
+  open file to the WSGI server's wsgi.file_wrapper (gunicorn uses
+  sendfile()), or with settings.FILESERVER_OFFLOAD the web server sends
+  it after an X-Accel-Redirect (nginx) or X-Sendfile (Apache) header
+- ETag and Last-Modified headers, If-None-Match/If-Modified-Since give
+  304 Not Modified
+- single byte ranges (Range, If-Range) give 206 Partial Content
+- os.stat() results are cached for a few seconds
+- static files are served from the precompressed .br or .gz sibling
+  written by epizza.storage.CompressedManifestStaticFilesStorage when the
+  client accepts that encoding. Files with a content hash in their name
+  are cached by browsers for a year without revalidation, other files
+  are revalidated.
+"""
+
+import mimetypes
+import os
+import posixpath
+import re
+import stat
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.encoding import escape_uri_path
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+
+# extension, Content-Encoding value, in order of preference
+ENCODINGS = ((".br", "br"), (".gz", "gzip"))
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "public, max-age=0, must-revalidate"
+
+STAT_CACHE_SECONDS = 10
+STAT_CACHE_SIZE = 4096
+
+RANGE_RE = re.compile(r"^\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*$")
+
+FileInfo = namedtuple("FileInfo", ["path", "size", "mtime", "etag"])
+
+_hashed_names = None
+# path -> (expiry time, FileInfo or None for missing files)
+_stat_cache = {}
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+class FileRange:
+    """
+    Read at most 'length' bytes of a file from 'start'. fileno() lets
+    sendfile() send the range: it starts at the current file offset and
+    stops at Content-Length.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def hashed_names():
+    """Names of collected files that carry a content hash"""
+    global _hashed_names
+    if _hashed_names is None:
+        _hashed_names = frozenset(
+            getattr(staticfiles_storage, "hashed_files", {}).values()
+        )
+    return _hashed_names
+
+
+def stat_file(path):
+    """FileInfo of a regular file or None, cached for STAT_CACHE_SECONDS"""
+    now = time.monotonic()
+    cached = _stat_cache.get(path)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+    try:
+        result = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        info = None
+    else:
+        if stat.S_ISREG(result.st_mode):
+            etag = quote_etag(f"{result.st_mtime_ns:x}-{result.st_size:x}")
+            info = FileInfo(path, result.st_size, int(result.st_mtime), etag)
+        else:
+            info = None
+    if len(_stat_cache) >= STAT_CACHE_SIZE:
+        _stat_cache.clear()
+    _stat_cache[path] = (now + STAT_CACHE_SECONDS, info)
+    return info
+
+
+def accepted_encodings(request):
+    header = request.headers.get("Accept-Encoding", "")
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        # "gzip;q=0" means the client refuses gzip
+        if not re.match(r"\s*q\s*=\s*0(\.0*)?\s*$", params):
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def find_file(root, path, request, compressed=True):
+    """
+    Return (FileInfo, content encoding or None, whether precompressed
+    copies exist) for a request
+    """
+    try:
+        fullpath = safe_join(root, path)
+    except SuspiciousFileOperation:
+        raise Http404("Invalid path")
+    info = stat_file(fullpath)
+    if info is None:
+        raise Http404(f"'{path}' does not exist")
+    if not compressed:
+        return info, None, False
+
+    accepted = accepted_encodings(request)
+    has_copies = False
+    for extension, encoding in ENCODINGS:
+        copy = stat_file(fullpath + extension)
+        if copy is not None:
+            if encoding in accepted:
+                return copy, encoding, True
+            has_copies = True
+    return info, None, has_copies
+
+
+def byte_range(request, info):
+    """
+    (start, end) of the single byte range requested, end included, or
+    None for the whole file. Several ranges are answered with the whole
+    file too, which HTTP allows.
+    """
+    match = RANGE_RE.match(request.headers.get("Range", ""))
+    if not match or not any(match.groups()):
+        return None
+    # If-Range: only send a part of the same version of the file
+    if_range = request.headers.get("If-Range")
+    if if_range and if_range not in (info.etag, http_date(info.mtime)):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), info.size - 1) if last else info.size - 1
+        if end < start and last:
+            # invalid range, ignore it
+            return None
+    else:
+        # "bytes=-500" asks for the last 500 bytes
+        if int(last) == 0:
+            raise RangeNotSatisfiable
+        start, end = max(info.size - int(last), 0), info.size - 1
+    if start >= info.size:
+        raise RangeNotSatisfiable
+    return start, end
+
+
+def _set_headers(response, info, encoding, vary, cache_control):
+    response.headers["ETag"] = info.etag
+    response.headers["Last-Modified"] = http_date(info.mtime)
+    response.headers["Cache-Control"] = cache_control
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    if vary:
+        # caches must keep the compressed and plain responses apart
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+
+def offload_response(request, info, encoding, content_type):
+    """Empty response telling the web server which file to send"""
+    response = HttpResponse(content_type=content_type)
+    if settings.FILESERVER_OFFLOAD == "x-accel-redirect":
+        extension = {name: ext for ext, name in ENCODINGS}.get(encoding, "")
+        path = escape_uri_path(request.path)
+        location = settings.FILESERVER_ACCEL_PREFIX.rstrip("/") + path
+        response.headers["X-Accel-Redirect"] = location + extension
+    else:
+        response.headers["X-Sendfile"] = info.path
+    return response
+
+
+def serve(request, root, path, cache_control=REVALIDATE, compressed=True):
+    """Serve a file below root"""
+    path = posixpath.normpath(path).lstrip("/")
+    info, encoding, vary = find_file(root, path, request, compressed)
+    headers = (info, encoding, vary, cache_control)
+
+    not_modified = get_conditional_response(
+        request, etag=info.etag, last_modified=info.mtime
+    )
+    if not_modified is not None:
+        _set_headers(not_modified, *headers)
+        return not_modified
+
+    content_type, _ = mimetypes.guess_type(path)
+    content_type = content_type or "application/octet-stream"
+    if settings.FILESERVER_OFFLOAD:
+        # the web server handles ranges of offloaded files itself
+        response = offload_response(request, info, encoding, content_type)
+        _set_headers(response, *headers)
+        return response
+
+    try:
+        requested = byte_range(request, info)
+    except RangeNotSatisfiable:
+        response = HttpResponse(status=416)
+        response.headers["Content-Range"] = f"bytes */{info.size}"
+        _set_headers(response, *headers)
+        return response
+
+    try:
+        file = open(info.path, "rb")
+    except OSError:
+        # removed since its stat result was cached
+        _stat_cache.pop(info.path, None)
+        raise Http404(f"'{path}' does not exist")
+    if requested is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        start, end = requested
+        length = end - start + 1
+        response = FileResponse(
+            FileRange(file, start, length), content_type=content_type
+        )
+        response.status_code = 206
+        response.headers["Content-Length"] = str(length)
+        response.headers["Content-Range"] = f"bytes {start}-{end}/{info.size}"
+    response.headers["Accept-Ranges"] = "bytes"
+    _set_headers(response, *headers)
+    return response
+
+
+@require_safe
+def serve_static(request, path):
+    """Serve a file from STATIC_ROOT"""
+    name = posixpath.normpath(path).lstrip("/")
+    cache_control = IMMUTABLE if name in hashed_names() else REVALIDATE
+    return serve(request, settings.STATIC_ROOT, name, cache_control)
+
+
+@require_safe
+def serve_media(request, path):
+    """Serve an uploaded file from MEDIA_ROOT"""
+    return serve(request, settings.MEDIA_ROOT, path, compressed=False)
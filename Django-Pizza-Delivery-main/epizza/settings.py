@@ -78,7 +78,7 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
-                "store.context_processors.get_cart_quantity",
+                "store.context_processors.get_menu_categories",
             ],
         },
     },
@@ -94,6 +94,8 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # seconds a request thread's connection is reused by its next requests
+        "CONN_MAX_AGE": env.int("CONN_MAX_AGE", default=0),
     }
 }
 
@@ -145,10 +147,57 @@ MEDIA_URL = "/media/"
 # Path to store media
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Threads creating resized product image renditions after an upload
+STORE_IMAGE_WORKERS = 2
+
 # Make static files like tailwind css work
 STATIC_URL = "static/"
 STATIC_ROOT = os.path.join(BASE_DIR, "static")
 
+if not DEBUG:
+    # content-hashed names with gzip/brotli copies, built by collectstatic
+    STATICFILES_STORAGE = "epizza.storage.CompressedManifestStaticFilesStorage"
+
+# Static and media files are served by epizza.fileserver. Sending them can
+# be offloaded to the web server: "x-accel-redirect" (nginx) redirects to
+# the request path below FILESERVER_ACCEL_PREFIX, an internal location,
+# "x-sendfile" (Apache, lighttpd) sends the file path
+FILESERVER_OFFLOAD = env("FILESERVER_OFFLOAD", default=None)
+FILESERVER_ACCEL_PREFIX = "/internal"
+
+# Pagination of the products page: "page" numbers with a total count,
+# or "cursor" links without a count, which stay fast on large catalogs
+STORE_PAGINATION = "page"
+
+# Stream the products page, its <head> is sent before the product cards
+# are rendered (see store/streaming.py). Streamed pages are not stored
+# by the guests' page cache. It follows Django 4.1's template internals,
+# other Django versions render the page at once
+STORE_STREAMING_RENDER = env.bool("STORE_STREAMING_RENDER", default=False)
+
+# Seconds guests' product and category pages are kept in the cache,
+# 0 turns the full-page cache off
+STORE_GUEST_PAGE_CACHE = env.int("STORE_GUEST_PAGE_CACHE", default=0)
+
+# The catalog version (see store/catalog.py), the guests' page cache and
+# cached carts are read by every worker process. The default local-memory
+# cache is per process, which only suits a single worker (runserver,
+# tests). With several workers set CACHE_URL to a shared cache, e.g.
+# pymemcache://127.0.0.1:11211
+CACHES = {"default": env.cache_url("CACHE_URL", default="locmemcache://")}
+
+# Where open carts are kept: "db" as orders, or "cache" to keep guests'
+# carts in the cache until checkout (see order/cart.py). Cached carts
+# expire after CART_CACHE_TIMEOUT seconds without changes. They are locked
+# with cache.add(), so "cache" needs Redis, Memcached or, with a single
+# worker, the local-memory cache: the file and database caches are refused
+CART_STORE = env("CART_STORE", default="db")
+CART_CACHE_TIMEOUT = env.int("CART_CACHE_TIMEOUT", default=14 * 24 * 60 * 60)
+
+# Check the databases and warm the catalog and templates up when a WSGI
+# or ASGI worker starts, see epizza/warmup.py and /health/ready/
+WARM_UP_ON_START = env.bool("WARM_UP_ON_START", default=True)
+
 LOGIN_REDIRECT_URL = "store:products"
 
 AUTH_USER_MODEL = "users.User"
@@ -0,0 +1,87 @@
+"""
+Static files storage for production builds.
+
+collectstatic stores every file under a name with a hash of its content
+(styles.css -> styles.1a2b3c4d5e6f.css), rewrites url() and @import
+references in CSS and records the names in staticfiles.json, which the
+{% static %} tag uses to render the hashed names in templates. Compressible
+files also get gzip (.gz) and brotli (.br) siblings, so they are
+compressed once at build time instead of on every request. Hashed names
+never change their content and are served as immutable, see
+epizza/fileserver.py.
+"""
+
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    # brotli is optional, only gzip files are written without it
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = (
+    ".css",
+    ".js",
+    ".json",
+    ".map",
+    ".svg",
+    ".txt",
+    ".html",
+    ".xml",
+    ".ico",
+    ".ttf",
+    ".otf",
+    ".eot",
+)
+
+# smaller files fit in a single packet anyway
+MIN_COMPRESS_SIZE = 256
+
+
+def compress(content):
+    """Return {extension: compressed content} of the encodings available"""
+    encodings = {".gz": gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        encodings[".br"] = brotli.compress(content, quality=11)
+    return encodings
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Manifest storage that also writes precompressed copies of the files"""
+
+    def post_process(self, paths, dry_run=False, **options):
+        processed_files = []
+        for name, hashed_name, processed in super().post_process(
+            paths, dry_run, **options
+        ):
+            if hashed_name and not isinstance(processed, Exception):
+                processed_files.append(name)
+                processed_files.append(hashed_name)
+            yield name, hashed_name, processed
+
+        if dry_run:
+            return
+        for name in dict.fromkeys(processed_files):
+            if name.lower().endswith(COMPRESSIBLE_EXTENSIONS):
+                for compressed_name in self.compress_file(name):
+                    yield name, compressed_name, True
+
+    def compress_file(self, name):
+        """Write the compressed siblings of a file that are worth keeping"""
+        with self.open(name) as file:
+            content = file.read()
+        if len(content) < MIN_COMPRESS_SIZE:
+            return []
+        written = []
+        for extension, compressed in compress(content).items():
+            if len(compressed) >= len(content):
+                continue
+            compressed_name = name + extension
+            if self.exists(compressed_name):
+                self.delete(compressed_name)
+            self._save(compressed_name, ContentFile(compressed))
+            written.append(compressed_name)
+        return written
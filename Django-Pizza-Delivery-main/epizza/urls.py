@@ -13,18 +13,28 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+
+import re
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
-from django.conf.urls.static import static
+from . import fileserver, warmup
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("health/ready/", warmup.readiness, name="readiness"),
     path("", include("store.urls")),
     path("", include("users.urls")),
     path("", include("order.urls")),
 ]
 
-# need to add to load images
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
+
+def file_urlpattern(prefix, view):
+    return re_path(r"^%s(?P<path>.*)$" % re.escape(prefix.lstrip("/")), view)
+
+
+# product images and static files, with ETags, ranges and sendfile
+urlpatterns += [
+    file_urlpattern(settings.MEDIA_URL, fileserver.serve_media),
+    file_urlpattern(settings.STATIC_URL, fileserver.serve_static),
+]
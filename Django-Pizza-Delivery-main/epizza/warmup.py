@@ -0,0 +1,127 @@
+"""
+Worker warm-up.
+
+A new worker would otherwise build the catalog snapshot and compile the
+templates while serving the first menu requests. warm_up() does it up
+front, after checking the databases are reachable, and is called by the
+WSGI and ASGI entry points before the worker accepts requests (see
+settings.WARM_UP_ON_START). The /health/ready/ endpoint answers 503 until
+a warm-up succeeded, so a load balancer can send traffic to the worker
+only once it is warm. Database connections are per thread, so request
+threads still open their own (kept for CONN_MAX_AGE seconds).
+"""
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.http import JsonResponse
+from django.template.loader import get_template
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_safe
+
+from store.catalog import get_catalog
+
+# templates of the menu, cart and checkout pages
+HOT_TEMPLATES = (
+    "store/base.html",
+    "store/products.html",
+    "store/product_card.html",
+    "order/cart.html",
+    "order/checkout.html",
+)
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+# result of the last warm-up, see warm_up()
+status = {"ready": False, "seconds": None, "steps": {}}
+
+
+def check_databases():
+    """
+    Connect to every database, so a misconfigured or unreachable database
+    leaves the worker not ready. The connections belong to the warm-up
+    thread and are closed with it.
+    """
+    for connection in connections.all():
+        connection.ensure_connection()
+
+
+def load_catalog():
+    """Build the catalog snapshot and the indexes derived from it"""
+    catalog = get_catalog()
+    catalog.autocomplete
+    catalog.facets
+    catalog.products_by_popularity
+    catalog.menu_json
+
+
+def compile_templates():
+    """Load the hot templates into the cached template loader"""
+    for name in HOT_TEMPLATES:
+        get_template(name)
+
+
+STEPS = (
+    ("database", check_databases),
+    ("catalog", load_catalog),
+    ("templates", compile_templates),
+)
+
+
+def warm_up():
+    """
+    Run the warm-up steps and record how long each took in 'status'.
+    Failures are logged and leave the worker not ready, it is retried
+    by the readiness endpoint.
+    """
+    with _lock:
+        steps = {}
+        started = time.perf_counter()
+        try:
+            for name, step in STEPS:
+                step_started = time.perf_counter()
+                step()
+                steps[name] = round(time.perf_counter() - step_started, 4)
+        except Exception:
+            logger.exception("Warm-up failed")
+            status.update(ready=False, seconds=None, steps=steps)
+            return status
+        seconds = round(time.perf_counter() - started, 4)
+        status.update(ready=True, seconds=seconds, steps=steps)
+        logger.info("Warm-up took %.3fs %s", seconds, steps)
+        return status
+
+
+def _warm_up_in_thread():
+    try:
+        warm_up()
+    finally:
+        connections.close_all()
+
+
+def warm_up_on_start():
+    """
+    Called by the WSGI and ASGI applications once they are loaded. The
+    warm-up runs in a thread of its own and waits for it: ASGI servers
+    import the application while their event loop is running, where
+    database access raises SynchronousOnlyOperation. Its connections are
+    closed afterwards, request threads never reuse them and workers forked
+    after the import (gunicorn --preload) would share them.
+    """
+    if settings.WARM_UP_ON_START:
+        thread = threading.Thread(target=_warm_up_in_thread, name="warm-up")
+        thread.start()
+        thread.join()
+
+
+@never_cache
+@require_safe
+def readiness(request):
+    """200 once the worker is warm, 503 before"""
+    if not status["ready"]:
+        warm_up()
+    return JsonResponse(status, status=200 if status["ready"] else 503)
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "epizza.settings")
 
 application = get_wsgi_application()
+
+# load the catalog and templates before serving the first requests
+from epizza.warmup import warm_up_on_start  # noqa: E402
+
+warm_up_on_start()
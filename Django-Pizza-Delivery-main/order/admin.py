@@ -56,11 +56,18 @@ class OrderAdmin(admin.ModelAdmin):
     #     return False
     inlines = [OrderItemInline]
 
+    def get_queryset(self, request):
+        # items, subtotal, coupon and total columns are computed in SQL
+        return super().get_queryset(request).with_totals()
+
 
 class OrderItemAdmin(admin.ModelAdmin):
     list_display = ("product", "quantity", "get_variation", "get_total", "date_added")
     readonly_fields = ("image_tag",)
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_product_info()
+
     # display attribute of foreign key field in the admin panel
     @admin.display(description="Title")
     def get_variation(self, obj):
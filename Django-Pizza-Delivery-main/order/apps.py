@@ -6,4 +6,5 @@ class OrderConfig(AppConfig):
     name = "order"
 
     def ready(self):
+        import order.checks  # noqa
         import order.signals  # noqa
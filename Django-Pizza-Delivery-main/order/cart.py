@@ -0,0 +1,518 @@
+"""
+Cart storage backends, chosen with settings.CART_STORE.
+
+"db" keeps every cart as an open Order with its OrderItems. "cache"
+keeps guests' open carts in the Django cache under their device cookie:
+most guest carts are abandoned, so they are only written to the database
+as an Order when the guest reaches the checkout (see CartStore.flush).
+Registered users' carts stay in the database with either backend.
+
+Both backends give the cart views the same objects: an order with
+item_count and subtotal, and OrderItems with their product
+and variation loaded. Items of a cached cart are unsaved OrderItems
+whose pk is the item's number in the cart.
+"""
+
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import F
+from django.http import Http404
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from store.models import Product, ProductVariant
+from users.models import Customer
+from .models import Order, OrderItem
+
+CART_STORES = {
+    "db": "order.cart.DatabaseCartStore",
+    "cache": "order.cart.CacheCartStore",
+}
+
+# cache backends with an atomic add(), the lock of cached carts relies on
+# it. The local-memory cache is atomic within its process, so it only
+# suits a single worker
+ATOMIC_ADD_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.redis.RedisCache",
+    "django.core.cache.backends.memcached.PyMemcacheCache",
+    "django.core.cache.backends.memcached.PyLibMCCache",
+    "django_redis.cache.RedisCache",
+)
+
+# seconds a cached cart is locked for at most, a lock left behind by a
+# crashed worker expires after it
+CART_LOCK_TIMEOUT = 5
+CART_LOCK_POLL = 0.01
+
+
+class NoCart(Exception):
+    """The visitor is neither logged in nor has a device cookie"""
+
+
+def get_customer_or_guest(request):
+    """
+    checking if current user is authenticated/customer,
+    if not customer will be created based on device id
+    """
+    if request.user.is_authenticated:
+        customer = request.user.customer
+    else:
+        customer, created = Customer.objects.get_or_create(
+            device=request.COOKIES["device"]
+        )
+    return customer
+
+
+def find_customer(request):
+    """Customer of the visitor or None, guests are not created"""
+    if request.user.is_authenticated:
+        return Customer.objects.filter(user=request.user).first()
+    device = request.COOKIES.get("device")
+    return Customer.objects.filter(device=device).first() if device else None
+
+
+def apply_operations(quantities, operations):
+    """
+    Apply ("add" | "set" | "remove", key, quantity) operations to
+    {key: quantity} in order, keys left below 1 are dropped
+    """
+    quantities = dict(quantities)
+    for operation, key, quantity in operations:
+        if operation == "add":
+            quantities[key] = quantities.get(key, 0) + quantity
+        elif operation == "set":
+            quantities[key] = quantity
+        else:
+            quantities.pop(key, None)
+    return {key: quantity for key, quantity in quantities.items() if quantity > 0}
+
+
+def sort_items(items):
+    """Order of DatabaseCartStore.get(): by product name, then size, last first"""
+    return sorted(
+        items,
+        key=lambda item: (
+            item.product.name,
+            -(item.variation.size_id if item.variation else 0),
+        ),
+    )
+
+
+class DatabaseCartStore:
+    """Carts are open orders"""
+
+    def get_customer(self, request):
+        try:
+            return get_customer_or_guest(request)
+        # no device cookie, or a user without a customer
+        except Exception:
+            raise NoCart
+
+    def get(self, request):
+        """(order, items) of the cart, (None, None) when there is none"""
+        customer = self.get_customer(request)
+        order = Order.objects.filter(customer=customer, complete=False).first()
+        if order is None:
+            return None, None
+        items = (
+            OrderItem.objects.filter(order=order)
+            .with_product_info()
+            .order_by("product__name", "-variation__size")
+        )
+        return order, items
+
+    def count(self, request):
+        """Number of items in the cart, read from the open order's row"""
+        if request.user.is_authenticated:
+            orders = Order.objects.filter(customer__user=request.user)
+        elif request.COOKIES.get("device"):
+            orders = Order.objects.filter(customer__device=request.COOKIES["device"])
+        else:
+            return 0
+        count = orders.filter(complete=False).values_list("item_count", flat=True)
+        return count.first() or 0
+
+    @transaction.atomic
+    def add(self, request, product_id, variation_id, quantity, price=None):
+        """
+        Add a product to the cart, return the number of items in it. With
+        the unit price known the order's totals are added to, otherwise
+        they are recomputed.
+        """
+        customer = self.get_customer(request)
+        order, created = Order.objects.get_or_create(customer=customer, complete=False)
+        items = OrderItem.objects.filter(
+            order=order, product_id=product_id, variation_id=variation_id
+        )
+        # bulk_create skips OrderItem.save(), the totals are updated below
+        if not items.update(quantity=F("quantity") + quantity):
+            OrderItem.objects.bulk_create(
+                [
+                    OrderItem(
+                        order=order,
+                        product_id=product_id,
+                        variation_id=variation_id,
+                        quantity=quantity,
+                    )
+                ]
+            )
+        orders = Order.objects.filter(pk=order.pk)
+        # update modified date field of the order too
+        if price is None:
+            orders.update_totals(date_modified=timezone.now())
+        else:
+            orders.update(
+                item_count=F("item_count") + quantity,
+                subtotal=F("subtotal") + price * quantity,
+                date_modified=timezone.now(),
+            )
+        return orders.values_list("item_count", flat=True).get()
+
+    def set_quantity(self, request, item_id, quantity):
+        """Set the quantity of an item, quantities below 1 remove it"""
+        self.update_item(item_id, quantity=quantity)
+
+    def change_quantity(self, request, item_id, change):
+        """Add change to the quantity of an item, an item reaching 0 is removed"""
+        self.update_item(item_id, quantity=F("quantity") + change)
+
+    @transaction.atomic
+    def update_item(self, item_id, quantity):
+        """
+        Update an item in single statements, without loading it: the
+        quantity is computed by the database, so concurrent changes add
+        up. Raise Http404 if the item does not exist.
+        """
+        items = OrderItem.objects.filter(pk=item_id)
+        if not items.update(quantity=quantity):
+            raise Http404("No OrderItem matches the given query.")
+        # update the totals and modified date field of the order before the
+        # item is removed, update_totals() skips quantities below 1
+        Order.objects.filter(orderitem__pk=item_id).update_totals(
+            date_modified=timezone.now()
+        )
+        items.filter(quantity__lt=1).delete()
+
+    @transaction.atomic
+    def apply(self, request, operations):
+        """
+        Apply cart operations keyed by (product id, variation id), see
+        apply_operations(), with one bulk write per kind of change
+        """
+        customer = self.get_customer(request)
+        order, created = Order.objects.get_or_create(customer=customer, complete=False)
+        # concurrent batches of the same cart wait for each other
+        Order.objects.select_for_update().filter(pk=order.pk).exists()
+        items = {}
+        for item in OrderItem.objects.filter(order=order):
+            items.setdefault((item.product_id, item.variation_id), item)
+        wanted = apply_operations(
+            {key: item.quantity for key, item in items.items()}, operations
+        )
+
+        new, changed = [], []
+        for (product_id, variation_id), quantity in wanted.items():
+            item = items.get((product_id, variation_id))
+            if item is None:
+                new.append(
+                    OrderItem(
+                        order=order,
+                        product_id=product_id,
+                        variation_id=variation_id,
+                        quantity=quantity,
+                    )
+                )
+            elif item.quantity != quantity:
+                item.quantity = quantity
+                changed.append(item)
+        removed = [item.pk for key, item in items.items() if key not in wanted]
+        OrderItem.objects.bulk_create(new)
+        OrderItem.objects.bulk_update(changed, ["quantity"])
+        OrderItem.objects.filter(pk__in=removed).delete()
+        # bulk writes skip OrderItem.save(), update totals and modified date
+        Order.objects.filter(pk=order.pk).update_totals(date_modified=timezone.now())
+
+    def flush(self, request):
+        """The open order of the cart, None when there is none"""
+        customer = find_customer(request)
+        if customer is None:
+            return None
+        return (
+            Order.objects.filter(customer=customer, complete=False)
+            .with_totals()
+            .first()
+        )
+
+
+class CachedCart:
+    """Order-like view of a cart kept in the cache"""
+
+    def __init__(self, items):
+        self.items = items
+
+    @property
+    def item_count(self):
+        return self.get_cart_items
+
+    @property
+    def subtotal(self):
+        return self.get_cart_subtotal
+
+    @property
+    def get_cart_items(self):
+        return sum(item.quantity for item in self.items)
+
+    @property
+    def get_cart_subtotal(self):
+        return sum(item.get_total for item in self.items)
+
+
+class CacheCartStore(DatabaseCartStore):
+    """
+    Guests' carts are dicts in the cache:
+
+        {"items": [{"id": 1, "product_id": "...", "variation_id": 3,
+                    "quantity": 2}],
+         "next_id": 2, "order_id": None}
+
+    order_id is the Order the cart was flushed to, once that order is
+    complete the cart is emptied. Changes of a cart are serialized with a
+    lock key, concurrent requests of a device would lose each other's
+    writes otherwise.
+    """
+
+    def __init__(self):
+        check_cart_cache()
+
+    def key(self, device):
+        return f"order:cart:{device}"
+
+    def device(self, request):
+        if request.user.is_authenticated:
+            return None
+        device = request.COOKIES.get("device")
+        if not device:
+            raise NoCart
+        return device
+
+    def load(self, device):
+        cart = cache.get(self.key(device))
+        if cart is None:
+            return {"items": [], "next_id": 1, "order_id": None}
+        if (
+            cart["order_id"]
+            and Order.objects.filter(pk=cart["order_id"], complete=True).exists()
+        ):
+            cache.delete(self.key(device))
+            return {"items": [], "next_id": 1, "order_id": None}
+        return cart
+
+    def save(self, device, cart):
+        cache.set(self.key(device), cart, timeout=settings.CART_CACHE_TIMEOUT)
+
+    @contextmanager
+    def locked(self, device):
+        """Hold the device's cart lock, cache.add() succeeds for one writer"""
+        key = f"{self.key(device)}:lock"
+        token = uuid.uuid4().hex
+        while not cache.add(key, token, timeout=CART_LOCK_TIMEOUT):
+            time.sleep(CART_LOCK_POLL)
+        try:
+            yield
+        finally:
+            # the lock may have expired and been taken by another writer
+            if cache.get(key) == token:
+                cache.delete(key)
+
+    @contextmanager
+    def editing(self, device):
+        """Load the cart under the lock and save it if the changes succeed"""
+        with self.locked(device):
+            cart = self.load(device)
+            yield cart
+            self.save(device, cart)
+
+    def order_items(self, cart):
+        """Unsaved OrderItems of the cart with products and variations loaded"""
+        entries = cart["items"]
+        products = Product.objects.with_variant_info().in_bulk(
+            {entry["product_id"] for entry in entries}
+        )
+        variations = ProductVariant.objects.select_related("size").in_bulk(
+            {entry["variation_id"] for entry in entries if entry["variation_id"]}
+        )
+        items = []
+        for entry in entries:
+            product = products.get(uuid.UUID(entry["product_id"]))
+            if product is None:
+                # removed from the menu
+                continue
+            items.append(
+                OrderItem(
+                    pk=entry["id"],
+                    product=product,
+                    variation=variations.get(entry["variation_id"]),
+                    quantity=entry["quantity"],
+                )
+            )
+        return sort_items(items)
+
+    def get(self, request):
+        device = self.device(request)
+        if device is None:
+            return super().get(request)
+        items = self.order_items(self.load(device))
+        if not items:
+            return None, None
+        return CachedCart(items), items
+
+    def count(self, request):
+        try:
+            device = self.device(request)
+        except NoCart:
+            return 0
+        if device is None:
+            return super().count(request)
+        return sum(entry["quantity"] for entry in self.load(device)["items"])
+
+    def add(self, request, product_id, variation_id, quantity, price=None):
+        device = self.device(request)
+        if device is None:
+            return super().add(request, product_id, variation_id, quantity, price)
+        product_id = str(product_id)
+        with self.editing(device) as cart:
+            for entry in cart["items"]:
+                if (entry["product_id"], entry["variation_id"]) == (
+                    product_id,
+                    variation_id,
+                ):
+                    entry["quantity"] += quantity
+                    break
+            else:
+                cart["items"].append(
+                    {
+                        "id": cart["next_id"],
+                        "product_id": product_id,
+                        "variation_id": variation_id,
+                        "quantity": quantity,
+                    }
+                )
+                cart["next_id"] += 1
+        return sum(entry["quantity"] for entry in cart["items"])
+
+    def update_entry(self, device, item_id, quantity):
+        """Set an item's quantity with quantity(old quantity)"""
+        with self.editing(device) as cart:
+            for entry in cart["items"]:
+                if entry["id"] == item_id:
+                    break
+            else:
+                raise Http404("No OrderItem matches the given query.")
+            entry["quantity"] = quantity(entry["quantity"])
+            if entry["quantity"] < 1:
+                cart["items"].remove(entry)
+
+    def set_quantity(self, request, item_id, quantity):
+        device = self.device(request)
+        if device is None:
+            return super().set_quantity(request, item_id, quantity)
+        self.update_entry(device, item_id, lambda old: quantity)
+
+    def change_quantity(self, request, item_id, change):
+        device = self.device(request)
+        if device is None:
+            return super().change_quantity(request, item_id, change)
+        self.update_entry(device, item_id, lambda old: old + change)
+
+    def apply(self, request, operations):
+        device = self.device(request)
+        if device is None:
+            return super().apply(request, operations)
+        with self.editing(device) as cart:
+            entries = {
+                (entry["product_id"], entry["variation_id"]): entry
+                for entry in cart["items"]
+            }
+            wanted = apply_operations(
+                {key: entry["quantity"] for key, entry in entries.items()},
+                [
+                    (operation, (str(product_id), variation_id), quantity)
+                    for operation, (product_id, variation_id), quantity in operations
+                ],
+            )
+            items = []
+            for (product_id, variation_id), quantity in wanted.items():
+                entry = entries.get((product_id, variation_id))
+                if entry is None:
+                    entry = {
+                        "id": cart["next_id"],
+                        "product_id": product_id,
+                        "variation_id": variation_id,
+                    }
+                    cart["next_id"] += 1
+                items.append({**entry, "quantity": quantity})
+            cart["items"] = items
+
+    @transaction.atomic
+    def flush(self, request):
+        """
+        Write the guest's cart to their open Order, replacing its items,
+        and return the order. None when the cart is empty.
+        """
+        device = self.device(request)
+        if device is None:
+            return super().flush(request)
+        with self.locked(device):
+            return self.flush_cart(device)
+
+    def flush_cart(self, device):
+        cart = self.load(device)
+        items = self.order_items(cart)
+        if not items:
+            return None
+        customer, created = Customer.objects.get_or_create(device=device)
+        order, created = Order.objects.get_or_create(customer=customer, complete=False)
+        wanted = sorted(
+            (str(item.product_id), item.variation_id, item.quantity) for item in items
+        )
+        current = sorted(
+            (str(product_id), variation_id, quantity)
+            for product_id, variation_id, quantity in order.orderitem_set.values_list(
+                "product_id", "variation_id", "quantity"
+            )
+        )
+        if wanted != current:
+            order.orderitem_set.all().delete()
+            for item in items:
+                item.pk = None
+                item.order = order
+            OrderItem.objects.bulk_create(items)
+            # bulk writes skip OrderItem.save(), update totals and modified date
+            Order.objects.filter(pk=order.pk).update_totals(
+                date_modified=timezone.now()
+            )
+        if cart["order_id"] != str(order.pk):
+            cart["order_id"] = str(order.pk)
+            self.save(device, cart)
+        return Order.objects.with_totals().get(pk=order.pk)
+
+
+def check_cart_cache():
+    """Refuse cache backends whose add() is not atomic, e.g. the file cache"""
+    backend = settings.CACHES["default"]["BACKEND"]
+    if backend not in ATOMIC_ADD_CACHES:
+        raise ImproperlyConfigured(
+            f'CART_STORE = "cache" needs a cache with an atomic add() '
+            f"(Redis, Memcached or local memory), not {backend}"
+        )
+
+
+def get_cart_store():
+    return import_string(CART_STORES[settings.CART_STORE])()
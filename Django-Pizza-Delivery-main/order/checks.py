@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core import checks
+from django.core.exceptions import ImproperlyConfigured
+
+from .cart import check_cart_cache
+
+
+@checks.register()
+def check_cart_store(app_configs, **kwargs):
+    """Cached carts are locked with cache.add(), refuse caches where it is not atomic"""
+    if settings.CART_STORE != "cache":
+        return []
+    try:
+        check_cart_cache()
+    except ImproperlyConfigured as e:
+        return [checks.Error(str(e), id="order.E001")]
+    return []
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from order.popularity import BATCH_SIZE, record_sales, refresh_popularity
+
+
+class Command(BaseCommand):
+    help = (
+        "Count newly completed orders into the daily product sales and "
+        "refresh the product popularity ranking, run it periodically (cron)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help="orders recorded per transaction",
+        )
+
+    def handle(self, *args, **options):
+        orders = record_sales(options["batch_size"])
+        products = refresh_popularity()
+        self.stdout.write(
+            f"Recorded {orders} order(s), {products} product(s) sold in the last 30 days"
+        )
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from order.recommendations import MIN_SUPPORT, TOP_K, refresh_recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        "Count which products are bought together in completed orders and "
+        "store the best recommendations of every product, run it periodically (cron)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--top-k",
+            type=int,
+            default=TOP_K,
+            help="recommendations kept per product",
+        )
+        parser.add_argument(
+            "--min-support",
+            type=int,
+            default=MIN_SUPPORT,
+            help="orders a pair must appear in",
+        )
+
+    def handle(self, *args, **options):
+        products = refresh_recommendations(options["top_k"], options["min_support"])
+        self.stdout.write(f"Recommendations stored for {products} product(s)")
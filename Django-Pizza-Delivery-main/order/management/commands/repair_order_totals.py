@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from order.models import Order
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the item_count and subtotal columns of orders from their "
+        "items, e.g. after items were changed outside the cart code"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="orders recomputed per transaction",
+        )
+        parser.add_argument(
+            "--open-only",
+            action="store_true",
+            help="only recompute carts, not completed orders",
+        )
+
+    def handle(self, *args, **options):
+        orders = Order.objects.order_by("pk")
+        if options["open_only"]:
+            orders = orders.filter(complete=False)
+        ids = list(orders.values_list("pk", flat=True))
+        repaired = 0
+        for start in range(0, len(ids), options["batch_size"]):
+            batch = Order.objects.filter(
+                pk__in=ids[start : start + options["batch_size"]]
+            )
+            with transaction.atomic():
+                before = set(batch.values_list("pk", "item_count", "subtotal"))
+                batch.update_totals()
+                repaired += len(
+                    before - set(batch.values_list("pk", "item_count", "subtotal"))
+                )
+        self.stdout.write(f"Repaired {repaired} of {len(ids)} order(s)")
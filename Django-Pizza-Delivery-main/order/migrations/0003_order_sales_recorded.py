@@ -0,0 +1,18 @@
+# Generated by Django 4.1.3 on 2026-10-17 02:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("order", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="sales_recorded",
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
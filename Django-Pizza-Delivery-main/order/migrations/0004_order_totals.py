@@ -0,0 +1,47 @@
+# Generated by Django 4.1.3 on 2026-10-17 02:32
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_totals(apps, schema_editor):
+    Order = apps.get_model("order", "Order")
+    OrderItem = apps.get_model("order", "OrderItem")
+    money = models.DecimalField(max_digits=10, decimal_places=2)
+    items = OrderItem.objects.filter(
+        order=models.OuterRef("pk"), quantity__gt=0
+    ).values("order")
+    price = Coalesce("variation__price", "product__price")
+    count = items.annotate(total=models.Sum("quantity")).values("total")
+    subtotal = items.annotate(
+        total=models.Sum(models.F("quantity") * price, output_field=money)
+    ).values("total")
+    Order.objects.update(
+        item_count=Coalesce(models.Subquery(count), 0),
+        subtotal=Coalesce(
+            models.Subquery(subtotal), models.Value(0), output_field=money
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("order", "0003_order_sales_recorded"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="item_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="subtotal",
+            field=models.DecimalField(
+                decimal_places=2, default=0, editable=False, max_digits=10
+            ),
+        ),
+        migrations.RunPython(fill_totals, migrations.RunPython.noop),
+    ]
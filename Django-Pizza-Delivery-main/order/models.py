@@ -1,15 +1,80 @@
-from django.db import models
+from django.db import models, transaction
 from users.models import Customer
 import uuid
 from store.models import Product, ProductVariant
 import datetime
-from django.utils.safestring import mark_safe
+from decimal import Decimal
+from store.images import picture_html
 from django.utils import timezone
+from django.db.models.functions import Coalesce, Round
 
 
 # Create your models here.
 
 
+def money():
+    return models.DecimalField(max_digits=12, decimal_places=2)
+
+
+def cents(value):
+    # SQLite computes decimal expressions as floats
+    return None if value is None else Decimal(value).quantize(Decimal("0.01"))
+
+
+class OrderQuerySet(models.QuerySet):
+    def with_totals(self):
+        """
+        Annotate the number of items, the subtotal, the coupon value and
+        the total computed in SQL, so get_cart_items, get_cart_subtotal,
+        get_coupon_value and get_cart_total do not load the items
+        """
+        price = Coalesce("orderitem__variation__price", "orderitem__product__price")
+        subtotal = Coalesce(
+            models.Sum(models.F("orderitem__quantity") * price, output_field=money()),
+            models.Value(0),
+            output_field=money(),
+        )
+        coupon_value = models.Case(
+            models.When(
+                coupon__discount_type="Percent",
+                then=Round(subtotal * models.F("coupon__discount_amount") / 100, 2),
+            ),
+            models.When(coupon__isnull=False, then=models.F("coupon__discount_amount")),
+            output_field=money(),
+        )
+        return self.annotate(
+            cart_items=Coalesce(models.Sum("orderitem__quantity"), 0),
+            cart_subtotal=subtotal,
+            coupon_value=coupon_value,
+            cart_total=models.ExpressionWrapper(
+                subtotal - Coalesce(coupon_value, models.Value(0)),
+                output_field=money(),
+            ),
+        )
+
+    def update_totals(self, **fields):
+        """
+        Recompute the item_count and subtotal columns from the items in
+        one UPDATE, other fields can be set in the same statement. Items
+        with a quantity below 1 are not counted.
+        """
+        items = OrderItem.objects.filter(
+            order=models.OuterRef("pk"), quantity__gt=0
+        ).values("order")
+        price = Coalesce("variation__price", "product__price")
+        count = items.annotate(total=models.Sum("quantity")).values("total")
+        subtotal = items.annotate(
+            total=models.Sum(models.F("quantity") * price, output_field=money())
+        ).values("total")
+        return self.update(
+            item_count=Coalesce(models.Subquery(count), 0),
+            subtotal=Coalesce(
+                models.Subquery(subtotal), models.Value(0), output_field=money()
+            ),
+            **fields,
+        )
+
+
 class Order(models.Model):
     PAYMENT_CHOICES = (("cash", "cash"), ("online", "online"))
     DELIVERY_CHOICES = (("delivery", "delivery"), ("carryout", "carryout"))
@@ -35,13 +100,54 @@ class Order(models.Model):
     )
     email = models.EmailField(max_length=70, null=True, blank=True)
     phone = models.CharField(max_length=20, null=True, blank=True)
+    # set once the items are counted in the product popularity tables
+    sales_recorded = models.BooleanField(default=False, editable=False)
+    # running totals of the items, written by OrderQuerySet.update_totals
+    # whenever items change, so the cart badge and header read one row
+    item_count = models.PositiveIntegerField(default=0, editable=False)
+    subtotal = models.DecimalField(
+        max_digits=10, decimal_places=2, default=0, editable=False
+    )
+
+    objects = OrderQuerySet.as_manager()
+
+    # not written by save(), an order loaded before its items changed
+    # would overwrite them
+    TOTALS = ("item_count", "subtotal")
 
     def __str__(self):
         return f"{self.transaction_id} by {self.customer}"
 
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding
+            and kwargs.get("update_fields") is None
+            and not kwargs.get("force_insert")
+        ):
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.TOTALS
+            ]
+        super().save(*args, **kwargs)
+
+    def get_order_items(self):
+        """
+        Order items with their products and variations loaded,
+        prefetched items are reused when they are present
+        """
+        if "orderitem_set" in getattr(self, "_prefetched_objects_cache", {}):
+            return self.orderitem_set.all()
+        return self.orderitem_set.with_product_info()
+
+    # the properties below use the annotations of OrderQuerySet.with_totals
+    # when they are present
+
     @property
     def get_cart_subtotal(self):
-        order_items = self.orderitem_set.all()
+        if hasattr(self, "cart_subtotal"):
+            return cents(self.cart_subtotal)
+        order_items = self.get_order_items()
         total = sum([item.get_total for item in order_items])
         return total
 
@@ -50,9 +156,11 @@ class Order(models.Model):
 
     @property
     def get_cart_total(self):
+        if hasattr(self, "cart_total"):
+            return cents(self.cart_total)
         total = self.get_cart_subtotal
         if self.coupon:
-            total = total - self.get_coupon_value
+            total = total - self.coupon_discount(total)
         return total
 
     # display property name as 'Total' in the admin panel's list display
@@ -60,6 +168,8 @@ class Order(models.Model):
 
     @property
     def get_cart_items(self):
+        if hasattr(self, "cart_items"):
+            return self.cart_items
         order_items = self.orderitem_set.all()
         total = sum([item.quantity for item in order_items])
         return total
@@ -71,7 +181,7 @@ class Order(models.Model):
     @property
     def display_items(self):
         """To nicely display order items in Orders tab of a registered user"""
-        order_items = self.orderitem_set.all()
+        order_items = self.get_order_items()
         ticker, l = 1, len(order_items)
         product_titles = str()
         for item in order_items:
@@ -90,22 +200,35 @@ class Order(models.Model):
     @property
     def get_coupon_value(self):
         # calculate dollar value of the coupon
-        # if discount type Percent
+        if hasattr(self, "coupon_value"):
+            return cents(self.coupon_value)
         if self.coupon:
-            if self.coupon.discount_type == "Percent":
-                coupon_value = round(
-                    self.get_cart_subtotal * self.coupon.discount_amount / 100, 2
-                )
-            else:
-                coupon_value = self.coupon.discount_amount
-        # if discount type Absolute
-        else:
-            coupon_value = None
-        return coupon_value
+            return self.coupon_discount(self.get_cart_subtotal)
+        return None
 
     # display property name as 'Coupon' in the admin panel's list display
     get_coupon_value.fget.short_description = "Coupon"
 
+    def coupon_discount(self, subtotal):
+        """Dollar value of the coupon for a subtotal"""
+        # if discount type Percent
+        if self.coupon.discount_type == "Percent":
+            return round(subtotal * self.coupon.discount_amount / 100, 2)
+        # if discount type Absolute
+        return self.coupon.discount_amount
+
+
+class OrderItemQuerySet(models.QuerySet):
+    def with_product_info(self):
+        """
+        Load products with their variant info and variations with their size,
+        so get_item_price and get_total do not query per item
+        """
+        products = Product.objects.with_variant_info()
+        return self.select_related("variation__size").prefetch_related(
+            models.Prefetch("product", queryset=products)
+        )
+
 
 class OrderItem(models.Model):
     """
@@ -123,9 +246,24 @@ class OrderItem(models.Model):
     quantity = models.IntegerField(default=0)
     date_added = models.DateTimeField(auto_now_add=True)
 
+    objects = OrderItemQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.product.name} #{self.quantity}"
 
+    # the order's running totals change with the item. Queryset updates,
+    # deletes and bulk writes skip these, their callers update the totals
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            Order.objects.filter(pk=self.order_id).update_totals()
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            Order.objects.filter(pk=self.order_id).update_totals()
+        return result
+
     # get item price for product with and without variation
     @property
     def get_item_price(self):
@@ -148,9 +286,7 @@ class OrderItem(models.Model):
 
     # to display image in the admin panel
     def image_tag(self):
-        return mark_safe(
-            f'<img src="{self.product.image.url}" width="100" height="100" />'
-        )
+        return picture_html(self.product, "thumb", width=100, height=100)
 
     image_tag.short_description = "Image"
 
@@ -0,0 +1,107 @@
+"""
+Materialized product popularity.
+
+Computing best sellers from OrderItem and Order on every request does not
+scale, so units sold are counted into store.ProductSalesDay once per
+completed order (Order.sales_recorded marks the orders already counted)
+and the per product totals of the trailing windows are written to
+store.ProductPopularity. Both steps are run by the refresh_popularity
+command, the products page reads the ranking from the catalog snapshot.
+"""
+
+import datetime
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from store.catalog import invalidate_catalog
+from store.models import ProductPopularity, ProductSalesDay
+from .models import Order, OrderItem
+
+# trailing windows in days -> ProductPopularity field
+WINDOWS = {7: "units_7d", 30: "units_30d"}
+
+BATCH_SIZE = 500
+
+
+def record_sales(batch_size=BATCH_SIZE):
+    """
+    Add the items of completed orders that were not counted yet to the
+    daily sales, return the number of orders recorded
+    """
+    recorded = 0
+    while True:
+        with transaction.atomic():
+            order_ids = list(
+                Order.objects.select_for_update(skip_locked=True)
+                .filter(complete=True, sales_recorded=False)
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not order_ids:
+                return recorded
+            # orders are completed by their last save
+            sales = (
+                OrderItem.objects.filter(order_id__in=order_ids)
+                .values("product_id", day=TruncDate("order__date_modified"))
+                .annotate(units=Sum("quantity"))
+            )
+            for sale in sales:
+                updated = ProductSalesDay.objects.filter(
+                    product_id=sale["product_id"], day=sale["day"]
+                ).update(units=F("units") + sale["units"])
+                if not updated:
+                    ProductSalesDay.objects.create(
+                        product_id=sale["product_id"],
+                        day=sale["day"],
+                        units=sale["units"],
+                    )
+            Order.objects.filter(pk__in=order_ids).update(sales_recorded=True)
+        recorded += len(order_ids)
+
+
+def ranking():
+    return list(
+        ProductPopularity.objects.order_by("-units_7d", "-units_30d").values_list(
+            "product_id", flat=True
+        )
+    )
+
+
+@transaction.atomic
+def refresh_popularity(today=None):
+    """
+    Rewrite ProductPopularity from the daily sales of the trailing
+    windows, the catalog is invalidated if the ranking changed
+    """
+    today = today or timezone.localdate()
+    before = ranking()
+
+    units = {}
+    for days, field in WINDOWS.items():
+        since = today - datetime.timedelta(days=days - 1)
+        totals = (
+            ProductSalesDay.objects.filter(day__gte=since, day__lte=today)
+            .values("product_id")
+            .annotate(units=Sum("units"))
+        )
+        for total in totals:
+            units.setdefault(total["product_id"], {})[field] = total["units"]
+
+    ProductPopularity.objects.exclude(product_id__in=list(units)).delete()
+    now = timezone.now()
+    rows = []
+    for product_id, values in units.items():
+        counts = {field: values.get(field, 0) for field in WINDOWS.values()}
+        rows.append(ProductPopularity(product_id=product_id, updated_at=now, **counts))
+    ProductPopularity.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["product_id"],
+        update_fields=[*WINDOWS.values(), "updated_at"],
+    )
+
+    if ranking() != before:
+        transaction.on_commit(invalidate_catalog)
+    return len(rows)
@@ -0,0 +1,87 @@
+"""
+"Frequently bought together" recommendations.
+
+The co-occurrence matrix of products (how many completed orders contain
+both products of a pair) is counted by the refresh_recommendations
+command in one pass over the order items, kept sparse as a dict of
+Counters since most pairs are never bought together. The best top_k
+neighbours of every product are written to store.ProductRecommendation
+and loaded into the catalog snapshot, so the cart page looks them up
+without queries.
+"""
+
+import heapq
+import itertools
+from collections import Counter, defaultdict
+
+from django.db import transaction
+
+from store.catalog import invalidate_catalog
+from store.models import ProductRecommendation
+from .models import OrderItem
+
+TOP_K = 6
+# pairs bought together fewer times are noise
+MIN_SUPPORT = 2
+CHUNK_SIZE = 2000
+
+
+def baskets(chunk_size=CHUNK_SIZE):
+    """Stream the sets of product ids of completed orders"""
+    items = (
+        OrderItem.objects.filter(order__complete=True, product__isnull=False)
+        .order_by("order_id")
+        .values_list("order_id", "product_id")
+        .iterator(chunk_size=chunk_size)
+    )
+    for _, rows in itertools.groupby(items, key=lambda row: row[0]):
+        yield {product_id for _, product_id in rows}
+
+
+def cooccurrence(baskets):
+    """Sparse symmetric matrix {product id: Counter({product id: orders})}"""
+    matrix = defaultdict(Counter)
+    for basket in baskets:
+        # variants of a product are one product here, see the set above
+        for a, b in itertools.combinations(basket, 2):
+            matrix[a][b] += 1
+            matrix[b][a] += 1
+    return matrix
+
+
+def top_neighbours(matrix, top_k=TOP_K, min_support=MIN_SUPPORT):
+    """{product id: [(product id, score)]} best first, ties by id"""
+    neighbours = {}
+    for product_id, row in matrix.items():
+        candidates = (
+            (score, str(other), other)
+            for other, score in row.items()
+            if score >= min_support
+        )
+        best = heapq.nsmallest(top_k, candidates, key=lambda item: (-item[0], item[1]))
+        if best:
+            neighbours[product_id] = [(other, score) for score, _, other in best]
+    return neighbours
+
+
+@transaction.atomic
+def refresh_recommendations(top_k=TOP_K, min_support=MIN_SUPPORT):
+    """
+    Rewrite ProductRecommendation from the completed orders, the catalog
+    is invalidated if the recommendations changed. Return the number of
+    products having recommendations.
+    """
+    neighbours = top_neighbours(cooccurrence(baskets()), top_k, min_support)
+    fields = ("product_id", "recommended_id", "score", "rank")
+    rows = {
+        (product_id, other, score, rank)
+        for product_id, best in neighbours.items()
+        for rank, (other, score) in enumerate(best)
+    }
+    if rows != set(ProductRecommendation.objects.values_list(*fields)):
+        ProductRecommendation.objects.all().delete()
+        ProductRecommendation.objects.bulk_create(
+            ProductRecommendation(**dict(zip(fields, row))) for row in rows
+        )
+        transaction.on_commit(invalidate_catalog)
+    return len(neighbours)
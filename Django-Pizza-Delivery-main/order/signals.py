@@ -1,6 +1,8 @@
 from django.db.models import signals
 from django.dispatch import receiver
 from .models import Order, OrderItem
+from store.menu_io import products_imported
+from store.models import Product, ProductVariant
 from users.models import Customer
 from .email import send_confirmation_email
 from django.conf import settings
@@ -12,7 +14,7 @@ def mark_order_complete(sender, instance, **kwargs):
     if instance.complete:
         email = instance.email
         trn_id = str(instance.transaction_id)[:6]
-        items = OrderItem.objects.filter(order=instance)
+        items = OrderItem.objects.filter(order=instance).with_product_info()
 
         customer_qs = Customer.objects.filter(order=instance)
         if customer_qs.exists():
@@ -37,3 +39,50 @@ def mark_order_complete(sender, instance, **kwargs):
             send_confirmation_email(email, context)
         else:
             print("Order has been completed (no SMTP credentials provided)")
+
+
+def open_orders_with(**lookup):
+    return Order.objects.filter(complete=False, **lookup).distinct()
+
+
+@receiver(signals.post_save, sender=Product)
+def product_saved(sender, instance, raw=False, **kwargs):
+    """Recompute the totals of carts with the product, its price may have changed"""
+    if not raw:
+        open_orders_with(orderitem__product=instance).update_totals()
+
+
+@receiver(signals.post_save, sender=ProductVariant)
+def variant_saved(sender, instance, raw=False, **kwargs):
+    """Recompute the totals of carts with the variant, its price may have changed"""
+    if not raw:
+        open_orders_with(orderitem__variation=instance).update_totals()
+
+
+@receiver(signals.pre_delete, sender=Product)
+@receiver(signals.pre_delete, sender=ProductVariant)
+def remember_open_orders(sender, instance, **kwargs):
+    """
+    Items of a deleted product are deleted and items of a deleted variant
+    fall back to the product price before post_delete, so the carts are
+    looked up first
+    """
+    lookup = "orderitem__product" if sender is Product else "orderitem__variation"
+    instance._open_order_ids = list(
+        open_orders_with(**{lookup: instance}).values_list("pk", flat=True)
+    )
+
+
+@receiver(signals.post_delete, sender=Product)
+@receiver(signals.post_delete, sender=ProductVariant)
+def product_deleted(sender, instance, **kwargs):
+    """Recompute the totals of carts which had the product or variant"""
+    order_ids = getattr(instance, "_open_order_ids", None)
+    if order_ids:
+        Order.objects.filter(pk__in=order_ids).update_totals()
+
+
+@receiver(products_imported)
+def menu_imported(sender, product_ids, **kwargs):
+    """Recompute the totals of carts with products written by a menu import"""
+    open_orders_with(orderitem__product__in=product_ids).update_totals()
@@ -0,0 +1,122 @@
+import json
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from order.cart import apply_operations
+from order.models import Order, OrderItem
+from store.catalog import invalidate_catalog
+from store.models import Product, ProductVariant, Size
+from users.models import Customer
+
+
+class TestCartBatch(TestCase):
+    """Test applying lists of cart operations in one request"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.coke = Product.objects.create(name="Test Coke", price=2)
+        cls.pizza = Product.objects.create(name="Test Pizza")
+        for name, price in [("Small", 10), ("Large", 15)]:
+            ProductVariant.objects.create(
+                title=f"Test Pizza {name}",
+                product=cls.pizza,
+                size=Size.objects.create(name=name),
+                price=price,
+            )
+
+    def setUp(self):
+        cache.clear()
+        invalidate_catalog()
+        self.client.cookies["device"] = "TestDeviceId"
+
+    def batch(self, *operations):
+        return self.client.post(
+            reverse("order:cart-batch"),
+            data=json.dumps({"operations": operations}),
+            content_type="application/json",
+        )
+
+    def test_apply_operations(self):
+        """Test operations apply in order and empty keys are dropped"""
+        operations = [("add", "a", 2), ("add", "a", 1), ("set", "b", 4)]
+        operations += [("remove", "c", 0), ("set", "d", 0)]
+        self.assertEqual(
+            apply_operations({"c": 1, "d": 2}, operations), {"a": 3, "b": 4}
+        )
+
+    def check_batch(self):
+        pizza, coke = str(self.pizza.pk), str(self.coke.pk)
+        response = self.batch(
+            {"op": "add", "product": pizza, "size": "Large", "quantity": 2},
+            {"op": "add", "product": pizza, "size": "Small"},
+            {"op": "add", "product": coke, "quantity": "3"},
+            {"op": "add", "product": pizza, "size": "Large", "quantity": 1},
+        )
+        self.assertEqual(response.status_code, 200)
+        summary = response.json()
+        self.assertEqual(summary["cart_total"], 7)
+        self.assertEqual(summary["subtotal"], "61.00")
+        self.assertEqual(
+            [
+                (item["name"], item["size"], item["quantity"])
+                for item in summary["items"]
+            ],
+            [
+                ("Test Coke", None, 3),
+                ("Test Pizza", "Large", 3),
+                ("Test Pizza", "Small", 1),
+            ],
+        )
+        self.assertEqual(summary["items"][1]["total"], "45.00")
+
+        response = self.batch(
+            {"op": "set", "product": coke, "quantity": 1},
+            {"op": "remove", "product": pizza, "size": "Small"},
+            {"op": "set", "product": pizza, "size": "Large", "quantity": 0},
+        )
+        self.assertEqual(response.json()["cart_total"], 1)
+        self.assertEqual(len(response.json()["items"]), 1)
+
+    def test_batch_database(self):
+        """Test operations are written to the open order"""
+        self.check_batch()
+        order = Order.objects.get(customer__device="TestDeviceId", complete=False)
+        self.assertEqual(
+            list(order.orderitem_set.values_list("product", "quantity")),
+            [(self.coke.pk, 1)],
+        )
+
+    @override_settings(CART_STORE="cache")
+    def test_batch_cache(self):
+        """Test operations work the same on cached carts"""
+        self.check_batch()
+        self.assertFalse(OrderItem.objects.exists())
+
+    def test_invalid_operations(self):
+        """Test nothing is applied when an operation is invalid"""
+        response = self.batch(
+            {"op": "add", "product": str(self.coke.pk), "quantity": 1},
+            {"op": "add", "product": str(self.pizza.pk), "size": "Huge"},
+            {"op": "add", "product": "nope"},
+            {"op": "set", "product": str(self.coke.pk), "quantity": -1},
+            {"op": "buy", "product": str(self.coke.pk)},
+        )
+        self.assertEqual(response.status_code, 422)
+        errors = response.json()["errors"]
+        self.assertEqual(len(errors), 4)
+        self.assertIn("operation 1: unknown size 'Huge'", errors[0])
+        self.assertFalse(OrderItem.objects.exists())
+
+        response = self.client.post(
+            reverse("order:cart-batch"), data="[]", content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_no_device_cookie(self):
+        """Test visitors without a cart are redirected like add to cart"""
+        del self.client.cookies["device"]
+        response = self.batch({"op": "add", "product": str(self.coke.pk)})
+        self.assertRedirects(
+            response, reverse("store:products"), fetch_redirect_response=False
+        )
+        self.assertFalse(Customer.objects.exists())
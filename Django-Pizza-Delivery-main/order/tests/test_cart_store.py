@@ -0,0 +1,185 @@
+import json
+import threading
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth.models import AnonymousUser
+from django.core import checks
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from order.cart import CacheCartStore, get_cart_store
+from order.models import Order, OrderItem
+from store.catalog import invalidate_catalog
+from store.models import Product, ProductVariant, Size
+from users.models import Customer, User
+
+
+@override_settings(CART_STORE="cache")
+class TestCacheCartStore(TestCase):
+    """Test guests' carts kept in the cache until checkout"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(name="Test Coke", price=2)
+        cls.pizza = Product.objects.create(name="Test Pizza")
+        cls.large = ProductVariant.objects.create(
+            title="Test Pizza Large",
+            product=cls.pizza,
+            size=Size.objects.create(name="Large"),
+            price=15,
+        )
+
+    def setUp(self):
+        cache.clear()
+        invalidate_catalog()
+        self.client.cookies["device"] = "TestDeviceId"
+
+    def add(self, product, quantity=1, size=None):
+        data = {"quantity": quantity}
+        if size:
+            data["size"] = size
+        response = self.client.post(
+            reverse("order:add_to_cart", args=[product.pk]),
+            data=json.dumps(data),
+            content_type="application/json",
+        )
+        return response.json()["cart_total"]
+
+    def cart(self):
+        return self.client.get(reverse("order:cart")).context
+
+    @override_settings(
+        CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                "LOCATION": "/tmp/epizza-test-cache",
+            }
+        }
+    )
+    def test_cache_without_atomic_add(self):
+        """Test caches whose add() is not atomic are refused"""
+        with self.assertRaisesMessage(ImproperlyConfigured, "FileBasedCache"):
+            get_cart_store()
+        errors = checks.run_checks()
+        self.assertEqual([error.id for error in errors], ["order.E001"])
+
+    def test_concurrent_writers(self):
+        """Test a writer waits for another one of the same cart, no add is lost"""
+        store = CacheCartStore()
+        request = RequestFactory().post("/")
+        request.user = AnonymousUser()
+        request.COOKIES["device"] = "TestDeviceId"
+        load = store.load
+        loaded, resume = threading.Event(), threading.Event()
+
+        def slow_load(device):
+            cart = load(device)
+            # the first writer pauses between reading and writing the cart
+            if not loaded.is_set():
+                loaded.set()
+                resume.wait(5)
+            return cart
+
+        def add(product):
+            store.add(request, product.pk, None, 1)
+
+        with mock.patch.object(store, "load", side_effect=slow_load) as patched:
+            first = threading.Thread(target=add, args=[self.product])
+            first.start()
+            loaded.wait(5)
+            second = threading.Thread(target=add, args=[self.pizza])
+            second.start()
+            second.join(0.2)
+            # the second writer has not read the cart yet
+            self.assertEqual(patched.call_count, 1)
+            resume.set()
+            first.join(5)
+            second.join(5)
+
+        entries = cache.get(store.key("TestDeviceId"))["items"]
+        self.assertEqual(
+            sorted(entry["product_id"] for entry in entries),
+            sorted([str(self.product.pk), str(self.pizza.pk)]),
+        )
+
+    def test_cart_not_in_database(self):
+        """Test adding to the cart writes no customer, order or item"""
+        self.assertEqual(self.add(self.product, 2), 2)
+        self.assertEqual(self.add(self.pizza, 1, "Large"), 3)
+        self.assertEqual(self.add(self.product, 1), 4)
+        self.assertFalse(Customer.objects.exists())
+        self.assertFalse(Order.objects.exists())
+
+        context = self.cart()
+        self.assertEqual(context["cart_quantity"], 4)
+        self.assertEqual(context["order"].get_cart_subtotal, Decimal("21"))
+        items = context["items"]
+        self.assertEqual([item.product for item in items], [self.product, self.pizza])
+        self.assertEqual(items[1].variation, self.large)
+        self.assertEqual(items[0].get_total, 6)
+        response = self.client.get(reverse("order:cart-count"))
+        self.assertEqual(response.json(), {"cart_total": 4})
+
+    def test_change_items(self):
+        """Test quantity views change the cached cart"""
+        self.add(self.product, 2)
+        self.add(self.pizza, 1, "Large")
+        coke, pizza = [item.pk for item in self.cart()["items"]]
+
+        self.client.post(reverse("order:increase-product-quantity", args=[coke]))
+        self.client.post(reverse("order:reduce-product-quantity", args=[pizza]))
+        self.assertEqual([item.quantity for item in self.cart()["items"]], [3])
+
+        self.client.post(
+            reverse("order:change-product-quantity"),
+            {"orderItemId": coke, "quantity": "7"},
+        )
+        self.assertEqual(self.cart()["cart_quantity"], 7)
+
+        self.client.post(reverse("order:remove-from-cart", args=[coke]))
+        self.assertIsNone(self.cart()["items"])
+        response = self.client.post(reverse("order:remove-from-cart", args=[coke]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_flush_at_checkout(self):
+        """Test the checkout writes the cart to one open order"""
+        self.add(self.product, 2)
+        response = self.client.get(reverse("order:checkout"))
+        self.assertEqual(response.status_code, 200)
+        order = Order.objects.get(customer__device="TestDeviceId", complete=False)
+        self.assertEqual(response.context["order"], order)
+        self.assertEqual(order.get_cart_items, 2)
+
+        # the cart is still cached, changes replace the order's items
+        self.add(self.pizza, 1, "Large")
+        self.client.get(reverse("order:checkout"))
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(
+            sorted(order.orderitem_set.values_list("product__name", "quantity")),
+            [("Test Coke", 2), ("Test Pizza", 1)],
+        )
+
+        # a completed order empties the cart
+        Order.objects.filter(pk=order.pk).update(complete=True)
+        self.assertIsNone(self.cart()["order"])
+        response = self.client.get(reverse("order:checkout"))
+        self.assertRedirects(response, reverse("store:products"))
+
+    def test_empty_checkout(self):
+        """Test checkout without items redirects and creates nothing"""
+        response = self.client.get(reverse("order:checkout"))
+        self.assertRedirects(response, reverse("store:products"))
+        self.assertFalse(Customer.objects.exists())
+
+    def test_registered_users_in_database(self):
+        """Test carts of logged in users stay orders"""
+        user = User.objects.create_user(
+            email="user@example.com", username="testuser", password="password"
+        )
+        Customer.objects.create(user=user)
+        self.client.force_login(user)
+        self.add(self.product, 2)
+        order = Order.objects.get(customer__user=user, complete=False)
+        self.assertEqual(self.cart()["order"], order)
+        self.assertEqual(order.get_cart_items, 2)
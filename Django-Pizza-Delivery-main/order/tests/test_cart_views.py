@@ -5,6 +5,9 @@ from order.models import Order, OrderItem
 from store.models import Product, ProductVariant, Size
 from users.models import Customer
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from store.catalog import get_catalog
 import json
 
 
@@ -86,6 +89,27 @@ class TestCartViewsGuest(TestCase):
         self.assertEqual(response.context["order"], order)
         self.assertEqual(response.context["items"][0], order_item)
 
+    def test_cart_count_view(self):
+        """Test cart count of the guest is returned as JSON with a CSRF cookie"""
+        order = Order.objects.create(customer=self.customer)
+        OrderItem.objects.create(product=self.product, order=order, quantity=3)
+
+        response = self.client.get(reverse("order:cart-count"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), {"cart_total": 3})
+        self.assertIn("csrftoken", response.cookies)
+        self.assertIn("no-cache", response["Cache-Control"])
+
+    def test_cart_count_view_no_cookies(self):
+        """Test cart count without device cookie is 0 and creates no customer"""
+        customers = Customer.objects.count()
+
+        response = self.client_no_cookies.get(reverse("order:cart-count"))
+
+        self.assertEqual(json.loads(response.content), {"cart_total": 0})
+        self.assertEqual(Customer.objects.count(), customers)
+
     def test_add_to_cart_post(self):
         """Test add to cart Product w/o Variation with POST request"""
 
@@ -123,6 +147,40 @@ class TestCartViewsGuest(TestCase):
         variation = OrderItem.objects.filter(order=order)[0].variation
         self.assertEqual(variation, self.variant_1)
 
+    def test_add_to_cart_no_catalog_queries(self):
+        """Test product and variation are resolved without catalog queries"""
+        url = reverse("order:add_to_cart", args=[self.product_with_variant.pk])
+        data = json.dumps({"quantity": "2", "size": "Test Size 2"})
+        # build the snapshot outside of the measured request
+        get_catalog()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, data=data, content_type="application/json")
+
+        self.assertEqual(response.status_code, 200)
+        tables = " ".join(query["sql"] for query in queries)
+        self.assertNotIn("store_", tables)
+        order_item = OrderItem.objects.get(product=self.product_with_variant)
+        self.assertEqual(order_item.variation, self.variant_2)
+
+    def test_add_to_cart_unknown_size(self):
+        """Test add to cart with a size the product does not have is 404"""
+        url = reverse("order:add_to_cart", args=[self.product_with_variant.pk])
+        data = json.dumps({"quantity": "1", "size": "Unknown Size"})
+        response = self.client.post(url, data=data, content_type="application/json")
+
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(OrderItem.objects.exists())
+
+    def test_add_to_cart_invalid_quantity(self):
+        """Test add to cart with a missing or non-positive quantity is 400"""
+        url = reverse("order:add_to_cart", args=[self.product_with_variant.pk])
+        for quantity in ["-5", 0, "many", None]:
+            data = json.dumps({"quantity": quantity, "size": "Test Size 1"})
+            response = self.client.post(url, data=data, content_type="application/json")
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(OrderItem.objects.exists())
+
     def test_add_to_cart_post_redirected(self):
         """Test add to cart gets redirected as device cookie is not set"""
 
@@ -224,3 +282,25 @@ class TestCartViewsGuestInside(TestCase):
         self.assertEqual(
             OrderItem.objects.filter(pk=self.order_item.pk)[0].quantity, 50
         )
+
+    def test_quantity_updated_in_database(self):
+        """Test quantity changes are single updates computed by the database"""
+        url = reverse("order:increase-product-quantity", args=[self.order_item.pk])
+        modified = self.order.date_modified
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(url)
+        # the item and the order are not loaded
+        self.assertFalse([q for q in queries if q["sql"].startswith("SELECT")])
+        self.order_item.refresh_from_db()
+        self.assertEqual(self.order_item.quantity, 11)
+        self.order.refresh_from_db()
+        self.assertGreater(self.order.date_modified, modified)
+
+        url = reverse("order:change-product-quantity")
+        self.client.post(url, {"quantity": "0", "orderItemId": self.order_item.pk})
+        self.assertFalse(OrderItem.objects.filter(pk=self.order_item.pk).exists())
+
+    def test_change_missing_item(self):
+        """Test changing an item that does not exist is 404"""
+        url = reverse("order:increase-product-quantity", args=[self.order_item.pk + 1])
+        self.assertEqual(self.client.post(url).status_code, 404)
@@ -450,3 +450,105 @@ class TestOrderModels(TestCase):
             f"{shipping.first_name} {shipping.last_name} {shipping.address_1}",
         )
         self.assertEqual(ShippingAddress.objects.count(), 1)
+
+
+class TestOrderItemQuerySet(TestCase):
+    """Test loading order items with their products and variations"""
+
+    def test_order_item_with_product_info(self):
+        """Test item prices and totals do not query per order item"""
+        customer = create_guest_customer()
+        product = create_test_product()
+        product_with_variants = create_test_product_with_variants()
+        variant = ProductVariant.objects.filter(title="Test Variant 2")[0]
+        order = Order.objects.create(customer=customer)
+        OrderItem.objects.create(product=product, order=order, quantity=2)
+        OrderItem.objects.create(
+            product=product_with_variants, variation=variant, order=order, quantity=1
+        )
+
+        # order items with variations, products and product variants
+        with self.assertNumQueries(3):
+            items = OrderItem.objects.filter(order=order).with_product_info()
+            totals = sorted(item.get_total for item in items)
+        self.assertEqual(totals, [24, 100])
+
+        with self.assertNumQueries(3):
+            self.assertEqual(order.get_cart_subtotal, 124)
+
+
+class TestOrderQuerySet(TestCase):
+    """Test order totals computed in SQL"""
+
+    def setUp(self):
+        self.customer = create_guest_customer()
+        product = create_test_product(name="Test product 1", price="5.25")
+        product_with_variants = create_test_product_with_variants()
+        variant = ProductVariant.objects.filter(title="Test Variant 2")[0]
+        self.order = Order.objects.create(customer=self.customer)
+        OrderItem.objects.create(product=product, order=self.order, quantity=2)
+        OrderItem.objects.create(
+            product=product_with_variants,
+            variation=variant,
+            order=self.order,
+            quantity=1,
+        )
+
+    def coupon(self, discount_type, amount):
+        now = timezone.now()
+        return Coupon.objects.create(
+            code=f"Test{discount_type}",
+            active=True,
+            discount_type=discount_type,
+            discount_amount=amount,
+            valid_from=now,
+            valid_to=now + datetime.timedelta(days=1),
+        )
+
+    def assertTotalsEqual(self, order):
+        """Annotated totals equal the ones computed from the items"""
+        with self.assertNumQueries(1):
+            annotated = Order.objects.with_totals().get(pk=order.pk)
+            values = [
+                annotated.get_cart_items,
+                annotated.get_cart_subtotal,
+                annotated.get_coupon_value,
+                annotated.get_cart_total,
+            ]
+        order = Order.objects.get(pk=order.pk)
+        self.assertEqual(
+            values,
+            [
+                order.get_cart_items,
+                order.get_cart_subtotal,
+                order.get_coupon_value,
+                order.get_cart_total,
+            ],
+        )
+        return values
+
+    def test_with_totals(self):
+        """Test item count, subtotal and total are annotated"""
+        self.assertEqual(
+            self.assertTotalsEqual(self.order),
+            [3, Decimal("110.50"), None, Decimal("110.50")],
+        )
+
+    def test_with_totals_coupons(self):
+        """Test percent and absolute coupon values are annotated"""
+        self.order.coupon = self.coupon("Percent", 15)
+        self.order.save()
+        self.assertEqual(
+            self.assertTotalsEqual(self.order)[2:], [Decimal("16.58"), Decimal("93.92")]
+        )
+
+        self.order.coupon = self.coupon("Absolute", 10)
+        self.order.save()
+        self.assertEqual(
+            self.assertTotalsEqual(self.order)[2:], [10, Decimal("100.50")]
+        )
+
+    def test_with_totals_empty_order(self):
+        """Test orders without items have zero totals"""
+        order = Order.objects.create(customer=self.customer)
+        self.assertEqual(self.assertTotalsEqual(order), [0, 0, None, 0])
@@ -0,0 +1,154 @@
+import json
+from decimal import Decimal
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from order.models import Order, OrderItem
+from store.catalog import invalidate_catalog
+from store.menu_io import MenuImporter, read_menu
+from store.models import Product, ProductVariant, Size
+from users.models import Customer
+
+
+class TestOrderTotals(TestCase):
+    """Test the item_count and subtotal columns follow the order's items"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = Customer.objects.create(device="TestDeviceId")
+        cls.coke = Product.objects.create(name="Test Coke", price=2)
+        cls.pizza = Product.objects.create(name="Test Pizza")
+        cls.large = ProductVariant.objects.create(
+            title="Test Pizza Large",
+            product=cls.pizza,
+            size=Size.objects.create(name="Large"),
+            price=15,
+        )
+
+    def setUp(self):
+        cache.clear()
+        invalidate_catalog()
+        self.client.cookies["device"] = "TestDeviceId"
+
+    def totals(self, order):
+        order.refresh_from_db(fields=Order.TOTALS)
+        return order.item_count, order.subtotal
+
+    def test_item_save_and_delete(self):
+        """Test creating, changing and deleting items update the totals"""
+        order = Order.objects.create(customer=self.customer)
+        self.assertEqual(self.totals(order), (0, 0))
+        coke = OrderItem.objects.create(order=order, product=self.coke, quantity=3)
+        OrderItem.objects.create(
+            order=order, product=self.pizza, variation=self.large, quantity=1
+        )
+        self.assertEqual(self.totals(order), (4, Decimal("21")))
+
+        coke.quantity = 1
+        coke.save()
+        self.assertEqual(self.totals(order), (2, Decimal("17")))
+        coke.delete()
+        self.assertEqual(self.totals(order), (1, Decimal("15")))
+
+    def test_order_save_keeps_totals(self):
+        """Test saving an order loaded before its items changed keeps the totals"""
+        order = Order.objects.create(customer=self.customer)
+        OrderItem.objects.create(order=order, product=self.coke, quantity=2)
+        order.phone = "12345"
+        order.save()
+        self.assertEqual(self.totals(order), (2, Decimal("4")))
+
+    def test_cart_views(self):
+        """Test the cart endpoints keep the totals, the badge reads one row"""
+        response = self.client.post(
+            reverse("order:add_to_cart", args=[self.coke.pk]),
+            data=json.dumps({"quantity": 1}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.json()["cart_total"], 1)
+        order = Order.objects.get(customer=self.customer, complete=False)
+        item = order.orderitem_set.get()
+
+        self.client.post(reverse("order:increase-product-quantity", args=[item.pk]))
+        self.assertEqual(self.totals(order), (2, Decimal("4")))
+        self.client.post(
+            reverse("order:cart-batch"),
+            data=json.dumps(
+                {
+                    "operations": [
+                        {"op": "add", "product": str(self.pizza.pk), "size": "Large"}
+                    ]
+                }
+            ),
+            content_type="application/json",
+        )
+        self.assertEqual(self.totals(order), (3, Decimal("19")))
+        self.client.post(reverse("order:reduce-product-quantity", args=[item.pk]))
+        self.client.post(reverse("order:reduce-product-quantity", args=[item.pk]))
+        self.assertEqual(self.totals(order), (1, Decimal("15")))
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("order:cart-count"))
+        self.assertEqual(response.json()["cart_total"], 1)
+
+    def test_price_changes(self):
+        """Test changing or deleting products and variants updates open carts"""
+        order = Order.objects.create(customer=self.customer)
+        OrderItem.objects.create(order=order, product=self.coke, quantity=2)
+        OrderItem.objects.create(
+            order=order, product=self.pizza, variation=self.large, quantity=1
+        )
+        completed = Order.objects.create(customer=self.customer)
+        OrderItem.objects.create(order=completed, product=self.coke, quantity=1)
+        Order.objects.filter(pk=completed.pk).update(complete=True)
+        self.assertEqual(self.totals(order), (3, Decimal("19")))
+
+        self.coke.price = 3
+        self.coke.save()
+        self.assertEqual(self.totals(order), (3, Decimal("21")))
+        # completed orders keep the price they were paid at
+        self.assertEqual(self.totals(completed), (1, Decimal("2")))
+
+        self.large.price = 20
+        self.large.save()
+        self.assertEqual(self.totals(order), (3, Decimal("26")))
+
+        # the item falls back to the product price, which the pizza has not
+        self.large.delete()
+        self.assertEqual(self.totals(order), (3, Decimal("6")))
+        self.coke.delete()
+        self.assertEqual(self.totals(order), (1, Decimal("0")))
+
+        # adding to the cart adds to the recomputed totals
+        self.pizza.price = 12
+        self.pizza.save()
+        self.client.post(
+            reverse("order:add_to_cart", args=[self.pizza.pk]),
+            data=json.dumps({"quantity": 1}),
+            content_type="application/json",
+        )
+        self.assertEqual(self.totals(order), (2, Decimal("24")))
+
+    def test_menu_import(self):
+        """Test prices changed by a menu import update open carts"""
+        order = Order.objects.create(customer=self.customer)
+        OrderItem.objects.create(order=order, product=self.coke, quantity=2)
+        line = json.dumps({"id": str(self.coke.pk), "name": "Test Coke", "price": "5"})
+        MenuImporter().run(read_menu(StringIO(line), "jsonl"))
+        self.assertEqual(self.totals(order), (2, Decimal("10")))
+
+    def test_repair_command(self):
+        """Test the command recomputes totals that drifted"""
+        order = Order.objects.create(customer=self.customer)
+        OrderItem.objects.create(order=order, product=self.coke, quantity=2)
+        completed = Order.objects.create(customer=self.customer)
+        # update() skips the order confirmation email of save()
+        Order.objects.filter(pk=completed.pk).update(complete=True)
+        Order.objects.filter(pk=order.pk).update(item_count=9, subtotal=1)
+
+        output = StringIO()
+        call_command("repair_order_totals", "--batch-size", "1", stdout=output)
+        self.assertEqual(output.getvalue().strip(), "Repaired 1 of 2 order(s)")
+        self.assertEqual(self.totals(order), (2, Decimal("4")))
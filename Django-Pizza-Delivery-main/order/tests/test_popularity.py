@@ -0,0 +1,116 @@
+import datetime
+from io import StringIO
+from django.test import TestCase
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from order.models import Order, OrderItem
+from order.popularity import record_sales, refresh_popularity
+from store.models import Product, ProductSalesDay, ProductPopularity
+from store.catalog import get_catalog, invalidate_catalog
+from users.models import Customer
+
+
+class TestProductPopularity(TestCase):
+    """Test materialized best sellers ranking"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = Customer.objects.create(device="TestDeviceId")
+        cls.pizza = Product.objects.create(name="Test Pizza", price=10)
+        cls.coke = Product.objects.create(name="Test Coke", price=2)
+        cls.salad = Product.objects.create(name="Test Salad", price=5)
+
+    def setUp(self):
+        invalidate_catalog()
+        self.today = timezone.localdate()
+
+    def complete_order(self, days_ago=0, **quantities):
+        """Create a completed order with {product attribute: quantity}"""
+        order = Order.objects.create(customer=self.customer)
+        for name, quantity in quantities.items():
+            product = getattr(self, name)
+            OrderItem.objects.create(order=order, product=product, quantity=quantity)
+        # update() skips the order confirmation email of save()
+        completed = timezone.now() - datetime.timedelta(days=days_ago)
+        Order.objects.filter(pk=order.pk).update(complete=True, date_modified=completed)
+        return order
+
+    def test_record_sales_incremental(self):
+        """Test completed orders are counted into daily sales once"""
+        self.complete_order(pizza=2, coke=1)
+        self.complete_order(pizza=3)
+        # open carts are not sales
+        cart = Order.objects.create(customer=self.customer)
+        OrderItem.objects.create(order=cart, product=self.salad, quantity=9)
+
+        self.assertEqual(record_sales(batch_size=1), 2)
+        self.assertEqual(record_sales(), 0)
+        pizza = ProductSalesDay.objects.get(product=self.pizza, day=self.today)
+        self.assertEqual(pizza.units, 5)
+        self.assertFalse(ProductSalesDay.objects.filter(product=self.salad).exists())
+
+        self.complete_order(pizza=1)
+        record_sales()
+        pizza.refresh_from_db()
+        self.assertEqual(pizza.units, 6)
+
+    def test_refresh_popularity_windows(self):
+        """Test units are summed over the trailing 7 and 30 days"""
+        self.complete_order(days_ago=1, coke=4)
+        self.complete_order(days_ago=10, pizza=10)
+        self.complete_order(days_ago=40, salad=50)
+        record_sales()
+
+        self.assertEqual(refresh_popularity(self.today), 2)
+        coke = ProductPopularity.objects.get(product=self.coke)
+        pizza = ProductPopularity.objects.get(product=self.pizza)
+        self.assertEqual((coke.units_7d, coke.units_30d), (4, 4))
+        self.assertEqual((pizza.units_7d, pizza.units_30d), (0, 10))
+        self.assertFalse(ProductPopularity.objects.filter(product=self.salad).exists())
+
+        # products fall out of the table when their sales get older
+        later = self.today + datetime.timedelta(days=25)
+        self.assertEqual(refresh_popularity(later), 1)
+        self.assertFalse(ProductPopularity.objects.filter(product=self.pizza).exists())
+
+    def test_ranking_in_catalog(self):
+        """Test the refreshed ranking reaches the catalog snapshot"""
+        self.complete_order(pizza=1, coke=3)
+        version = get_catalog().version
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("refresh_popularity", stdout=StringIO())
+
+        catalog = get_catalog()
+        self.assertNotEqual(catalog.version, version)
+        self.assertEqual(
+            [product.id for product in catalog.popular], [self.coke.pk, self.pizza.pk]
+        )
+        self.assertEqual(catalog.products_by_popularity[2].id, self.salad.pk)
+
+        # an unchanged ranking keeps the catalog
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            refresh_popularity()
+        self.assertEqual(callbacks, [])
+
+    def test_products_view_sort_popular(self):
+        """Test ?sort=popular lists best sellers first and shows the strip"""
+        self.complete_order(salad=2)
+        record_sales()
+        refresh_popularity()
+        invalidate_catalog()
+
+        url = reverse("store:products")
+        response = self.client.get(url, {"sort": "popular"})
+        products = list(response.context["products"])
+        self.assertEqual(products[0].id, self.salad.pk)
+        self.assertEqual(response.context["sort"], "popular")
+        self.assertEqual(
+            [p.id for p in response.context["best_sellers"]], [self.salad.pk]
+        )
+        self.assertContains(response, "Best Sellers")
+
+        # searches are reordered by popularity too
+        response = self.client.get(url, {"sort": "popular", "product": "test"})
+        self.assertEqual(response.context["products"][0].id, self.salad.pk)
+        self.assertEqual(response.context["best_sellers"], ())
@@ -0,0 +1,117 @@
+from io import StringIO
+from django.test import TestCase
+from django.core.management import call_command
+from django.urls import reverse
+from order.models import Order, OrderItem
+from order.recommendations import cooccurrence, refresh_recommendations, top_neighbours
+from store.models import Product, ProductRecommendation
+from store.catalog import get_catalog, invalidate_catalog
+from users.models import Customer
+
+
+class TestRecommendations(TestCase):
+    """Test "frequently bought together" recommendations"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = Customer.objects.create(device="TestDeviceId")
+        cls.pizza = Product.objects.create(name="Test Pizza", price=10)
+        cls.coke = Product.objects.create(name="Test Coke", price=2)
+        cls.salad = Product.objects.create(name="Test Salad", price=5)
+        cls.water = Product.objects.create(name="Test Water", price=1)
+
+    def setUp(self):
+        invalidate_catalog()
+
+    def order(self, *products, complete=True):
+        order = Order.objects.create(customer=self.customer)
+        for product in products:
+            OrderItem.objects.create(order=order, product=product, quantity=1)
+        # update() skips the order confirmation email of save()
+        Order.objects.filter(pk=order.pk).update(complete=complete)
+        return order
+
+    def test_cooccurrence(self):
+        """Test pairs are counted once per basket in both directions"""
+        matrix = cooccurrence([{1, 2, 3}, {1, 2}, {4}])
+        self.assertEqual(matrix[1], {2: 2, 3: 1})
+        self.assertEqual(matrix[2][1], 2)
+        self.assertNotIn(4, matrix)
+        self.assertEqual(
+            top_neighbours(matrix, top_k=1, min_support=1),
+            {1: [(2, 2)], 2: [(1, 2)], 3: [(1, 1)]},
+        )
+        self.assertEqual(
+            top_neighbours(matrix, min_support=2), {1: [(2, 2)], 2: [(1, 2)]}
+        )
+
+    def test_refresh_recommendations(self):
+        """Test top neighbours of completed orders are stored"""
+        self.order(self.pizza, self.coke)
+        self.order(self.pizza, self.coke, self.salad)
+        self.order(self.pizza, self.salad)
+        self.order(self.pizza, self.water)
+        # open carts are not counted
+        self.order(self.pizza, self.water, complete=False)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.assertEqual(refresh_recommendations(top_k=1), 3)
+        self.assertEqual(len(callbacks), 1)
+        pizza = ProductRecommendation.objects.get(product=self.pizza)
+        # ties are broken by id so refreshes are stable
+        best = min([self.coke, self.salad], key=lambda product: str(product.pk))
+        self.assertEqual((pizza.recommended, pizza.score, pizza.rank), (best, 2, 0))
+        self.assertEqual(
+            ProductRecommendation.objects.get(product=self.coke).recommended, self.pizza
+        )
+
+        # unchanged recommendations keep the catalog
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            refresh_recommendations(top_k=1)
+        self.assertEqual(callbacks, [])
+
+    def test_catalog_recommend(self):
+        """Test recommendations of the cart products add up"""
+        self.order(self.pizza, self.coke)
+        self.order(self.pizza, self.coke)
+        self.order(self.salad, self.water)
+        self.order(self.salad, self.water)
+        self.order(self.salad, self.coke)
+        self.order(self.salad, self.coke)
+        self.order(self.salad, self.coke)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("refresh_recommendations", stdout=StringIO())
+
+        catalog = get_catalog()
+        self.assertEqual(
+            [product.id for product in catalog.recommend([self.pizza.pk], 4)],
+            [self.coke.pk],
+        )
+        self.assertEqual(
+            [
+                product.id
+                for product in catalog.recommend([self.water.pk, self.coke.pk], 4)
+            ],
+            [self.salad.pk, self.pizza.pk],
+        )
+        self.assertEqual(catalog.recommend([self.salad.pk], 1)[0].id, self.coke.pk)
+
+    def test_cart_shows_recommendations(self):
+        """Test the cart lists products bought with its items, not the items"""
+        self.order(self.pizza, self.coke)
+        self.order(self.pizza, self.coke)
+        refresh_recommendations()
+        invalidate_catalog()
+
+        self.client.cookies["device"] = "TestDeviceId"
+        cart = self.order(self.pizza, complete=False)
+        response = self.client.get(reverse("order:cart"))
+        self.assertEqual(
+            [product.id for product in response.context["recommendations"]],
+            [self.coke.pk],
+        )
+        self.assertContains(response, "Frequently Bought Together")
+
+        OrderItem.objects.create(order=cart, product=self.coke)
+        response = self.client.get(reverse("order:cart"))
+        self.assertEqual(response.context["recommendations"], [])
@@ -5,7 +5,9 @@ app_name = "order"
 
 urlpatterns = [
     path("cart/", views.cart, name="cart"),
+    path("cart/count/", views.cart_count, name="cart-count"),
     path("add_to_cart/<uuid:pk>", views.add_to_cart, name="add_to_cart"),
+    path("cart/batch/", views.cart_batch, name="cart-batch"),
     path("remove_from_cart/<int:pk>", views.remove_from_cart, name="remove-from-cart"),
     path(
         "increase_product_quantity/<int:pk>",
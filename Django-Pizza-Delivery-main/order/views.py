@@ -1,10 +1,12 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from store.models import Product, ProductVariant, Size
-from users.models import Customer
+from store.catalog import get_catalog
+from .cart import NoCart, get_cart_store, get_customer_or_guest
 from .models import OrderItem, Order, Coupon, ShippingAddress, PickUpDetail
 from .forms import CouponApplyForm
-from django.http import HttpResponseRedirect
-from django.views.decorators.http import require_POST
+from django.http import HttpResponseRedirect, Http404
+from django.views.decorators.http import require_POST, require_safe
+from django.views.decorators.cache import never_cache
+from django.views.decorators.csrf import ensure_csrf_cookie
 from django.utils import timezone
 from django.utils.timezone import make_aware
 from django.contrib import messages
@@ -15,20 +17,12 @@ from django.views.generic import TemplateView
 from django.http.response import HttpResponseNotFound, JsonResponse
 import json
 import datetime
+import uuid
 
-
-def get_customer_or_guest(request):
-    """
-    checking if current user is authenticated/customer,
-    if not customer will be created based on device id
-    """
-    if request.user.is_authenticated:
-        customer = request.user.customer
-    else:
-        customer, created = Customer.objects.get_or_create(
-            device=request.COOKIES["device"]
-        )
-    return customer
+# "frequently bought together" products shown in the cart
+RECOMMENDATIONS = 4
+# operations accepted by one cart batch request
+MAX_OPERATIONS = 50
 
 
 def cart(request):
@@ -36,30 +30,46 @@ def cart(request):
     Cart page. It contains information about only one order,
     which has not complete (complete=False) status.
     """
+    # the cart is an open order or, for guests, kept in the cache,
+    # see order/cart.py
     try:
-        customer = get_customer_or_guest(request)
-    except:
+        customer_order, customer_items = get_cart_store().get(request)
+    except NoCart:
         return redirect("store:products")
 
-    customer_order = Order.objects.filter(customer=customer, complete=False)
-
     # in case user visits cart directly  without adding any item
-    if customer_order.exists():
-        customer_items = OrderItem.objects.filter(order_id__in=customer_order).order_by(
-            "product__name", "-variation__size"
+    if customer_order is not None:
+        # looked up in the catalog snapshot, see order/recommendations.py
+        recommendations = get_catalog().recommend(
+            {item.product_id for item in customer_items}, RECOMMENDATIONS
         )
-        customer_order = customer_order[0]
     else:
-        customer_order, customer_items = None, None
+        customer_order, customer_items, recommendations = None, None, []
 
     context = {
         "order": customer_order,
         "items": customer_items,
+        "cart_quantity": customer_order.item_count if customer_order else 0,
+        "recommendations": recommendations,
     }
 
     return render(request, "order/cart.html", context)
 
 
+@never_cache
+@ensure_csrf_cookie
+@require_safe
+def cart_count(request):
+    """
+    Number of items in the cart for the Navbar badge. It is fetched by
+    base.html after the page loads, so pages do not depend on the visitor
+    and guests' pages can be cached. It also sets the CSRF cookie used by
+    the add to cart requests.
+    """
+    # guests are looked up only, customers are created when adding to cart
+    return JsonResponse({"cart_total": get_cart_store().count(request)})
+
+
 @require_POST
 def add_to_cart(request, pk):
     """
@@ -67,33 +77,131 @@ def add_to_cart(request, pk):
     if cart is empty order and order item will be created
     if user is not registered, device id from the cookies is used
     """
-    product = get_object_or_404(Product, pk=pk)
-    # getting product quantity
-    quantity = int(json.loads(request.body)["quantity"])
+    # product and variation are resolved from the catalog snapshot,
+    # adding an item does not query products, sizes or variants
+    catalog = get_catalog()
+    product = catalog.get(pk)
+    if product is None:
+        raise Http404("Product does not exist")
+    # getting product quantity, the cart totals are added to with it
+    try:
+        data = json.loads(request.body)
+        quantity = int(data["quantity"])
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({"errors": ["quantity expected"]}, status=400)
+    if quantity < 1:
+        return JsonResponse({"errors": [f"invalid quantity {quantity}"]}, status=400)
 
     # getting product variation
     if product.has_variants:
-        size = json.loads(request.body)["size"]
-        size = Size.objects.get(name=size)
-        variation = ProductVariant.objects.get(size=size, product=product)
+        variation = catalog.resolve_variant(product.id, data.get("size"))
+        if variation is None:
+            raise Http404("Size does not exist")
+        variation_id, price = variation
     else:
-        variation = None
+        variation_id, price = None, product.price
 
     try:
-        customer = get_customer_or_guest(request)
-    except:
+        cart_total = get_cart_store().add(
+            request, product.id, variation_id, quantity, price=price
+        )
+    except NoCart:
         return redirect("store:products")
+    return JsonResponse({"cart_total": cart_total})
 
-    order, created = Order.objects.get_or_create(customer=customer, complete=False)
-    order_item, created = OrderItem.objects.get_or_create(
-        order=order,
-        product=product,
-        variation=variation,
-    )
-    order_item.quantity += quantity
-    order_item.save()
-    order.save()  # to update modified field of order model
-    return JsonResponse({"cart_total": order.get_cart_items})
+
+def parse_operation(catalog, data):
+    """
+    {"op": "add" | "set" | "remove", "product": id, "size": name,
+    "quantity": n} -> (op, (product id, variation id), quantity),
+    products and sizes are resolved from the catalog snapshot
+    """
+    op = data.get("op")
+    if op not in ("add", "set", "remove"):
+        raise ValueError(f"unknown operation {op!r}")
+    try:
+        product = catalog.get(uuid.UUID(str(data.get("product"))))
+    except ValueError:
+        product = None
+    if product is None:
+        raise ValueError(f"unknown product {data.get('product')!r}")
+    variation_id = None
+    if product.has_variants:
+        variation = catalog.resolve_variant(product.id, data.get("size"))
+        if variation is None:
+            raise ValueError(f"unknown size {data.get('size')!r} of {product.name}")
+        variation_id, _ = variation
+    quantity = 0
+    if op != "remove":
+        try:
+            quantity = int(data.get("quantity", 1))
+        except (TypeError, ValueError):
+            raise ValueError(f"invalid quantity {data.get('quantity')!r}")
+        if quantity < (1 if op == "add" else 0):
+            raise ValueError(f"invalid quantity {quantity} for {op}")
+    return op, (product.id, variation_id), quantity
+
+
+def cart_summary(order, items):
+    return {
+        "cart_total": order.item_count if order else 0,
+        "subtotal": str(order.subtotal if order else 0),
+        "items": [
+            {
+                "id": item.pk,
+                "product": str(item.product_id),
+                "name": item.product.name,
+                "size": item.variation.size.name if item.variation else None,
+                "quantity": item.quantity,
+                "price": str(item.get_item_price),
+                "total": str(item.get_total),
+            }
+            for item in items or ()
+        ],
+    }
+
+
+@require_POST
+def cart_batch(request):
+    """
+    Apply a list of cart operations in one transaction and return the
+    cart, lets the pages send coalesced clicks as one request:
+
+        {"operations": [{"op": "add", "product": "<id>", "size": "Large",
+                         "quantity": 2},
+                        {"op": "set", "product": "<id>", "quantity": 0},
+                        {"op": "remove", "product": "<id>", "size": "Small"}]}
+    """
+    try:
+        operations = json.loads(request.body)["operations"]
+        if not isinstance(operations, list):
+            raise TypeError
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({"errors": ["operations list expected"]}, status=400)
+    if len(operations) > MAX_OPERATIONS:
+        errors = [f"at most {MAX_OPERATIONS} operations per request"]
+        return JsonResponse({"errors": errors}, status=400)
+
+    catalog = get_catalog()
+    parsed, errors = [], []
+    for index, data in enumerate(operations):
+        try:
+            if not isinstance(data, dict):
+                raise ValueError("operation object expected")
+            parsed.append(parse_operation(catalog, data))
+        except ValueError as e:
+            errors.append(f"operation {index}: {e}")
+    # nothing is applied if any operation is invalid
+    if errors:
+        return JsonResponse({"errors": errors}, status=422)
+
+    store = get_cart_store()
+    try:
+        store.apply(request, parsed)
+        order, items = store.get(request)
+    except NoCart:
+        return redirect("store:products")
+    return JsonResponse(cart_summary(order, items))
 
 
 @require_POST
@@ -101,10 +209,7 @@ def remove_from_cart(request, pk):
     """
     removing product from the cart
     """
-    order_item = get_object_or_404(OrderItem, pk=pk)
-    order_item.delete()
-    # save corresponding order to update modified date field
-    order_item.order.save()
+    get_cart_store().set_quantity(request, pk, 0)
     # redirects to the same page
     # return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
     return redirect("order:cart")
@@ -116,12 +221,7 @@ def increase_product_quantity(request, pk):
     adding +1 item to the cart
     this functionality is used inside the cart page
     """
-    order_item = get_object_or_404(OrderItem, pk=pk)
-    order_item.quantity += 1
-    order_item.save()
-
-    # save corresponding order to update modified date field
-    order_item.order.save()
+    get_cart_store().change_quantity(request, pk, 1)
 
     # redirect to the same page
     # return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
@@ -134,16 +234,7 @@ def reduce_product_quantity(request, pk):
     reduce item quantity in the cart by one,
     if quantity becomes negative whole OrderItem gets deleted
     """
-    # order query set
-    order_item = get_object_or_404(OrderItem, pk=pk)
-    if order_item.quantity > 1:
-        order_item.quantity -= 1
-        order_item.save()
-    else:
-        order_item.delete()
-
-    # save corresponding order to update modified date field
-    order_item.order.save()
+    get_cart_store().change_quantity(request, pk, -1)
 
     # redirect to the same page
     return redirect("order:cart")
@@ -154,13 +245,12 @@ def change_product_quantity(request):
     """
     Change product quantity inside the cart - uses Ajax
     """
-    quantity = request.POST.get("quantity")
-    order_item_id = request.POST.get("orderItemId")
-    order_item = get_object_or_404(OrderItem, pk=order_item_id)
-    order_item.quantity = quantity
-    order_item.save()
-    # save order to update modified date field
-    order_item.order.save()
+    try:
+        quantity = int(request.POST.get("quantity"))
+        order_item_id = int(request.POST.get("orderItemId"))
+    except (TypeError, ValueError):
+        return redirect("order:cart")
+    get_cart_store().set_quantity(request, order_item_id, quantity)
     return redirect("order:cart")
 
 
@@ -223,15 +313,13 @@ def checkout(request):
     stripe_publishable_key = settings.STRIPE_PUBLISHABLE_KEY
     # to catch a case when user visits checkout page without visiting main page
     try:
-        customer = get_customer_or_guest(request)
-    except:
+        # guests' carts kept in the cache are written to an order here
+        order = get_cart_store().flush(request)
+    except NoCart:
         return redirect("store:products")
-    # order query set
-    order_qs = Order.objects.filter(customer=customer, complete=False)
     # if order exists, get all order items
-    if order_qs.exists():
-        order = order_qs[0]
-        order_items = OrderItem.objects.filter(order=order)
+    if order is not None:
+        order_items = OrderItem.objects.filter(order=order).with_product_info()
         # coupon form
         coupon_form = CouponApplyForm()
 
@@ -250,6 +338,14 @@ def checkout(request):
     return render(request, "order/checkout.html", context=context)
 
 
+def flush_cart(request):
+    """Write a cart changed since the checkout page was shown to its order"""
+    try:
+        get_cart_store().flush(request)
+    except NoCart:
+        pass
+
+
 @require_POST
 def cash_checkout(request, pk):
     """
@@ -266,6 +362,7 @@ def cash_checkout(request, pk):
             validation_error = key.upper() + " " + value[0]
             errors.append(validation_error)
 
+    flush_cart(request)
     order = get_object_or_404(Order, transaction_id=pk)
     order.payment_method = "cash"
     # load data from POST to check delivery method
@@ -352,6 +449,7 @@ def create_checkout_session(request, pk):
             validation_error = key.upper() + " " + value[0]
             errors.append(validation_error)
 
+    flush_cart(request)
     # get order by transaction_id
     order = get_object_or_404(Order, transaction_id=pk)
     # change order payment method to Online
@@ -431,7 +529,7 @@ def create_checkout_session(request, pk):
     else:
         coupon_id = None
 
-    order_items = OrderItem.objects.filter(order=order)
+    order_items = OrderItem.objects.filter(order=order).with_product_info()
     if order_items.exists():
         # array consisting of products that will be displayed in stripe payment page
         line_items = []
@@ -1,30 +1,49 @@
-// Actions when add to cart button is clicked
-$(document).on("click", ".js-add", function () {
-  var closestDiv = $(this).closest(".individual-container");
-  var size = closestDiv.find("input[name='size']:checked").val();
-  var quantity = closestDiv.find("input[name='quantity']").val();
+// Clicks on add to cart are queued and sent together to the cart batch
+// endpoint once the clicking pauses
+var cartOperations = [];
+var cartTimer = null;
+
+function sendCartOperations() {
+  var operations = cartOperations;
+  cartOperations = [];
   $.ajax({
     headers: {
       "Content-Type": "application/json",
       "X-CSRFToken": csrftoken,
     },
     type: "POST",
-    url: $(this).closest(".individual-container").find("form").attr("action"),
-    data: JSON.stringify({ size: size, quantity: quantity }),
+    url: $(".cart-count").data("batch-url"),
+    data: JSON.stringify({ operations: operations }),
     success: function (data) {
       // substitute cart total with received data
       $(document).find(".cart-count").text(data.cart_total);
-      // animation on successful addition to cart
-      var addToCart = closestDiv.find(".js-add");
-      addToCart.addClass("animate-bounce");
-      setTimeout(function () {
-        addToCart.removeClass("animate-bounce");
-      }, 500);
-
-      // reset input field
-      closestDiv.find("input[name='quantity']").val("1");
     },
   });
+}
+
+// Actions when add to cart button is clicked
+$(document).on("click", ".js-add", function () {
+  var closestDiv = $(this).closest(".individual-container");
+  var size = closestDiv.find("input[name='size']:checked").val();
+  var quantity = closestDiv.find("input[name='quantity']").val();
+  cartOperations.push({
+    op: "add",
+    product: closestDiv.find("form").data("product"),
+    size: size,
+    quantity: quantity,
+  });
+  clearTimeout(cartTimer);
+  cartTimer = setTimeout(sendCartOperations, 300);
+
+  // animation on addition to cart
+  var addToCart = closestDiv.find(".js-add");
+  addToCart.addClass("animate-bounce");
+  setTimeout(function () {
+    addToCart.removeClass("animate-bounce");
+  }, 500);
+
+  // reset input field
+  closestDiv.find("input[name='quantity']").val("1");
 });
 // Listen to the change in radio buttons and hide/show prices accordingly
 $("input:radio").change(function () {
@@ -61,3 +80,22 @@ $(".decrement").click(function () {
     quantityInput.val(inputValue);
   }
 });
+
+// search suggestions while typing in the products search box
+var searchInput = $("input[data-autocomplete-url]");
+var autocompleteTimer = null;
+searchInput.on("input", function () {
+  var query = $(this).val().trim();
+  var url = $(this).data("autocomplete-url");
+  clearTimeout(autocompleteTimer);
+  if (query.length < 2) return;
+  // wait for a pause in typing before asking the server
+  autocompleteTimer = setTimeout(function () {
+    $.getJSON(url, { q: query }, function (data) {
+      var suggestions = $("#product-suggestions").empty();
+      data.results.forEach(function (product) {
+        suggestions.append($("<option>").attr("value", product.name));
+      });
+    });
+  }, 150);
+});
@@ -1,5 +1,12 @@
 from django.contrib import admin
-from .models import Product, Size, ProductVariant, Category
+from .models import (
+    Product,
+    Size,
+    ProductVariant,
+    Category,
+    ProductPopularity,
+    ProductRecommendation,
+)
 
 # Register your models here.
 
@@ -13,8 +20,46 @@ class ProductAdmin(admin.ModelAdmin):
     readonly_fields = ["image_tag"]
     inlines = [ProductVariantsInline]
 
+    def get_queryset(self, request):
+        # has_variants column is read from the annotated variant count
+        return super().get_queryset(request).with_variant_info()
+
+
+class CategoryAdmin(admin.ModelAdmin):
+    list_display = ("name", "slug")
+    prepopulated_fields = {"slug": ("name",)}
+
+
+class ProductPopularityAdmin(admin.ModelAdmin):
+    """Read only, the table is written by the refresh_popularity command"""
+
+    list_display = ("product", "units_7d", "units_30d", "updated_at")
+    ordering = ("-units_7d", "-units_30d")
+    list_select_related = ("product",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+class ProductRecommendationAdmin(admin.ModelAdmin):
+    """Read only, the table is written by the refresh_recommendations command"""
+
+    list_display = ("product", "recommended", "score", "rank")
+    list_select_related = ("product", "recommended")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
 
 admin.site.register(Product, ProductAdmin)
 admin.site.register(Size)
-admin.site.register(Category)
+admin.site.register(Category, CategoryAdmin)
 admin.site.register(ProductVariant)
+admin.site.register(ProductPopularity, ProductPopularityAdmin)
+admin.site.register(ProductRecommendation, ProductRecommendationAdmin)
@@ -0,0 +1,77 @@
+"""
+In-memory prefix index for search autocomplete.
+
+The index is built from a catalog snapshot (see CatalogSnapshot.autocomplete)
+and lives as long as the snapshot does, so it is rebuilt whenever the
+catalog changes and lookups never touch the database. Keys are kept in
+sorted lists and prefixes are found with a binary search.
+"""
+
+import bisect
+
+from .search import normalize
+
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 20
+
+
+def _word_suffixes(text):
+    """'ham and cheese' -> ['and cheese', 'cheese']"""
+    words = text.split(" ")
+    return [" ".join(words[index:]) for index in range(1, len(words))]
+
+
+class PrefixIndex:
+    """
+    Two sorted lists of (key, position) pairs: one with the whole product
+    names, one with the later words of the names and with variant titles.
+    Matches on the start of a name come first, then word matches, each
+    group in catalog order.
+    """
+
+    def __init__(self, products):
+        self.products = tuple(products)
+        names, words = [], []
+        for position, product in enumerate(self.products):
+            name = normalize(product.name)
+            if not name:
+                continue
+            names.append((name, position))
+            keys = set(_word_suffixes(name))
+            for variant in product.variants:
+                title = normalize(variant.title)
+                if title and title != name:
+                    keys.add(title)
+                    keys.update(_word_suffixes(title))
+            keys.discard(name)
+            words.extend((key, position) for key in keys)
+        self.names = sorted(names)
+        self.words = sorted(words)
+
+    def __len__(self):
+        return len(self.names) + len(self.words)
+
+    @staticmethod
+    def _positions(keys, prefix):
+        start = bisect.bisect_left(keys, (prefix,))
+        positions = []
+        for key, position in keys[start:]:
+            if not key.startswith(prefix):
+                break
+            positions.append(position)
+        return sorted(positions)
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """Products with a name or variant title starting with the query"""
+        prefix = normalize(query)
+        if not prefix or limit < 1:
+            return []
+        results, seen = [], set()
+        for keys in (self.names, self.words):
+            for position in self._positions(keys, prefix):
+                if position not in seen:
+                    seen.add(position)
+                    results.append(self.products[position])
+                    if len(results) == limit:
+                        return results
+        return results
@@ -0,0 +1,334 @@
+"""
+In-process catalog snapshot.
+
+Menu pages read products, variants, sizes and prices from a snapshot
+that is built once and kept in memory, so rendering them does not hit
+the database. The snapshot is tagged with a catalog version stored in
+the Django cache; saving or deleting catalog models bumps the version
+(see store/signals.py) and the next request rebuilds the snapshot. Every
+worker process has a snapshot of its own and learns about changes only
+through the version, so with several workers the cache must be shared
+by all of them (CACHE_URL, the default local-memory cache is per
+process). The
+product popularity ranking and the "frequently bought together"
+recommendations are part of the snapshot too, they are invalidated by
+the refresh_popularity and refresh_recommendations commands when they
+change.
+"""
+
+import json
+import threading
+import uuid
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.functional import cached_property
+
+from .autocomplete import PrefixIndex
+from .facets import FacetIndex
+from .models import (
+    Category,
+    Product,
+    ProductPopularity,
+    ProductRecommendation,
+    Size,
+)
+
+CATALOG_VERSION_KEY = "store:catalog-version"
+
+_lock = threading.Lock()
+_snapshot = None
+
+
+class VariantEntry:
+    """Read model of a ProductVariant"""
+
+    __slots__ = ("id", "title", "size", "price")
+
+    def __init__(self, id, title, size, price):
+        self.id = id
+        self.title = title
+        # size name as a string, the same way it renders in templates
+        self.size = size
+        self.price = price
+
+    def __str__(self):
+        return f"{self.title} - price: ${self.price}"
+
+
+class CategoryEntry:
+    """Read model of a Category"""
+
+    __slots__ = ("id", "name", "slug")
+
+    def __init__(self, id, name, slug):
+        self.id = id
+        self.name = name
+        self.slug = slug
+
+    def __str__(self):
+        return self.name
+
+
+class ProductEntry:
+    """
+    Read model of a Product. Attribute names follow the Product model,
+    so templates can render either of them
+    """
+
+    __slots__ = (
+        "id",
+        "name",
+        "price",
+        "desc",
+        "image_url",
+        "image_renditions",
+        "category_id",
+        "category_name",
+        "variants",
+        "updated_at",
+    )
+
+    def __init__(
+        self,
+        id,
+        name,
+        price,
+        desc,
+        image_url,
+        image_renditions,
+        category_id,
+        category_name,
+        variants,
+        updated_at,
+    ):
+        self.id = id
+        self.name = name
+        self.price = price
+        self.desc = desc
+        self.image_url = image_url
+        self.image_renditions = image_renditions
+        self.category_id = category_id
+        self.category_name = category_name
+        self.variants = variants
+        self.updated_at = updated_at
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def sort_key(self):
+        """Catalog order: by category, products without one first, then by id"""
+        return (self.category_id or 0, str(self.id))
+
+    @property
+    def get_product_variants(self):
+        return self.variants
+
+    @property
+    def has_variants(self):
+        return len(self.variants) > 0
+
+
+class CatalogSnapshot:
+    """Immutable view of the whole catalog at a given version"""
+
+    def __init__(
+        self,
+        version,
+        products,
+        categories,
+        popular_ids=(),
+        sizes=(),
+        recommendations=(),
+    ):
+        self.version = version
+        # products in catalog order
+        self.products = tuple(sorted(products, key=lambda product: product.sort_key))
+        self.categories = tuple(categories)
+        # size names
+        self.sizes = tuple(sizes)
+        self.by_id = {product.id: product for product in self.products}
+        # best sellers first, see store.models.ProductPopularity
+        self.popular = tuple(self.by_id[pk] for pk in popular_ids if pk in self.by_id)
+        # product id -> ((product, score), ...) best first,
+        # see store.models.ProductRecommendation
+        self.recommendations = {}
+        for product_id, recommended_id, score in recommendations:
+            if product_id in self.by_id and recommended_id in self.by_id:
+                self.recommendations.setdefault(product_id, []).append(
+                    (self.by_id[recommended_id], score)
+                )
+        self.categories_by_id = {category.id: category for category in self.categories}
+        # slug -> category id map used for category page routing
+        self.category_ids = {category.slug: category.id for category in self.categories}
+        self.by_category = {category.id: [] for category in self.categories}
+        # (product id, size name) -> (variant id, price), used by add to cart
+        self.variants_by_size = {}
+        for product in self.products:
+            if product.category_id is not None:
+                self.by_category[product.category_id].append(product)
+            for variant in product.variants:
+                self.variants_by_size[product.id, variant.size] = (
+                    variant.id,
+                    variant.price,
+                )
+
+    def __len__(self):
+        return len(self.products)
+
+    def get(self, product_id):
+        return self.by_id.get(product_id)
+
+    def get_category(self, slug):
+        """Category with the given slug or None"""
+        return self.categories_by_id.get(self.category_ids.get(slug))
+
+    def products_in_category(self, category_id):
+        return self.by_category.get(category_id, [])
+
+    @cached_property
+    def products_by_popularity(self):
+        """Best sellers first, then products without recent sales in catalog order"""
+        popular = set(self.popular)
+        return self.popular + tuple(
+            product for product in self.products if product not in popular
+        )
+
+    def resolve_variant(self, product_id, size):
+        """(variant id, price) of a product in the given size name or None"""
+        return self.variants_by_size.get((product_id, size))
+
+    def recommend(self, product_ids, limit):
+        """
+        Products frequently bought together with the given ones, best
+        first. Scores of products recommended for several of them add up.
+        """
+        product_ids = set(product_ids)
+        scores = {}
+        for product_id in product_ids:
+            for product, score in self.recommendations.get(product_id, ()):
+                if product.id not in product_ids:
+                    scores[product] = scores.get(product, 0) + score
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0].sort_key))
+        return [product for product, score in ranked[:limit]]
+
+    @cached_property
+    def autocomplete(self):
+        """Prefix index of product names and variant titles"""
+        return PrefixIndex(self.products)
+
+    @cached_property
+    def facets(self):
+        """Category, size and price band bitsets of the products"""
+        return FacetIndex(self.products, self.categories, self.sizes)
+
+    @cached_property
+    def menu_json(self):
+        """The catalog as JSON for the menu API, serialized once per version"""
+        slugs = {category.id: category.slug for category in self.categories}
+        menu = {
+            "version": self.version,
+            "categories": [
+                {"id": category.id, "name": category.name, "slug": category.slug}
+                for category in self.categories
+            ],
+            "products": [
+                {
+                    "id": product.id,
+                    "name": product.name,
+                    "description": product.desc,
+                    "category": slugs.get(product.category_id),
+                    "price": product.price,
+                    "image": product.image_url,
+                    "variants": [
+                        {
+                            "id": variant.id,
+                            "title": variant.title,
+                            "size": variant.size,
+                            "price": variant.price,
+                        }
+                        for variant in product.variants
+                    ],
+                }
+                for product in self.products
+            ],
+        }
+        return json.dumps(menu, cls=DjangoJSONEncoder).encode()
+
+
+def get_catalog_version():
+    """Current catalog version, a new one is issued if the cache has none"""
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # add() keeps a version issued concurrently by another worker
+        cache.add(CATALOG_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def invalidate_catalog():
+    """Issue a new catalog version and drop the local snapshot"""
+    global _snapshot
+    cache.set(CATALOG_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+    _snapshot = None
+
+
+def build_catalog(version):
+    """Load the catalog from the database into read models"""
+    products = []
+    queryset = Product.objects.with_variant_info().select_related("product_category")
+    for product in queryset:
+        category = product.product_category
+        variants = tuple(
+            VariantEntry(
+                id=variant.id,
+                title=variant.title,
+                size=str(variant.size),
+                price=variant.price,
+            )
+            for variant in product.get_product_variants
+        )
+        products.append(
+            ProductEntry(
+                id=product.id,
+                name=product.name,
+                price=product.price,
+                desc=product.desc,
+                image_url=product.image_url,
+                image_renditions=product.image_renditions,
+                category_id=product.product_category_id,
+                category_name=category.name if category else None,
+                variants=variants,
+                updated_at=product.updated_at,
+            )
+        )
+
+    categories = [
+        CategoryEntry(id=category.id, name=category.name, slug=category.slug)
+        for category in Category.objects.order_by("name")
+    ]
+    popular_ids = ProductPopularity.objects.order_by(
+        "-units_7d", "-units_30d"
+    ).values_list("product_id", flat=True)
+    sizes = Size.objects.order_by("id").values_list("name", flat=True)
+    recommendations = ProductRecommendation.objects.order_by("rank").values_list(
+        "product_id", "recommended_id", "score"
+    )
+    return CatalogSnapshot(
+        version, products, categories, popular_ids, sizes, recommendations
+    )
+
+
+def get_catalog():
+    """Return the catalog snapshot, rebuilding it if the version moved on"""
+    global _snapshot
+    version = get_catalog_version()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+    with _lock:
+        # another thread may have rebuilt it while we were waiting
+        if _snapshot is None or _snapshot.version != version:
+            _snapshot = build_catalog(version)
+        return _snapshot
@@ -1,27 +1,7 @@
-from order.models import Order
-from users.models import Customer
+from .catalog import get_catalog
 
-# to display number of items in the cart in the Navbar of the base.html
+# categories for the Menu dropdown in the Navbar of the base.html
 
 
-def get_cart_quantity(request):
-    if request.user.is_authenticated:
-        try:
-            customer = request.user.customer
-        except:
-            number_of_items = 0
-    else:
-        try:
-            # create customer assigning device cookie
-            customer, created = Customer.objects.get_or_create(
-                device=request.COOKIES["device"]
-            )
-        except:
-            number_of_items = 0
-    try:
-        customer_order = Order.objects.filter(customer=customer, complete=False)[0]
-        number_of_items = customer_order.get_cart_items
-    except:
-        number_of_items = 0
-
-    return {"cart_quantity": number_of_items}
+def get_menu_categories(request):
+    return {"menu_categories": get_catalog().categories}
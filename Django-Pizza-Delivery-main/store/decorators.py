@@ -0,0 +1,76 @@
+"""
+Full-page cache of catalog pages for guests.
+
+Product and category pages are the same for every guest: the cart badge
+is filled in by JavaScript (see order.views.cart_count) and the CSRF
+token is read from a cookie. Their HTML is cached under the catalog
+version, so any change to the catalog makes new pages. Only the query
+parameters a view reads are part of the key, requests with others are
+not cached, so arbitrary query strings can not fill the cache.
+"""
+
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.http import urlencode
+
+from .catalog import get_catalog_version
+
+
+def page_cache_key(request, params=()):
+    """
+    Cache key of the page of a request, None when the query string has
+    parameters other than params
+    """
+    if not set(request.GET).issubset(params):
+        return None
+    # parameters in any order are the same page
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    path = hashlib.md5(f"{request.path}?{query}".encode()).hexdigest()
+    return f"store:page:{get_catalog_version()}:{path}"
+
+
+def cache_for_guests(params=()):
+    """
+    Serve guests' GET requests from the cache for
+    settings.STORE_GUEST_PAGE_CACHE seconds, 0 turns the cache off.
+    params are the query parameters the view reads
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            timeout = settings.STORE_GUEST_PAGE_CACHE
+            if (
+                not timeout
+                or request.method not in ("GET", "HEAD")
+                or request.user.is_authenticated
+                # pending messages are rendered into the page
+                or len(get_messages(request))
+            ):
+                return view(request, *args, **kwargs)
+
+            key = page_cache_key(request, params)
+            if key is None:
+                return view(request, *args, **kwargs)
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                return HttpResponse(content, content_type=content_type)
+
+            response = view(request, *args, **kwargs)
+            # only plain pages without cookies of the visitor are shared
+            if response.status_code == 200 and not response.streaming:
+                if not response.cookies:
+                    cache.set(
+                        key, (response.content, response["Content-Type"]), timeout
+                    )
+            return response
+
+        return wrapper
+
+    return decorator
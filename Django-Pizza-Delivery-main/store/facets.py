@@ -0,0 +1,155 @@
+"""
+Faceted filtering of the catalog by category, size and price band.
+
+For every facet option the index keeps a posting list of the products
+having it, stored as a bitset in a Python int (bit i is the i-th product
+of the catalog). Filtering and counting are bitwise ANDs and popcounts,
+so they need no queries. The index is built from a catalog snapshot
+(see CatalogSnapshot.facets) and rebuilt with it.
+
+Options of one facet are ORed and facets are ANDed. The count next to an
+option is the number of products the listing would have if the option
+was added to the current selection, it ignores the other selected options
+of the same facet (disjunctive counts).
+"""
+
+from decimal import Decimal
+
+# value, label, lower bound (included), upper bound (excluded)
+PRICE_BANDS = (
+    ("under-10", "Under $10", None, Decimal("10")),
+    ("10-20", "$10 - $20", Decimal("10"), Decimal("20")),
+    ("20-plus", "$20 and more", Decimal("20"), None),
+)
+
+# facet name = query parameter
+FACETS = ("category", "size", "price")
+
+
+def price_band(price):
+    for value, label, low, high in PRICE_BANDS:
+        if (low is None or price >= low) and (high is None or price < high):
+            return value
+
+
+class FacetOption:
+    __slots__ = ("value", "label", "count", "selected")
+
+    def __init__(self, value, label, count, selected):
+        self.value = value
+        self.label = label
+        self.count = count
+        self.selected = selected
+
+
+class Facet:
+    __slots__ = ("name", "label", "options")
+
+    def __init__(self, name, label, options):
+        self.name = name
+        self.label = label
+        self.options = options
+
+    @property
+    def selected(self):
+        return any(option.selected for option in self.options)
+
+
+class FacetIndex:
+    """Bitset posting lists of all facet options of a list of products"""
+
+    def __init__(self, products, categories, sizes):
+        self.products = tuple(products)
+        self.positions = {product.id: i for i, product in enumerate(self.products)}
+        self.all = (1 << len(self.products)) - 1
+        # facet -> [(value, label)] in display order
+        self.labels = {
+            "category": [(category.slug, category.name) for category in categories],
+            "size": [(size, size) for size in sizes],
+            "price": [(value, label) for value, label, low, high in PRICE_BANDS],
+        }
+        # facet -> value -> bitset
+        self.postings = {
+            facet: dict.fromkeys((value for value, label in labels), 0)
+            for facet, labels in self.labels.items()
+        }
+        slugs = {category.id: category.slug for category in categories}
+
+        for i, product in enumerate(self.products):
+            bit = 1 << i
+            self._add("category", slugs.get(product.category_id), bit)
+            # a product is in every band one of its sizes is priced in
+            prices = [variant.price for variant in product.variants]
+            if not prices and product.price is not None:
+                prices = [product.price]
+            for price in prices:
+                self._add("price", price_band(price), bit)
+            for variant in product.variants:
+                self._add("size", variant.size, bit)
+
+    def _add(self, facet, value, bit):
+        if value is not None:
+            postings = self.postings[facet]
+            postings[value] = postings.get(value, 0) | bit
+
+    def bits_of(self, products):
+        """Bitset of a list of products, e.g. search results"""
+        bits = 0
+        for product in products:
+            position = self.positions.get(product.id)
+            if position is not None:
+                bits |= 1 << position
+        return bits
+
+    def contains(self, bits, product):
+        position = self.positions.get(product.id)
+        return position is not None and bool(bits >> position & 1)
+
+    def _facet_bits(self, facet, values):
+        """Products having any of the values, every product without a selection"""
+        postings = self.postings[facet]
+        values = [value for value in values if value in postings]
+        if not values:
+            return self.all
+        bits = 0
+        for value in values:
+            bits |= postings[value]
+        return bits
+
+    def apply(self, selected, base=None):
+        """
+        Filter by the selected {facet: [values]} within the base bitset
+        (all products by default). Return the bitset of matching products
+        and the facets with their option counts.
+        """
+        base = self.all if base is None else base
+        facet_bits = {
+            facet: self._facet_bits(facet, selected.get(facet, ())) for facet in FACETS
+        }
+        result = base
+        for bits in facet_bits.values():
+            result &= bits
+
+        facets = []
+        for facet in FACETS:
+            # products matching the selections of the other facets
+            others = base
+            for other, bits in facet_bits.items():
+                if other != facet:
+                    others &= bits
+            chosen = set(selected.get(facet, ()))
+            options = [
+                FacetOption(
+                    value,
+                    label,
+                    (self.postings[facet][value] & others).bit_count(),
+                    value in chosen,
+                )
+                for value, label in self.labels[facet]
+            ]
+            facets.append(Facet(facet, facet.capitalize(), options))
+        return result, facets
+
+    def filter(self, products, bits):
+        """Products of a list that are in the bitset, in the list's order"""
+        return [product for product in products if self.contains(bits, product)]
@@ -0,0 +1,183 @@
+"""
+Resized, recompressed renditions of product images.
+
+Uploaded images are used as they are, some of them are several
+megabytes. After a product image is saved, renditions for every
+display size are written next to it in WebP with a JPEG fallback. The
+work runs in a thread pool after the transaction commits, so it never
+delays the request that uploaded the image. Until the renditions exist
+templates keep showing the original image.
+"""
+
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.utils import timezone
+from django.utils.html import format_html, format_html_join
+from PIL import Image, ImageOps
+
+from .catalog import invalidate_catalog
+from .models import Product
+
+# rendition name -> maximum width in pixels
+RENDITIONS = {
+    "thumb": 100,
+    "card": 480,
+    "full": 1200,
+}
+
+RENDITIONS_DIR = "renditions"
+
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.STORE_IMAGE_WORKERS,
+            thread_name_prefix="product-images",
+        )
+    return _executor
+
+
+def rendition_name(image_name, rendition, extension):
+    """images/pizza.png -> images/renditions/pizza-card.webp"""
+    directory, filename = os.path.split(image_name)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, RENDITIONS_DIR, f"{stem}-{rendition}.{extension}")
+
+
+def _save(storage, name, image, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, **options)
+    if storage.exists(name):
+        storage.delete(name)
+    return storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def create_renditions(image_field):
+    """
+    Write all renditions of an image and return their description:
+    {"source": name, "thumb": {"width": 100, "webp": name, "jpeg": name}, ...}
+    """
+    storage = image_field.storage
+    with storage.open(image_field.name) as file:
+        original = ImageOps.exif_transpose(Image.open(file))
+        original.load()
+
+    has_alpha = original.mode in ("RGBA", "LA") or "transparency" in original.info
+    original = original.convert("RGBA" if has_alpha else "RGB")
+    if has_alpha:
+        # JPEG has no transparency, flatten it on white
+        flat = Image.new("RGB", original.size, "white")
+        flat.paste(original, mask=original.getchannel("A"))
+    else:
+        flat = original
+
+    renditions = {"source": image_field.name}
+    for rendition, max_width in RENDITIONS.items():
+        # never upscale, small originals are only recompressed
+        width = min(max_width, original.width)
+        height = max(round(original.height * width / original.width), 1)
+        size = (width, height)
+        webp = _save(
+            storage,
+            rendition_name(image_field.name, rendition, "webp"),
+            original.resize(size, Image.LANCZOS),
+            format="WEBP",
+            quality=WEBP_QUALITY,
+            method=6,
+        )
+        jpeg = _save(
+            storage,
+            rendition_name(image_field.name, rendition, "jpg"),
+            flat.resize(size, Image.LANCZOS),
+            format="JPEG",
+            quality=JPEG_QUALITY,
+            optimize=True,
+            progressive=True,
+        )
+        renditions[rendition] = {"width": width, "webp": webp, "jpeg": jpeg}
+    return renditions
+
+
+def generate_product_renditions(product_id):
+    """Create renditions for the current image of a product (worker task)"""
+    try:
+        product = Product.objects.filter(pk=product_id).first()
+        if product is None or not product.image:
+            return
+        renditions = create_renditions(product.image)
+        # skip the update if the image was replaced in the meantime
+        updated = Product.objects.filter(
+            pk=product_id, image=product.image.name
+        ).update(image_renditions=renditions, updated_at=timezone.now())
+        if updated:
+            # queryset updates send no signals
+            invalidate_catalog()
+    except Exception:
+        logger.exception("Could not create image renditions of product %s", product_id)
+    finally:
+        # worker threads must not keep their database connections open
+        connections.close_all()
+
+
+def schedule_product_renditions(product):
+    """Generate renditions in the worker pool once the upload is committed"""
+    product_id = product.pk
+    transaction.on_commit(
+        lambda: get_executor().submit(generate_product_renditions, product_id)
+    )
+
+
+def _srcset(renditions, extension):
+    # renditions of small originals share a width, list each width once
+    widths = {}
+    for rendition in RENDITIONS:
+        if rendition in renditions:
+            entry = renditions[rendition]
+            widths.setdefault(entry["width"], default_storage.url(entry[extension]))
+    return ", ".join(f"{url} {width}w" for width, url in sorted(widths.items()))
+
+
+def picture_html(product, rendition="card", sizes=None, **attrs):
+    """
+    <picture> markup for a product image: WebP and JPEG srcsets of all
+    renditions, 'sizes' telling the browser which one fits, and lazy
+    loading. Falls back to the original image until renditions exist.
+    Works with Product instances and catalog ProductEntry read models.
+    """
+    if not product.image_url:
+        return ""
+    attrs = {"alt": "", "loading": "lazy", "decoding": "async", **attrs}
+    renditions = product.image_renditions or {}
+    if rendition not in renditions:
+        return format_html(
+            '<img src="{}"{} />',
+            product.image_url,
+            format_html_join("", ' {}="{}"', attrs.items()),
+        )
+    if sizes is None:
+        sizes = f"{renditions[rendition]['width']}px"
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}" />'
+        '<img src="{}" srcset="{}" sizes="{}"{} /></picture>',
+        _srcset(renditions, "webp"),
+        sizes,
+        default_storage.url(renditions[rendition]["jpeg"]),
+        _srcset(renditions, "jpeg"),
+        sizes,
+        format_html_join("", ' {}="{}"', attrs.items()),
+    )
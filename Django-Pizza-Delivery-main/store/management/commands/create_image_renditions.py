@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from store.models import Product
+from store.images import generate_product_renditions
+
+
+class Command(BaseCommand):
+    help = "Create resized image renditions for products uploaded before they existed"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all", action="store_true", help="recreate existing renditions too"
+        )
+
+    def handle(self, *args, **options):
+        products = Product.objects.exclude(image="")
+        if not options["all"]:
+            products = products.filter(image_renditions={})
+        count = 0
+        for product_id in products.values_list("id", flat=True):
+            generate_product_renditions(product_id)
+            count += 1
+        self.stdout.write(f"Created renditions for {count} product(s)")
@@ -0,0 +1,26 @@
+import sys
+
+from django.core.management.base import BaseCommand
+from store.menu_io import FORMATS, export_records, format_of, write_menu
+
+
+class Command(BaseCommand):
+    help = "Write the whole catalog as a CSV or JSON lines menu file for import_menu"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path", nargs="?", default="-", help="default: standard output"
+        )
+        parser.add_argument(
+            "--format", choices=FORMATS, help="default: from the file extension"
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        format = options["format"] or format_of(path)
+        if path == "-":
+            count = write_menu(self.stdout, format, export_records())
+            return
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            count = write_menu(file, format, export_records())
+        self.stderr.write(f"Exported {count} product(s) to {path}")
@@ -0,0 +1,55 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from store.menu_io import (
+    BATCH_SIZE,
+    FORMATS,
+    MenuFileError,
+    MenuImporter,
+    format_of,
+    read_menu,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Create or update categories, sizes, products and variants from a "
+        "CSV or JSON lines menu file, in batches of bulk upserts"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="menu file, '-' reads standard input")
+        parser.add_argument(
+            "--format", choices=FORMATS, help="default: from the file extension"
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help="products written per transaction",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="only print what would change",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        format = options["format"] or format_of(path)
+        importer = MenuImporter(options["dry_run"], options["batch_size"])
+        try:
+            if path == "-":
+                counts = importer.run(read_menu(sys.stdin, format))
+            else:
+                with open(path, newline="", encoding="utf-8") as file:
+                    counts = importer.run(read_menu(file, format))
+        except (OSError, MenuFileError) as error:
+            raise CommandError(error)
+
+        if options["dry_run"] or options["verbosity"] > 1:
+            for change in importer.changes:
+                self.stdout.write(change)
+        summary = ", ".join(f"{count} {kind}" for kind, count in counts.items())
+        prefix = "Would change" if options["dry_run"] else "Changed"
+        self.stdout.write(f"{prefix} {summary}")
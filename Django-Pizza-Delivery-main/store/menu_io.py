@@ -0,0 +1,400 @@
+"""
+Bulk import and export of the menu (see the import_menu and export_menu
+commands).
+
+A menu file lists products with their category and variants, either as
+CSV with one row per variant (consecutive rows of a product are merged)
+or as JSON lines with one product per line:
+
+    {"name": "Margherita", "category": "Pizza", "description": "...",
+     "price": null, "variants": [{"size": "Large", "title": "...", "price": "14.00"}]}
+
+Files are read as a stream and written in batches, each batch in one
+transaction with bulk upserts. Products are matched by their "id" when the
+file has one, by name otherwise, records of the same product in a batch
+are merged. Only rows that differ from the database are written; products, variants, categories and sizes missing from the
+file are kept.
+"""
+
+import csv
+import itertools
+import json
+import uuid
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .catalog import invalidate_catalog
+from .models import Category, Product, ProductVariant, Size, unique_slug
+
+FORMATS = ("csv", "jsonl")
+
+CSV_FIELDS = [
+    "id",
+    "name",
+    "category",
+    "description",
+    "price",
+    "size",
+    "variant_title",
+    "variant_price",
+]
+
+BATCH_SIZE = 200
+
+# sent with the ids of the products written by an import batch, inside its
+# transaction: bulk writes send no post_save for receivers depending on prices
+products_imported = Signal()
+
+
+class MenuFileError(ValueError):
+    """Invalid record in a menu file"""
+
+
+def format_of(path, default="csv"):
+    extension = str(path).rsplit(".", 1)[-1].lower()
+    return extension if extension in FORMATS else default
+
+
+def _decimal(value, line):
+    if value is None or value == "":
+        return None
+    try:
+        return Decimal(str(value)).quantize(Decimal("0.01"))
+    except InvalidOperation:
+        raise MenuFileError(f"line {line}: invalid price {value!r}")
+
+
+def _product_record(data, line):
+    name = (data.get("name") or "").strip()
+    if not name:
+        raise MenuFileError(f"line {line}: product without a name")
+    product_id = data.get("id") or None
+    if product_id:
+        try:
+            product_id = uuid.UUID(str(product_id))
+        except ValueError:
+            raise MenuFileError(f"line {line}: invalid id {product_id!r}")
+    return {
+        "line": line,
+        "id": product_id,
+        "name": name,
+        "category": (data.get("category") or "").strip() or None,
+        "description": data.get("description") or None,
+        "price": _decimal(data.get("price"), line),
+        "variants": [],
+    }
+
+
+def _variant_record(size, title, price, line):
+    size = (size or "").strip()
+    if not size:
+        raise MenuFileError(f"line {line}: variant without a size")
+    price = _decimal(price, line)
+    if price is None:
+        raise MenuFileError(f"line {line}: variant without a price")
+    return {"size": size, "title": title or None, "price": price}
+
+
+def read_jsonl(file):
+    for line, text in enumerate(file, start=1):
+        if not text.strip():
+            continue
+        try:
+            data = json.loads(text)
+        except ValueError:
+            raise MenuFileError(f"line {line}: invalid JSON")
+        record = _product_record(data, line)
+        for variant in data.get("variants") or []:
+            record["variants"].append(
+                _variant_record(
+                    variant.get("size"),
+                    variant.get("title"),
+                    variant.get("price"),
+                    line,
+                )
+            )
+        yield record
+
+
+def read_csv(file):
+    rows = csv.DictReader(file)
+    # header is line 1
+    numbered = enumerate(rows, start=2)
+    key = lambda item: (item[1].get("id") or "", (item[1].get("name") or "").strip())
+    for _, group in itertools.groupby(numbered, key=key):
+        group = list(group)
+        line, first = group[0]
+        record = _product_record(first, line)
+        for line, row in group:
+            if row.get("size"):
+                record["variants"].append(
+                    _variant_record(
+                        row["size"],
+                        row.get("variant_title"),
+                        row["variant_price"],
+                        line,
+                    )
+                )
+        yield record
+
+
+def read_menu(file, format):
+    """Stream product records of a menu file"""
+    return read_csv(file) if format == "csv" else read_jsonl(file)
+
+
+def merge_record(record, other):
+    """Merge a later record of the same product, its values and variants win"""
+    for key in ("name", "category", "description", "price"):
+        record[key] = other[key]
+    variants = {variant["size"]: variant for variant in record["variants"]}
+    variants.update((variant["size"], variant) for variant in other["variants"])
+    record["variants"] = list(variants.values())
+
+
+class _New:
+    """Id of a category or size that a dry run would create"""
+
+    def __init__(self, label, name):
+        self.label, self.name = label, name
+
+    def __repr__(self):
+        return f"<new {self.label} {self.name}>"
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+class MenuImporter:
+    """
+    Upsert batches of product records. With dry_run nothing is written,
+    the differences are collected in 'changes' either way.
+    """
+
+    def __init__(self, dry_run=False, batch_size=BATCH_SIZE):
+        self.dry_run = dry_run
+        self.batch_size = batch_size
+        self.changes = []
+        # slugs of the categories, loaded when one is created
+        self.slugs = None
+        self.counts = dict.fromkeys(["categories", "sizes", "products", "variants"], 0)
+
+    def run(self, records):
+        for batch in batched(records, self.batch_size):
+            with transaction.atomic():
+                self.import_batch(batch)
+        return self.counts
+
+    def change(self, kind, text):
+        self.changes.append(text)
+        self.counts[kind] += 1
+
+    def _ensure(self, model, kind, label, names, extra=lambda name: {}):
+        """name -> id of categories or sizes, missing ones are created"""
+        existing = dict(model.objects.filter(name__in=names).values_list("name", "id"))
+        missing = sorted(set(names) - set(existing))
+        for name in missing:
+            self.change(kind, f"+ {label} {name}")
+            if self.dry_run:
+                existing[name] = _New(label, name)
+        if missing and not self.dry_run:
+            # bulk_create skips save(), so category slugs are set here
+            model.objects.bulk_create(
+                [model(name=name, **extra(name)) for name in missing],
+                ignore_conflicts=True,
+            )
+            existing.update(
+                model.objects.filter(name__in=missing).values_list("name", "id")
+            )
+        return existing
+
+    def category_slug(self, name):
+        """Unique slug of a new category, bulk_create skips Category.save()"""
+        if self.slugs is None:
+            self.slugs = set(Category.objects.values_list("slug", flat=True))
+        slug = unique_slug(name, self.slugs)
+        self.slugs.add(slug)
+        return {"slug": slug}
+
+    def import_batch(self, records):
+        categories = self._ensure(
+            Category,
+            "categories",
+            "category",
+            {record["category"] for record in records if record["category"]},
+            extra=self.category_slug,
+        )
+        sizes = self._ensure(
+            Size,
+            "sizes",
+            "size",
+            {variant["size"] for record in records for variant in record["variants"]},
+        )
+
+        # match products by id, then by name
+        ids = [record["id"] for record in records if record["id"]]
+        names = [record["name"] for record in records if not record["id"]]
+        existing = Product.objects.filter(pk__in=ids) | Product.objects.filter(
+            name__in=names
+        )
+        existing = existing.select_related("product_category").prefetch_related(
+            "productvariant_set__size"
+        )
+        by_id = {product.pk: product for product in existing}
+        by_name = {}
+        for product in by_id.values():
+            by_name.setdefault(product.name, product)
+
+        # a product is upserted once per batch, so its records are merged
+        matched = {}
+        for record in records:
+            product = by_id.get(record["id"]) if record["id"] else None
+            product = product or by_name.get(record["name"])
+            key = product.pk if product else record["id"] or record["name"]
+            if key in matched:
+                merge_record(matched[key][1], record)
+            else:
+                matched[key] = (product, dict(record))
+
+        now = timezone.now()
+        products, variants = [], []
+        for product, record in matched.values():
+            product_id = product.pk if product else record["id"] or uuid.uuid4()
+            values = {
+                "name": record["name"],
+                "desc": record["description"],
+                "price": record["price"],
+                "product_category_id": categories.get(record["category"]),
+            }
+            label = record["name"]
+            changed = False
+            if product is None:
+                self.change("products", f"+ product {label}")
+                changed = True
+            else:
+                # empty strings and NULLs are the same in a menu file
+                diff = [
+                    f"{field} {getattr(product, field)!r} -> {value!r}"
+                    for field, value in values.items()
+                    if (getattr(product, field) or None) != (value or None)
+                ]
+                if diff:
+                    self.change("products", f"~ product {label}: {', '.join(diff)}")
+                    changed = True
+
+            current = {}
+            if product is not None:
+                current = {
+                    variant.size.name: variant
+                    for variant in product.productvariant_set.all()
+                }
+            for variant in record["variants"]:
+                old = current.get(variant["size"])
+                # variants without a title in the file keep their title
+                title = variant["title"] or (
+                    old.title if old else f"{record['name']} - {variant['size']}"
+                )
+                text = f"{label} / {variant['size']} {variant['price']}"
+                if old is None:
+                    self.change("variants", f"+ variant {text}")
+                elif old.price != variant["price"] or old.title != title:
+                    self.change("variants", f"~ variant {text}")
+                else:
+                    continue
+                changed = True
+                variants.append(
+                    ProductVariant(
+                        product_id=product_id,
+                        size_id=sizes.get(variant["size"]),
+                        title=title,
+                        price=variant["price"],
+                    )
+                )
+            if changed:
+                # updated_at versions the cached product cards
+                products.append(Product(id=product_id, updated_at=now, **values))
+
+        if self.dry_run or not products:
+            return
+        Product.objects.bulk_create(
+            products,
+            update_conflicts=True,
+            unique_fields=["id"],
+            update_fields=[
+                "name",
+                "desc",
+                "price",
+                "product_category_id",
+                "updated_at",
+            ],
+        )
+        ProductVariant.objects.bulk_create(
+            variants,
+            update_conflicts=True,
+            unique_fields=["product_id", "size_id"],
+            update_fields=["title", "price"],
+        )
+        # bulk writes send no signals
+        products_imported.send(
+            sender=MenuImporter, product_ids=[product.pk for product in products]
+        )
+        transaction.on_commit(invalidate_catalog)
+
+
+def export_records():
+    """Stream product records of the whole catalog"""
+    products = (
+        Product.objects.with_variant_info()
+        .select_related("product_category")
+        .order_by("product_category__name", "name")
+    )
+    for product in products.iterator(chunk_size=BATCH_SIZE):
+        category = product.product_category
+        yield {
+            "id": str(product.pk),
+            "name": product.name,
+            "category": category.name if category else None,
+            "description": product.desc,
+            "price": product.price,
+            "variants": [
+                {
+                    "size": variant.size.name,
+                    "title": variant.title,
+                    "price": variant.price,
+                }
+                for variant in product.get_product_variants
+            ],
+        }
+
+
+def write_menu(file, format, records):
+    """Write product records as CSV or JSON lines, return their number"""
+    count = 0
+    if format == "csv":
+        writer = csv.DictWriter(file, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+    for record in records:
+        count += 1
+        if format == "jsonl":
+            file.write(json.dumps(record, default=str) + "\n")
+            continue
+        row = {key: record[key] for key in ("id", "name", "category", "description")}
+        row["price"] = record["price"]
+        if not record["variants"]:
+            writer.writerow(row)
+        for variant in record["variants"]:
+            writer.writerow(
+                {
+                    **row,
+                    "size": variant["size"],
+                    "variant_title": variant["title"],
+                    "variant_price": variant["price"],
+                }
+            )
+    return count
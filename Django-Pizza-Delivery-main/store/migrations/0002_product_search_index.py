@@ -0,0 +1,81 @@
+from django.db import migrations
+
+# The statements are copied from store/search.py as they were when the
+# index was added, so later changes there do not change this migration.
+# store/signals.py recreates the SQLite triggers after store migrations.
+
+SQLITE_CREATE = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS store_product_fts USING fts5(
+        product_id UNINDEXED, name, "desc",
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS store_product_fts_insert
+    AFTER INSERT ON store_product BEGIN
+        INSERT INTO store_product_fts(product_id, name, "desc")
+        VALUES (new.id, new.name, new."desc");
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS store_product_fts_delete
+    AFTER DELETE ON store_product BEGIN
+        DELETE FROM store_product_fts WHERE product_id = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS store_product_fts_update
+    AFTER UPDATE OF id, name, "desc" ON store_product BEGIN
+        UPDATE store_product_fts SET product_id = new.id, name = new.name,
+        "desc" = new."desc" WHERE product_id = old.id;
+    END""",
+    "DELETE FROM store_product_fts",
+    """INSERT INTO store_product_fts(product_id, name, "desc")
+    SELECT id, name, "desc" FROM store_product""",
+]
+
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS store_product_fts_insert",
+    "DROP TRIGGER IF EXISTS store_product_fts_delete",
+    "DROP TRIGGER IF EXISTS store_product_fts_update",
+    "DROP TABLE IF EXISTS store_product_fts",
+]
+
+PG_CREATE = [
+    "CREATE INDEX IF NOT EXISTS store_product_search_idx ON store_product "
+    "USING GIN ((setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(\"desc\", '')), 'B')))",
+]
+
+PG_DROP = ["DROP INDEX IF EXISTS store_product_search_idx"]
+
+
+def sqlite_has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA compile_options")
+        return "ENABLE_FTS5" in [row[0] for row in cursor.fetchall()]
+
+
+def execute(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement, params=None)
+
+
+def create_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "sqlite" and sqlite_has_fts5(connection):
+        execute(schema_editor, SQLITE_CREATE)
+    elif connection.vendor == "postgresql":
+        execute(schema_editor, PG_CREATE)
+
+
+def drop_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "sqlite":
+        execute(schema_editor, SQLITE_DROP)
+    elif connection.vendor == "postgresql":
+        execute(schema_editor, PG_DROP)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.1.3 on 2026-10-17 02:04
+
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def populate_slugs(apps, schema_editor):
+    # the slug rules of Category.save() when the migration was written
+    Category = apps.get_model("store", "Category")
+    taken = set()
+    for category in Category.objects.order_by("pk"):
+        base = slugify(category.name, allow_unicode=True) or "category"
+        slug, number = base[:20], 1
+        while slug in taken:
+            number += 1
+            suffix = f"-{number}"
+            slug = base[: 20 - len(suffix)] + suffix
+        taken.add(slug)
+        category.slug = slug
+        category.save(update_fields=["slug"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0003_product_updated_at_datetime"),
+    ]
+
+    operations = [
+        # add the column without the unique constraint, fill it, then add it
+        migrations.AddField(
+            model_name="category",
+            name="slug",
+            field=models.SlugField(blank=True, max_length=20, null=True),
+        ),
+        migrations.RunPython(populate_slugs, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="category",
+            name="slug",
+            field=models.SlugField(blank=True, max_length=20, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["product_category", "id"], name="store_product_cat_id_idx"
+            ),
+        ),
+    ]
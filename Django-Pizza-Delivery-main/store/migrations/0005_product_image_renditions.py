@@ -0,0 +1,18 @@
+# Generated by Django 4.1.3 on 2026-10-17 02:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0004_category_slug"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="image_renditions",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
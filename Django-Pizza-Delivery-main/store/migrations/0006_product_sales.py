@@ -0,0 +1,73 @@
+# Generated by Django 4.1.3 on 2026-10-17 02:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0005_product_image_renditions"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductPopularity",
+            fields=[
+                (
+                    "product",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="popularity",
+                        serialize=False,
+                        to="store.product",
+                    ),
+                ),
+                ("units_7d", models.PositiveIntegerField(default=0)),
+                ("units_30d", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name_plural": "Product popularity",
+            },
+        ),
+        migrations.CreateModel(
+            name="ProductSalesDay",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("units", models.PositiveIntegerField(default=0)),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="store.product"
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="productpopularity",
+            index=models.Index(
+                fields=["-units_7d", "-units_30d"], name="store_popularity_rank_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="productsalesday",
+            index=models.Index(fields=["day"], name="store_sales_day_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="productsalesday",
+            constraint=models.UniqueConstraint(
+                fields=("product", "day"), name="store_sales_product_day_uniq"
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.1.3 on 2026-10-17 02:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0007_remove_duplicate_variants"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="productvariant",
+            constraint=models.UniqueConstraint(
+                fields=("product", "size"), name="store_variant_product_size_uniq"
+            ),
+        ),
+    ]
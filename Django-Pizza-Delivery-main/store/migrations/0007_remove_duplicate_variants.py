@@ -0,0 +1,46 @@
+from django.db import migrations, models
+
+# A migration of its own: on PostgreSQL the constraint can not be added in
+# the transaction that changed the rows it checks ("pending trigger events").
+
+
+def remove_duplicate_variants(apps, schema_editor):
+    """
+    Keep the newest variant of every (product, size), order items of the
+    others are moved to it. Completed orders keep the price they were paid
+    at, so a variant with another price and completed order items stops
+    the migration until it is fixed by hand.
+    """
+    ProductVariant = apps.get_model("store", "ProductVariant")
+    OrderItem = apps.get_model("order", "OrderItem")
+    duplicates = (
+        ProductVariant.objects.values("product_id", "size_id")
+        .annotate(count=models.Count("id"), keep=models.Max("id"))
+        .filter(count__gt=1)
+    )
+    for duplicate in duplicates:
+        keep = ProductVariant.objects.get(pk=duplicate["keep"])
+        others = ProductVariant.objects.filter(
+            product_id=duplicate["product_id"], size_id=duplicate["size_id"]
+        ).exclude(pk=keep.pk)
+        sold = others.exclude(price=keep.price).filter(orderitem__order__complete=True)
+        if sold.exists():
+            raise RuntimeError(
+                f"variants {sorted(set(sold.values_list('pk', flat=True)))} "
+                f"duplicate variant {keep.pk} with another price and are in "
+                "completed orders, merge or delete them before migrating"
+            )
+        OrderItem.objects.filter(variation__in=others).update(variation_id=keep.pk)
+        others.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0006_product_sales"),
+        ("order", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_variants, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.1.3 on 2026-10-17 02:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0008_product_recommendation"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="category",
+            name="slug",
+            field=models.SlugField(
+                allow_unicode=True, blank=True, max_length=20, unique=True
+            ),
+        ),
+    ]
@@ -1,53 +1,105 @@
 from django.db import models
-from django.utils.safestring import mark_safe
+from django.utils.text import slugify
 import uuid
 
 # Create your models here.
 
 
+class ProductQuerySet(models.QuerySet):
+    def with_variant_info(self):
+        """
+        Annotate the number of variants and prefetch variants with their size,
+        so has_variants and get_product_variants do not query per product
+        """
+        variants = ProductVariant.objects.select_related("size").order_by("id")
+        return self.annotate(
+            variant_count=models.Count("productvariant")
+        ).prefetch_related(models.Prefetch("productvariant_set", queryset=variants))
+
+
 class Product(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=100)
     price = models.DecimalField(max_digits=6, decimal_places=2, blank=True, null=True)
     desc = models.TextField(max_length=500, blank=True, null=True)
     image = models.ImageField(blank=True, upload_to="images")
+    # resized WebP/JPEG copies of the image, written by store.images
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateField(auto_now_add=True)
-    updated_at = models.DateField(auto_now=True)
+    # precise modification time, versions the cached product cards
+    updated_at = models.DateTimeField(auto_now=True)
     product_category = models.ForeignKey(
         "Category", on_delete=models.CASCADE, null=True, blank=True
     )
 
+    objects = ProductQuerySet.as_manager()
+
     class Meta:
         """Order by product category"""
 
         ordering = ("product_category",)
+        # category listings and keyset pagination seek on (category, id)
+        indexes = [
+            models.Index(
+                fields=["product_category", "id"], name="store_product_cat_id_idx"
+            )
+        ]
 
     def __str__(self):
         return self.name
 
+    @property
+    def image_url(self):
+        return self.image.url if self.image else None
+
     # to display image in the admin panel -> ignored by coverage
     def image_tag(self):  # pragma: no cover
         if self.image:
-            return mark_safe(f'<img src="{self.image.url}" width="100" height="100" />')
+            from .images import picture_html
+
+            return picture_html(self, "thumb", width=100, height=100)
 
     image_tag.short_description = "Image"
 
     @property
     def get_product_variants(self):
-        # reverse accessor
+        # reverse accessor, served from the prefetch cache if it is loaded
         variants = self.productvariant_set.all()
         return variants
 
     @property
     def has_variants(self):
+        # use data loaded by ProductQuerySet.with_variant_info when present
+        if hasattr(self, "variant_count"):
+            return self.variant_count > 0
+        prefetched = getattr(self, "_prefetched_objects_cache", {})
+        if "productvariant_set" in prefetched:
+            return len(prefetched["productvariant_set"]) > 0
         if self.productvariant_set.count() > 0:
             return True
         else:
             return False
 
 
+def unique_slug(name, taken, max_length=20):
+    """
+    Slug of a name that is not in taken: non-ASCII letters are kept
+    ("Напитки" -> "напитки"), "category" is used when nothing is left and
+    clashes get a -2, -3... suffix
+    """
+    base = slugify(name, allow_unicode=True) or "category"
+    slug, number = base[:max_length], 1
+    while slug in taken:
+        number += 1
+        suffix = f"-{number}"
+        slug = base[: max_length - len(suffix)] + suffix
+    return slug
+
+
 class Category(models.Model):
     name = models.CharField(max_length=20, unique=True)
+    # used in category page urls: /category/<slug>/
+    slug = models.SlugField(max_length=20, unique=True, blank=True, allow_unicode=True)
 
     class Meta:
         verbose_name_plural = "Categories"
@@ -55,6 +107,12 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        if not self.slug:
+            taken = Category.objects.exclude(pk=self.pk).values_list("slug", flat=True)
+            self.slug = unique_slug(self.name, set(taken))
+        super().save(*args, **kwargs)
+
 
 class Size(models.Model):
     name = models.CharField(max_length=20, blank=True, null=True, unique=True)
@@ -69,6 +127,14 @@ class ProductVariant(models.Model):
     size = models.ForeignKey(Size, on_delete=models.CASCADE)
     price = models.DecimalField(max_digits=6, decimal_places=2)
 
+    class Meta:
+        # a product has one price per size, menu imports upsert on it
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "size"], name="store_variant_product_size_uniq"
+            )
+        ]
+
     def __str__(self):
         return f"{self.title} - price: ${self.price}"
 
@@ -76,3 +142,74 @@ class ProductVariant(models.Model):
     def get_size(self):
         # return size as a string
         return str(self.size)
+
+
+class ProductSalesDay(models.Model):
+    """Units of a product sold on a day, recorded from completed orders"""
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    day = models.DateField()
+    units = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "day"], name="store_sales_product_day_uniq"
+            )
+        ]
+        indexes = [models.Index(fields=["day"], name="store_sales_day_idx")]
+
+    def __str__(self):
+        return f"{self.product} {self.day}: {self.units}"
+
+
+class ProductPopularity(models.Model):
+    """
+    Units of a product sold over the trailing 7 and 30 days, refreshed
+    by the refresh_popularity command. Products that sold nothing in
+    the last 30 days have no row.
+    """
+
+    product = models.OneToOneField(
+        Product, on_delete=models.CASCADE, primary_key=True, related_name="popularity"
+    )
+    units_7d = models.PositiveIntegerField(default=0)
+    units_30d = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Product popularity"
+        indexes = [
+            models.Index(
+                fields=["-units_7d", "-units_30d"], name="store_popularity_rank_idx"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.product}: {self.units_7d} / {self.units_30d}"
+
+
+class ProductRecommendation(models.Model):
+    """
+    A product frequently bought together with another one, written by the
+    refresh_recommendations command. score is the number of completed
+    orders having both products, rank 0 is the best recommendation.
+    """
+
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="recommendations"
+    )
+    recommended = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+")
+    score = models.PositiveIntegerField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "recommended"],
+                name="store_recommendation_pair_uniq",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.product} -> {self.recommended}: {self.score}"
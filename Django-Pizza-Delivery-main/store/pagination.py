@@ -0,0 +1,104 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are addressed by the key of the last item seen instead of a page
+number, so there is no total count and getting a deep page costs the
+same as getting the first one. The cursor is passed in the 'page'
+query parameter.
+"""
+
+import base64
+import binascii
+import bisect
+import json
+
+
+def encode_cursor(key, direction):
+    data = json.dumps({"k": list(key), "d": direction}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Return (key, direction) of a cursor or None if it is not valid"""
+    if not cursor:
+        return None
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(cursor + padding))
+        key, direction = tuple(data["k"]), data["d"]
+    except (ValueError, TypeError, KeyError, binascii.Error):
+        return None
+    if direction not in ("next", "previous"):
+        return None
+    return key, direction
+
+
+class KeysetPage:
+    """One page of a keyset paginated list"""
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if self._has_next:
+            return encode_cursor(self.paginator.key(self.object_list[-1]), "next")
+
+    @property
+    def previous_cursor(self):
+        if self._has_previous:
+            return encode_cursor(self.paginator.key(self.object_list[0]), "previous")
+
+
+class KeysetPaginator:
+    """
+    Paginate a list that is sorted by key(item). Pages are found with
+    a binary search on the key stored in the cursor.
+    """
+
+    def __init__(self, object_list, per_page, key):
+        self.object_list = object_list
+        self.per_page = per_page
+        self.key = key
+
+    def get_page(self, cursor):
+        """Return the page for a cursor, an invalid cursor gives the first page"""
+        items, per_page = self.object_list, self.per_page
+        decoded = decode_cursor(cursor)
+        try:
+            if decoded is None:
+                start = 0
+            else:
+                key, direction = decoded
+                if direction == "next":
+                    start = bisect.bisect_right(items, key, key=self.key)
+                else:
+                    end = bisect.bisect_left(items, key, key=self.key)
+                    start = max(end - per_page, 0)
+        except TypeError:
+            # key of a different shape than the list keys
+            start = 0
+        page_items = items[start : start + per_page]
+        has_next = start + per_page < len(items)
+        return KeysetPage(page_items, self, has_next, start > 0)
@@ -0,0 +1,193 @@
+"""
+Full-text product search over Product.name and Product.desc.
+
+On SQLite the index is an FTS5 table kept in sync with store_product by
+triggers, on PostgreSQL it is a GIN index over a weighted tsvector
+expression. Both are created in migration 0002_product_search_index.
+Other databases fall back to a name__icontains filter.
+"""
+
+import re
+import unicodedata
+import uuid
+
+from django.db import connection
+
+from .models import Product
+from .utils import LRUCache
+
+FTS_TABLE = "store_product_fts"
+
+# bm25 weights of the product_id, name and desc columns,
+# name matches rank above description matches
+SQLITE_RANK_WEIGHTS = (0.0, 10.0, 1.0)
+
+# number of distinct queries kept in the result cache
+RESULT_CACHE_SIZE = 1024
+
+PG_DOCUMENT = (
+    "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(\"desc\", '')), 'B')"
+)
+
+# product ids are kept in an unindexed column: store_product has no
+# integer primary key, so its rowids are not stable enough to join on
+SQLITE_CREATE = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        product_id UNINDEXED, name, "desc",
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS store_product_fts_insert
+    AFTER INSERT ON store_product BEGIN
+        INSERT INTO {FTS_TABLE}(product_id, name, "desc")
+        VALUES (new.id, new.name, new."desc");
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS store_product_fts_delete
+    AFTER DELETE ON store_product BEGIN
+        DELETE FROM {FTS_TABLE} WHERE product_id = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS store_product_fts_update
+    AFTER UPDATE OF id, name, "desc" ON store_product BEGIN
+        UPDATE {FTS_TABLE} SET product_id = new.id, name = new.name,
+        "desc" = new."desc" WHERE product_id = old.id;
+    END""",
+    # (re)index all rows, the table may have been created or rebuilt
+    f"DELETE FROM {FTS_TABLE}",
+    f"""INSERT INTO {FTS_TABLE}(product_id, name, "desc")
+    SELECT id, name, "desc" FROM store_product""",
+]
+
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS store_product_fts_insert",
+    "DROP TRIGGER IF EXISTS store_product_fts_delete",
+    "DROP TRIGGER IF EXISTS store_product_fts_update",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+PG_CREATE = [
+    f"CREATE INDEX IF NOT EXISTS store_product_search_idx "
+    f"ON store_product USING GIN (({PG_DOCUMENT}))",
+]
+
+PG_DROP = ["DROP INDEX IF EXISTS store_product_search_idx"]
+
+_index_available = {}
+
+# (catalog version, normalized query) -> tuple of product ids
+result_cache = LRUCache(RESULT_CACHE_SIZE)
+
+
+def sqlite_has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA compile_options")
+        options = [row[0] for row in cursor.fetchall()]
+    return "ENABLE_FTS5" in options
+
+
+def create_search_index(connection):
+    """
+    Create the search index for the database vendor of the connection,
+    on SQLite this also runs after store migrations (see store/signals.py)
+    """
+    if connection.vendor == "sqlite" and sqlite_has_fts5(connection):
+        statements = SQLITE_CREATE
+    elif connection.vendor == "postgresql":
+        statements = PG_CREATE
+    else:
+        statements = []
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def drop_search_index(connection):
+    if connection.vendor == "sqlite":
+        statements = SQLITE_DROP
+    elif connection.vendor == "postgresql":
+        statements = PG_DROP
+    else:
+        statements = []
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def search_terms(query):
+    """Split a search string into word tokens"""
+    return re.findall(r"\w+", query.casefold())
+
+
+def normalize(text):
+    """Casefold, strip accents and collapse punctuation: 'Jalapeño!' -> 'jalapeno'"""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(search_terms(stripped))
+
+
+def has_search_index():
+    """Check once per database alias that the search index was created"""
+    alias = connection.alias
+    if alias not in _index_available:
+        if connection.vendor == "sqlite":
+            tables = connection.introspection.table_names()
+            _index_available[alias] = FTS_TABLE in tables
+        else:
+            _index_available[alias] = connection.vendor == "postgresql"
+    return _index_available[alias]
+
+
+def _as_uuid(value):
+    return value if isinstance(value, uuid.UUID) else uuid.UUID(value)
+
+
+def search_product_ids(query):
+    """
+    Return ids of products matching every word of the query,
+    ordered from the most to the least relevant one.
+    Words match as prefixes, so 'pep' finds 'Pepperoni'.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+
+    if not has_search_index():
+        products = Product.objects.filter(name__icontains=query.strip())
+        return list(products.values_list("id", flat=True))
+
+    if connection.vendor == "sqlite":
+        match = " ".join(f'"{term}"*' for term in terms)
+        sql = (
+            f"SELECT product_id FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s "
+            f"ORDER BY bm25({FTS_TABLE}, %s, %s, %s)"
+        )
+        params = [match, *SQLITE_RANK_WEIGHTS]
+    else:
+        match = " & ".join(f"{term}:*" for term in terms)
+        sql = (
+            f"SELECT id FROM store_product "
+            f"WHERE ({PG_DOCUMENT}) @@ to_tsquery('simple', %s) "
+            f"ORDER BY ts_rank(({PG_DOCUMENT}), to_tsquery('simple', %s)) DESC"
+        )
+        params = [match, match]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [_as_uuid(row[0]) for row in cursor.fetchall()]
+
+
+def cached_search_product_ids(query, version):
+    """
+    search_product_ids() with results cached per normalized query and
+    catalog version, so 'Pepperoni ' and 'pepperoni' share an entry and
+    a catalog change starts new ones. The normalized query is searched,
+    every query sharing the entry gets the same results.
+    """
+    key = (version, normalize(query))
+    if not key[1]:
+        return ()
+    product_ids = result_cache.get(key)
+    if product_ids is None:
+        product_ids = tuple(search_product_ids(key[1]))
+        result_cache.set(key, product_ids)
+    return product_ids
@@ -0,0 +1,67 @@
+from django.db import transaction, connections
+from django.db.models import signals
+from django.utils import timezone
+from django.dispatch import receiver
+from .models import Product, ProductVariant, Size, Category
+from .catalog import invalidate_catalog
+from .search import create_search_index, FTS_TABLE
+from .images import schedule_product_renditions
+
+
+@receiver(signals.post_save, sender=Product)
+def product_image_changed(sender, instance, raw=False, **kwargs):
+    """Drop renditions of a replaced image and create new ones"""
+    if raw:
+        return
+    source = instance.image_renditions.get("source")
+    if source == (instance.image.name or None):
+        return
+    if instance.image_renditions:
+        instance.image_renditions = {}
+        Product.objects.filter(pk=instance.pk).update(image_renditions={})
+    if instance.image:
+        schedule_product_renditions(instance)
+
+
+@receiver(signals.post_save, sender=ProductVariant)
+@receiver(signals.post_delete, sender=ProductVariant)
+def touch_variant_product(sender, instance, **kwargs):
+    """Bump updated_at of the product, its cached card is versioned on it"""
+    Product.objects.filter(pk=instance.product_id).update(updated_at=timezone.now())
+
+
+@receiver(signals.post_save, sender=Size)
+def touch_size_products(sender, instance, **kwargs):
+    """Bump updated_at of products which have a variant in this size"""
+    products = Product.objects.filter(productvariant__size=instance)
+    Product.objects.filter(pk__in=products).update(updated_at=timezone.now())
+
+
+@receiver(signals.post_save, sender=Product)
+@receiver(signals.post_delete, sender=Product)
+@receiver(signals.post_save, sender=ProductVariant)
+@receiver(signals.post_delete, sender=ProductVariant)
+@receiver(signals.post_save, sender=Size)
+@receiver(signals.post_delete, sender=Size)
+@receiver(signals.post_save, sender=Category)
+@receiver(signals.post_delete, sender=Category)
+def catalog_changed(sender, instance, **kwargs):
+    """Rebuild the catalog snapshot when a catalog model changes"""
+    invalidate_catalog()
+    # invalidate again once the change is visible to other connections,
+    # a snapshot built in between would otherwise keep the old rows
+    transaction.on_commit(invalidate_catalog)
+
+
+@receiver(signals.post_migrate)
+def restore_search_index(sender, app_config, using, **kwargs):
+    """
+    SQLite drops triggers when a migration rebuilds store_product,
+    create them again and resync the index after store migrations
+    """
+    if app_config.name != "store":
+        return
+    connection = connections[using]
+    if connection.vendor == "sqlite":
+        if FTS_TABLE in connection.introspection.table_names():
+            create_search_index(connection)
@@ -0,0 +1,182 @@
+"""
+Streamed rendering of pages.
+
+render() builds the whole page before the first byte is sent. With
+settings.STORE_STREAMING_RENDER the products page is sent as a
+StreamingHttpResponse instead: the template is walked through
+{% extends %} and {% block %} the way Django renders them, and the
+output is flushed before every block. The <head> and navigation of
+store/base.html leave before the content block is rendered, so browsers
+fetch CSS and JavaScript while the product cards are produced. {% for %}
+loops are walked too and flushed every FLUSH_EVERY iterations, so the
+product cards leave as they are rendered. Other output is flushed in
+chunks of FLUSH_SIZE bytes.
+
+Rendering happens after the response went through the middleware, so
+whatever the middleware reads from the request (CSRF cookie, session
+access, messages) is settled before the response is returned. Errors
+in the template cut the page short instead of giving a 500, which is
+why the mode is off by default.
+
+The walk copies the render() methods of ExtendsNode, BlockNode and
+ForNode and uses undocumented internals: ExtendsNode.get_parent() and
+.blocks, BlockContext and BLOCK_CONTEXT_KEY, ForNode.loopvars,
+.sequence, .nodelist_loop, .nodelist_empty and .is_reversed,
+Node.render_annotated(), RenderContext.push_state() and
+Context.bind_template(). They are checked against DJANGO_VERSION (the
+version of requirements.txt); on other versions pages are rendered with
+render() until the walk is checked against the new version's template
+code and DJANGO_VERSION updated.
+"""
+
+import django
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.http import StreamingHttpResponse
+from django.middleware.csrf import get_token
+from django.shortcuts import render
+from django.template.base import TextNode
+from django.template.defaulttags import ForNode
+from django.template.context import make_context
+from django.template.loader import get_template
+from django.template.loader_tags import (
+    BLOCK_CONTEXT_KEY,
+    BlockContext,
+    BlockNode,
+    ExtendsNode,
+)
+
+# the Django version whose template internals the walk follows
+DJANGO_VERSION = (4, 1)
+
+FLUSH_SIZE = 4096
+# iterations of a {% for %} loop, e.g. product cards, sent per flush
+FLUSH_EVERY = 6
+
+# marks a point the output is flushed at
+FLUSH = object()
+
+
+def _iter_nodes(nodelist, context):
+    for node in nodelist:
+        if isinstance(node, ExtendsNode):
+            yield from _iter_extends(node, context)
+        elif isinstance(node, BlockNode):
+            yield FLUSH
+            yield from _iter_block(node, context)
+        # loops unpacking several variables are rendered at once
+        elif isinstance(node, ForNode) and len(node.loopvars) == 1:
+            yield from _iter_for(node, context)
+        else:
+            yield node.render_annotated(context)
+
+
+def _iter_extends(node, context):
+    """ExtendsNode.render() yielding the parent template's nodes"""
+    parent = node.get_parent(context)
+    if BLOCK_CONTEXT_KEY not in context.render_context:
+        context.render_context[BLOCK_CONTEXT_KEY] = BlockContext()
+    block_context = context.render_context[BLOCK_CONTEXT_KEY]
+    block_context.add_blocks(node.blocks)
+    # the root template's blocks are the last overrides
+    for child in parent.nodelist:
+        if not isinstance(child, TextNode):
+            if not isinstance(child, ExtendsNode):
+                block_context.add_blocks(
+                    {
+                        block.name: block
+                        for block in parent.nodelist.get_nodes_by_type(BlockNode)
+                    }
+                )
+            break
+    with context.render_context.push_state(parent, isolated_context=False):
+        yield from _iter_nodes(parent.nodelist, context)
+
+
+def _iter_for(node, context):
+    """ForNode.render() yielding the iterations, with a flush every FLUSH_EVERY"""
+    parentloop = context["forloop"] if "forloop" in context else {}
+    with context.push():
+        values = node.sequence.resolve(context, ignore_failures=True)
+        if values is None:
+            values = []
+        if not hasattr(values, "__len__"):
+            values = list(values)
+        len_values = len(values)
+        if len_values < 1:
+            yield node.nodelist_empty.render(context)
+            return
+        if node.is_reversed:
+            values = reversed(values)
+        loop_dict = context["forloop"] = {"parentloop": parentloop}
+        for i, item in enumerate(values):
+            loop_dict["counter0"] = i
+            loop_dict["counter"] = i + 1
+            loop_dict["revcounter"] = len_values - i
+            loop_dict["revcounter0"] = len_values - i - 1
+            loop_dict["first"] = i == 0
+            loop_dict["last"] = i == len_values - 1
+            context[node.loopvars[0]] = item
+            yield from _iter_nodes(node.nodelist_loop, context)
+            if (i + 1) % FLUSH_EVERY == 0:
+                yield FLUSH
+
+
+def _iter_block(node, context):
+    """BlockNode.render() yielding the nodes of the overriding block"""
+    block_context = context.render_context.get(BLOCK_CONTEXT_KEY)
+    with context.push():
+        if block_context is None:
+            context["block"] = node
+            yield from _iter_nodes(node.nodelist, context)
+            return
+        push = block = block_context.pop(node.name)
+        if block is None:
+            block = node
+        # a copy holds the context, templates are shared between threads
+        block = type(node)(block.name, block.nodelist)
+        block.context = context
+        context["block"] = block
+        yield from _iter_nodes(block.nodelist, context)
+        if push is not None:
+            block_context.push(node.name, push)
+
+
+def stream_template(template_name, context=None, request=None):
+    """Render a template into chunks of HTML"""
+    template = get_template(template_name).template
+    context = make_context(context, request, autoescape=template.engine.autoescape)
+    buffer, size = [], 0
+    with context.render_context.push_state(template), context.bind_template(template):
+        context.template_name = template.name
+        for chunk in _iter_nodes(template.nodelist, context):
+            if chunk is not FLUSH:
+                buffer.append(chunk)
+                size += len(chunk)
+                if size < FLUSH_SIZE:
+                    continue
+            if buffer:
+                yield "".join(buffer)
+                buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def render_page(request, template_name, context):
+    """render() or, with settings.STORE_STREAMING_RENDER, a streamed page"""
+    # pages with messages are rendered at once, messages are only marked
+    # as shown by the middleware after the page is rendered
+    if (
+        not settings.STORE_STREAMING_RENDER
+        or django.VERSION[:2] != DJANGO_VERSION
+        or len(get_messages(request))
+    ):
+        return render(request, template_name, context)
+    # set the CSRF cookie and mark the session as accessed (Vary: Cookie)
+    # before the middleware processes the response
+    get_token(request)
+    request.user.is_authenticated
+    return StreamingHttpResponse(
+        stream_template(template_name, context, request),
+        content_type="text/html; charset=utf-8",
+    )
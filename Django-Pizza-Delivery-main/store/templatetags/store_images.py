@@ -0,0 +1,13 @@
+from django import template
+from store.images import picture_html
+
+register = template.Library()
+
+
+@register.simple_tag
+def product_picture(product, rendition="card", sizes=None, **attrs):
+    """
+    Responsive product image, e.g.
+    {% product_picture product "thumb" class="h-20 rounded-xl" %}
+    """
+    return picture_html(product, rendition, sizes=sizes, **attrs)
@@ -0,0 +1,102 @@
+import json
+from django.test import TestCase, Client
+from django.urls import reverse
+from store.models import Product, ProductVariant, Category, Size
+from store.autocomplete import PrefixIndex
+from store.catalog import get_catalog, invalidate_catalog
+
+
+class TestPrefixIndex(TestCase):
+    """Test in-memory autocomplete index of the catalog"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.size = Size.objects.create(name="Large")
+        cls.pepperoni = Product.objects.create(name="Pepperoni", price=12)
+        cls.jalapeno = Product.objects.create(name="Jalapeño Popper", price=13)
+        cls.ham = Product.objects.create(name="Ham and Pineapple", price=11)
+        ProductVariant.objects.create(
+            title="Party Pepperoni", product=cls.pepperoni, size=cls.size, price=20
+        )
+
+    def setUp(self):
+        invalidate_catalog()
+
+    def search(self, query, limit=8):
+        return [
+            product.id for product in get_catalog().autocomplete.search(query, limit)
+        ]
+
+    def test_search_name_prefix(self):
+        """Test products are found by the start of their name"""
+        self.assertEqual(self.search("pep"), [self.pepperoni.pk])
+        self.assertEqual(self.search("JALAPENO"), [self.jalapeno.pk])
+        self.assertEqual(self.search("x"), [])
+        self.assertEqual(self.search("  "), [])
+
+    def test_search_word_and_variant_title(self):
+        """Test later words of names and variant titles match too"""
+        self.assertEqual(self.search("pine"), [self.ham.pk])
+        self.assertEqual(self.search("party"), [self.pepperoni.pk])
+
+    def test_search_name_matches_first(self):
+        """Test name matches come before word matches and results are limited"""
+        results = self.search("p")
+        self.assertEqual(results[0], self.pepperoni.pk)
+        self.assertEqual(set(results[1:]), {self.jalapeno.pk, self.ham.pk})
+        self.assertEqual(len(self.search("p", limit=2)), 2)
+
+    def test_index_rebuilt_on_catalog_change(self):
+        """Test the index follows product changes"""
+        index = get_catalog().autocomplete
+        self.assertIsInstance(index, PrefixIndex)
+        self.ham.name = "Hawaii"
+        self.ham.save()
+        invalidate_catalog()
+        self.assertIsNot(get_catalog().autocomplete, index)
+        self.assertEqual(self.search("haw"), [self.ham.pk])
+
+    def test_search_makes_no_queries(self):
+        """Test lookups in a built index do not touch the database"""
+        get_catalog().autocomplete
+        with self.assertNumQueries(0):
+            get_catalog().autocomplete.search("pep")
+
+
+class TestAutocompleteView(TestCase):
+    """Test autocomplete endpoint"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="Pizza")
+        cls.product = Product.objects.create(
+            name="Margherita", price=10, product_category=category
+        )
+
+    def setUp(self):
+        invalidate_catalog()
+        self.client = Client()
+        self.url = reverse("store:autocomplete")
+
+    def test_autocomplete_GET(self):
+        """Test matches are returned as JSON"""
+        response = self.client.get(self.url, {"q": "marg"})
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertEqual(data["query"], "marg")
+        self.assertEqual(
+            data["results"],
+            [{"id": str(self.product.pk), "name": "Margherita", "category": "Pizza"}],
+        )
+
+    def test_autocomplete_limit(self):
+        """Test invalid and too large limits are replaced"""
+        response = self.client.get(self.url, {"q": "m", "limit": "abc"})
+        self.assertEqual(len(json.loads(response.content)["results"]), 1)
+        response = self.client.get(self.url, {"q": "m", "limit": "0"})
+        self.assertEqual(json.loads(response.content)["results"], [])
+
+    def test_autocomplete_POST(self):
+        """Test only safe methods are allowed"""
+        response = self.client.post(self.url, {"q": "m"})
+        self.assertEqual(response.status_code, 405)
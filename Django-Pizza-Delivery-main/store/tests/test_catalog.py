@@ -0,0 +1,116 @@
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, Client
+from django.urls import reverse
+from store.models import Product, ProductVariant, Category, Size
+from store.catalog import (
+    CATALOG_VERSION_KEY,
+    get_catalog,
+    get_catalog_version,
+    invalidate_catalog,
+)
+
+
+class TestCatalogSnapshot(TestCase):
+    """Test building and invalidation of the catalog snapshot"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="Pizza")
+        cls.size = Size.objects.create(name="Small")
+        cls.product = Product.objects.create(
+            name="Test Pizza", product_category=cls.category
+        )
+        cls.variant = ProductVariant.objects.create(
+            title="Test Variant", product=cls.product, size=cls.size, price=10
+        )
+        cls.drink = Product.objects.create(name="Test Drink", price=2)
+
+    def setUp(self):
+        invalidate_catalog()
+
+    def test_snapshot_read_models(self):
+        """Test products, variants, sizes and prices are in the snapshot"""
+        catalog = get_catalog()
+        product = catalog.get(self.product.pk)
+
+        self.assertEqual(len(catalog), 2)
+        self.assertEqual(product.name, "Test Pizza")
+        self.assertEqual(product.category_name, "Pizza")
+        self.assertTrue(product.has_variants)
+        self.assertEqual(product.get_product_variants[0].size, "Small")
+        self.assertEqual(product.get_product_variants[0].price, 10)
+        self.assertFalse(catalog.get(self.drink.pk).has_variants)
+        self.assertEqual(catalog.get_category("pizza").name, "Pizza")
+        self.assertEqual(catalog.products_in_category(self.category.pk), [product])
+
+    def test_resolve_variant(self):
+        """Test variants are resolved by product id and size name"""
+        catalog = get_catalog()
+        self.assertEqual(
+            catalog.resolve_variant(self.product.pk, "Small"), (self.variant.pk, 10)
+        )
+        self.assertIsNone(catalog.resolve_variant(self.product.pk, "Large"))
+        self.assertIsNone(catalog.resolve_variant(self.drink.pk, "Small"))
+
+        self.size.name = "Large"
+        self.size.save()
+        catalog = get_catalog()
+        self.assertEqual(
+            catalog.resolve_variant(self.product.pk, "Large")[0], self.variant.pk
+        )
+
+    def test_snapshot_is_reused(self):
+        """Test snapshot is built once and served without queries"""
+        catalog = get_catalog()
+        with self.assertNumQueries(0):
+            self.assertIs(get_catalog(), catalog)
+
+    def test_snapshot_rebuilt_on_product_save(self):
+        """Test saving a product rebuilds the snapshot"""
+        get_catalog()
+        self.product.name = "Renamed Pizza"
+        self.product.save()
+        self.assertEqual(get_catalog().get(self.product.pk).name, "Renamed Pizza")
+
+    def test_snapshot_rebuilt_on_variant_delete(self):
+        """Test deleting a variant rebuilds the snapshot"""
+        get_catalog()
+        self.variant.delete()
+        self.assertFalse(get_catalog().get(self.product.pk).has_variants)
+
+    def test_snapshot_rebuilt_on_size_and_category_save(self):
+        """Test renaming a size or a category rebuilds the snapshot"""
+        get_catalog()
+        self.size.name = "Large"
+        self.size.save()
+        self.category.name = "Pizzas"
+        self.category.save()
+        product = get_catalog().get(self.product.pk)
+        self.assertEqual(product.get_product_variants[0].size, "Large")
+        self.assertEqual(product.category_name, "Pizzas")
+
+    def test_menu_pages_do_not_query_catalog(self):
+        """Test menu pages are rendered from the warm snapshot"""
+        client = Client()
+        get_catalog()
+        urls = [
+            reverse("store:products"),
+            reverse("store:pizzas"),
+            reverse("store:drinks"),
+            reverse("store:sides"),
+            reverse("store:category", args=["pizza"]),
+        ]
+        for url in urls:
+            with self.assertNumQueries(0):
+                response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+
+class TestCatalogVersion(SimpleTestCase):
+    """Test the catalog version is kept in the configured cache"""
+
+    def test_version_in_cache(self):
+        """Test a new version is read through other connections of the cache"""
+        cache = caches.create_connection("default")
+        invalidate_catalog()
+        self.assertEqual(cache.get(CATALOG_VERSION_KEY), get_catalog_version())
@@ -0,0 +1,85 @@
+from unittest import mock
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from store.models import Product
+from store.catalog import invalidate_catalog
+
+
+@override_settings(STORE_GUEST_PAGE_CACHE=60)
+class TestGuestPageCache(TestCase):
+    """Test full-page cache of catalog pages for guests"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(name="Test Pizza", price=10)
+
+    def setUp(self):
+        cache.clear()
+        invalidate_catalog()
+        self.client = Client()
+        self.url = reverse("store:products")
+
+    def test_page_cached_for_guests(self):
+        """Test second guest request is served from the cache"""
+        first = self.client.get(self.url)
+        self.assertTemplateUsed(first, "store/products.html")
+
+        with self.assertNumQueries(0), self.assertTemplateNotUsed(
+            "store/products.html"
+        ):
+            second = Client().get(self.url)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.content, first.content)
+
+    def test_page_not_per_visitor(self):
+        """Test guest pages contain no cart count or CSRF token of the visitor"""
+        response = self.client.get(self.url)
+        self.assertNotIn("csrftoken", response.cookies)
+        self.assertNotContains(response, "csrfmiddlewaretoken")
+
+    def test_cache_follows_catalog_version(self):
+        """Test catalog changes render the page again"""
+        self.client.get(self.url)
+        self.product.name = "Renamed Pizza"
+        self.product.save()
+        invalidate_catalog()
+        response = self.client.get(self.url)
+        self.assertContains(response, "Renamed Pizza")
+
+    def test_query_string_cached_separately(self):
+        """Test pages of different searches are cached under different keys"""
+        self.client.get(self.url)
+        response = self.client.get(self.url, {"product": "nothing"})
+        self.assertEqual(response.context["search_string"], "nothing")
+
+    def test_query_parameters(self):
+        """Test only the parameters the view reads make cached pages"""
+        self.client.get(self.url, {"product": "pizza", "sort": "popular"})
+        with self.assertTemplateNotUsed("store/products.html"):
+            # the same page with its parameters in another order
+            self.client.get(self.url + "?sort=popular&product=pizza")
+
+        with mock.patch.object(cache, "set") as cache_set:
+            for i in range(3):
+                response = self.client.get(self.url, {"utm_source": i})
+                self.assertTemplateUsed(response, "store/products.html")
+        cache_set.assert_not_called()
+
+    def test_authenticated_users_not_cached(self):
+        """Test logged in users always get a rendered page"""
+        user = get_user_model().objects.create_user(
+            username="TestUser", email="test@test.com", password="TestPassword1"
+        )
+        self.client.force_login(user)
+        self.client.get(self.url)
+        response = self.client.get(self.url)
+        self.assertTemplateUsed(response, "store/products.html")
+
+    @override_settings(STORE_GUEST_PAGE_CACHE=0)
+    def test_cache_off(self):
+        """Test pages are rendered every time with the cache turned off"""
+        self.client.get(self.url)
+        response = self.client.get(self.url)
+        self.assertTemplateUsed(response, "store/products.html")
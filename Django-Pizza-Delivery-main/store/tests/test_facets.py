@@ -0,0 +1,92 @@
+from django.test import TestCase, Client
+from django.urls import reverse
+from store.models import Product, ProductVariant, Category, Size
+from store.catalog import get_catalog, invalidate_catalog
+from store.facets import price_band
+
+
+class TestFacets(TestCase):
+    """Test faceted filtering on bitsets of the catalog"""
+
+    @classmethod
+    def setUpTestData(cls):
+        pizza = Category.objects.create(name="Pizza")
+        drink = Category.objects.create(name="Drink")
+        small = Size.objects.create(name="Small")
+        large = Size.objects.create(name="Large")
+        cls.margherita = Product.objects.create(
+            name="Margherita", product_category=pizza
+        )
+        ProductVariant.objects.create(product=cls.margherita, size=small, price=8)
+        ProductVariant.objects.create(product=cls.margherita, size=large, price=14)
+        cls.pepperoni = Product.objects.create(name="Pepperoni", product_category=pizza)
+        ProductVariant.objects.create(product=cls.pepperoni, size=large, price=22)
+        cls.coke = Product.objects.create(name="Coke", price=2, product_category=drink)
+
+    def setUp(self):
+        invalidate_catalog()
+
+    def apply(self, **selected):
+        index = get_catalog().facets
+        bits, facets = index.apply(selected)
+        products = {product.id for product in index.filter(index.products, bits)}
+        counts = {
+            facet.name: {option.value: option.count for option in facet.options}
+            for facet in facets
+        }
+        return products, counts
+
+    def test_price_band(self):
+        """Test prices fall into bands with the lower bound included"""
+        self.assertEqual(price_band(9), "under-10")
+        self.assertEqual(price_band(10), "10-20")
+        self.assertEqual(price_band(25), "20-plus")
+
+    def test_no_selection(self):
+        """Test all products match and options count all products having them"""
+        products, counts = self.apply()
+        self.assertEqual(len(products), 3)
+        self.assertEqual(counts["category"], {"drink": 1, "pizza": 2})
+        self.assertEqual(counts["size"], {"Small": 1, "Large": 2})
+        self.assertEqual(counts["price"], {"under-10": 2, "10-20": 1, "20-plus": 1})
+
+    def test_facets_are_anded_options_ored(self):
+        """Test options of a facet widen and other facets narrow the result"""
+        products, counts = self.apply(size=["Large"], price=["20-plus"])
+        self.assertEqual(products, {self.pepperoni.pk})
+        products, counts = self.apply(price=["under-10", "20-plus"])
+        self.assertEqual(
+            products, {self.margherita.pk, self.pepperoni.pk, self.coke.pk}
+        )
+        products, counts = self.apply(category=["drink"], size=["Large"])
+        self.assertEqual(products, set())
+
+    def test_disjunctive_counts(self):
+        """Test counts ignore the selection of their own facet"""
+        products, counts = self.apply(category=["pizza"])
+        # other categories still show how many products they would add
+        self.assertEqual(counts["category"], {"drink": 1, "pizza": 2})
+        # other facets are counted within the selection
+        self.assertEqual(counts["price"], {"under-10": 1, "10-20": 1, "20-plus": 1})
+
+    def test_filters_make_no_queries(self):
+        """Test filtering a built index does not touch the database"""
+        get_catalog().facets
+        with self.assertNumQueries(0):
+            self.apply(category=["pizza"], size=["Small"])
+
+    def test_products_view_filters(self):
+        """Test products view filters by query parameters and shows counts"""
+        url = reverse("store:products")
+        response = Client().get(url, {"category": "pizza", "price": "20-plus"})
+        products = list(response.context["products"])
+        self.assertEqual([p.id for p in products], [self.pepperoni.pk])
+        self.assertTrue(response.context["filtered"])
+        self.assertContains(response, "Clear filters")
+        self.assertEqual(response.context["unfiltered_querystring"], "")
+
+        # filters narrow search results and count within them
+        response = Client().get(url, {"product": "pepperoni", "size": "Small"})
+        self.assertEqual(list(response.context["products"]), [])
+        size = response.context["facets"][1]
+        self.assertEqual({o.value: o.count for o in size.options}["Large"], 1)
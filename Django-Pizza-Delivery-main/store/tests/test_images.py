@@ -0,0 +1,83 @@
+import shutil
+import tempfile
+from io import StringIO
+from django.test import TestCase, override_settings
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.storage import default_storage
+from PIL import Image
+from store.models import Product
+from store.images import generate_product_renditions, picture_html, rendition_name
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class TestProductImageRenditions(TestCase):
+    """Test resized WebP/JPEG renditions of product images"""
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        with open("functional_tests/test_image.jpg", "rb") as image:
+            image = SimpleUploadedFile(
+                "test_image.jpg", image.read(), content_type="image/jpg"
+            )
+        self.product = Product.objects.create(name="Test Product", image=image)
+
+    def test_generate_renditions(self):
+        """Test every rendition is written in WebP and JPEG"""
+        original_width = Image.open(self.product.image.path).width
+        generate_product_renditions(self.product.pk)
+        self.product.refresh_from_db()
+        renditions = self.product.image_renditions
+
+        self.assertEqual(renditions["source"], self.product.image.name)
+        for rendition, max_width in [("thumb", 100), ("card", 480), ("full", 1200)]:
+            entry = renditions[rendition]
+            self.assertEqual(entry["width"], min(max_width, original_width))
+            self.assertEqual(
+                entry["webp"],
+                rendition_name(self.product.image.name, rendition, "webp"),
+            )
+            with default_storage.open(entry["webp"]) as file:
+                image = Image.open(file)
+                self.assertEqual(image.format, "WEBP")
+                self.assertEqual(image.width, entry["width"])
+            with default_storage.open(entry["jpeg"]) as file:
+                self.assertEqual(Image.open(file).format, "JPEG")
+
+    def test_picture_markup(self):
+        """Test markup uses renditions with srcset and lazy loading"""
+        html = picture_html(self.product, "thumb", **{"class": "h-20"})
+        # no renditions yet, the original image is used
+        self.assertIn(f'src="{self.product.image.url}"', html)
+        self.assertIn('loading="lazy"', html)
+
+        generate_product_renditions(self.product.pk)
+        self.product.refresh_from_db()
+        html = picture_html(self.product, "thumb", **{"class": "h-20"})
+        self.assertIn('<source type="image/webp" srcset="', html)
+        self.assertIn("-thumb.jpg", html)
+        self.assertIn('sizes="100px"', html)
+        self.assertIn('class="h-20"', html)
+
+    def test_renditions_dropped_on_image_change(self):
+        """Test renditions of a replaced image are not used anymore"""
+        generate_product_renditions(self.product.pk)
+        self.product.refresh_from_db()
+        self.product.image = None
+        self.product.save()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.image_renditions, {})
+
+    def test_create_image_renditions_command(self):
+        """Test command creates missing renditions of existing products"""
+        out = StringIO()
+        call_command("create_image_renditions", stdout=out)
+        self.product.refresh_from_db()
+        self.assertIn("card", self.product.image_renditions)
+        self.assertIn("1 product(s)", out.getvalue())
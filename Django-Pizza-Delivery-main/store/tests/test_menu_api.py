@@ -0,0 +1,60 @@
+import json
+from django.test import TestCase, Client
+from django.urls import reverse
+from store.models import Product, ProductVariant, Category, Size
+from store.catalog import get_catalog
+
+
+class TestMenuApi(TestCase):
+    """Test JSON menu endpoint and its conditional GET support"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="Pizza")
+        cls.size = Size.objects.create(name="Small")
+        cls.product = Product.objects.create(
+            name="Test Pizza", product_category=cls.category
+        )
+        ProductVariant.objects.create(
+            title="Test Variant", product=cls.product, size=cls.size, price="10.50"
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.url = reverse("store:menu_api")
+
+    def test_menu_api_GET(self):
+        """Test menu lists categories, products, variants and prices"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/json")
+        menu = json.loads(response.content)
+
+        self.assertEqual(menu["categories"][0]["slug"], "pizza")
+        product = menu["products"][0]
+        self.assertEqual(product["name"], "Test Pizza")
+        self.assertEqual(product["category"], "pizza")
+        self.assertEqual(product["variants"][0]["size"], "Small")
+        self.assertEqual(product["variants"][0]["price"], "10.50")
+
+    def test_menu_api_not_modified(self):
+        """Test matching If-None-Match gets 304 without touching the database"""
+        etag = self.client.get(self.url)["ETag"]
+        self.assertFalse(etag.startswith("W/"))
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_menu_api_etag_changes_with_catalog(self):
+        """Test ETag changes once the catalog is modified"""
+        etag = self.client.get(self.url)["ETag"]
+        self.product.name = "Renamed Pizza"
+        self.product.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response["ETag"], f'"{get_catalog().version}"')
+        self.assertIn(b"Renamed Pizza", response.content)
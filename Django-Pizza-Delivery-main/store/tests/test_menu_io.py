@@ -0,0 +1,197 @@
+import json
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from django.test import TestCase
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from store.catalog import get_catalog, invalidate_catalog
+from store.menu_io import (
+    MenuImporter,
+    export_records,
+    read_menu,
+    write_menu,
+)
+from store.models import Category, Product, ProductVariant, Size
+
+CSV_MENU = """id,name,category,description,price,size,variant_title,variant_price
+,Margherita,Pizza,Tomato and mozzarella,,Small,,9.50
+,Margherita,Pizza,Tomato and mozzarella,,Large,,14.00
+,Cola,Drinks,,2.50,,,
+"""
+
+
+class TestMenuImport(TestCase):
+    """Test streaming bulk import and export of the menu"""
+
+    def setUp(self):
+        invalidate_catalog()
+
+    def import_menu(self, text, format="csv", **options):
+        importer = MenuImporter(**options)
+        importer.run(read_menu(StringIO(text), format))
+        return importer
+
+    def test_import_csv(self):
+        """Test categories, sizes, products and variants are created"""
+        with self.captureOnCommitCallbacks(execute=True):
+            importer = self.import_menu(CSV_MENU, batch_size=1)
+        self.assertEqual(
+            importer.counts,
+            {"categories": 2, "sizes": 2, "products": 2, "variants": 2},
+        )
+        pizza = Product.objects.get(name="Margherita")
+        self.assertEqual(pizza.product_category, Category.objects.get(slug="pizza"))
+        self.assertEqual(
+            sorted(pizza.productvariant_set.values_list("size__name", "price")),
+            [("Large", Decimal("14.00")), ("Small", Decimal("9.50"))],
+        )
+        self.assertEqual(
+            pizza.productvariant_set.get(size__name="Large").title,
+            "Margherita - Large",
+        )
+        self.assertEqual(Product.objects.get(name="Cola").price, Decimal("2.50"))
+        # bulk writes invalidate the catalog on commit
+        self.assertEqual(len(get_catalog().products), 2)
+
+    def test_import_updates_changed_rows_only(self):
+        """Test a second import only writes what changed"""
+        self.import_menu(CSV_MENU)
+        self.assertEqual(self.import_menu(CSV_MENU).changes, [])
+
+        pizza = Product.objects.get(name="Margherita")
+        menu = json.dumps(
+            {
+                "id": str(pizza.pk),
+                "name": "Margherita Classic",
+                "category": "Pizza",
+                "description": "Tomato and mozzarella",
+                "variants": [{"size": "Large", "price": "15.00"}],
+            }
+        )
+        importer = self.import_menu(menu, "jsonl")
+        self.assertEqual(importer.counts["products"], 1)
+        self.assertEqual(
+            importer.changes[1], "~ variant Margherita Classic / Large 15.00"
+        )
+
+        pizza.refresh_from_db()
+        self.assertEqual(pizza.name, "Margherita Classic")
+        large = pizza.productvariant_set.get(size__name="Large")
+        self.assertEqual(
+            (large.price, large.title), (Decimal("15.00"), "Margherita - Large")
+        )
+        # variants missing from the file are kept
+        self.assertEqual(pizza.productvariant_set.count(), 2)
+        self.assertEqual(Product.objects.count(), 2)
+
+    def test_dry_run(self):
+        """Test a dry run lists the changes without writing them"""
+        importer = self.import_menu(CSV_MENU, dry_run=True)
+        self.assertIn("+ product Margherita", importer.changes)
+        self.assertIn("+ variant Margherita / Small 9.50", importer.changes)
+        self.assertIn("+ category Drinks", importer.changes)
+        self.assertFalse(Product.objects.exists())
+        self.assertFalse(Category.objects.exists())
+        self.assertFalse(Size.objects.exists())
+
+        self.import_menu(CSV_MENU)
+        menu = CSV_MENU.replace(",Cola,Drinks,", ",Cola,Soft Drinks,")
+        importer = self.import_menu(menu, dry_run=True)
+        drinks = Category.objects.get(name="Drinks")
+        self.assertEqual(
+            importer.changes,
+            [
+                "+ category Soft Drinks",
+                f"~ product Cola: product_category_id {drinks.pk!r} -> "
+                "<new category Soft Drinks>",
+            ],
+        )
+
+    def test_product_twice_in_batch(self):
+        """Test records of the same product in a batch are merged"""
+        menu = (
+            CSV_MENU
+            + ",Margherita,Pizza,Tomato and mozzarella,,Large,,15.00\n"
+            + ",Margherita,Pizza,Tomato and mozzarella,,Medium,,12.00\n"
+            + ",Cola,Drinks,,2.80,,,\n"
+        )
+        importer = self.import_menu(menu)
+        self.assertEqual(importer.counts["products"], 2)
+        self.assertEqual(Product.objects.count(), 2)
+        self.assertEqual(Product.objects.get(name="Cola").price, Decimal("2.80"))
+        pizza = Product.objects.get(name="Margherita")
+        self.assertEqual(
+            sorted(pizza.productvariant_set.values_list("size__name", "price")),
+            [
+                ("Large", Decimal("15.00")),
+                ("Medium", Decimal("12.00")),
+                ("Small", Decimal("9.50")),
+            ],
+        )
+
+        # an existing product named by id and by name in one batch
+        menu = "\n".join(
+            [
+                json.dumps({"id": str(pizza.pk), "name": "Margherita", "price": "1"}),
+                json.dumps({"name": "Margherita", "price": "2"}),
+            ]
+        )
+        self.import_menu(menu, "jsonl")
+        self.assertEqual(Product.objects.get(pk=pizza.pk).price, Decimal("2.00"))
+
+    def test_invalid_file(self):
+        """Test invalid records stop the import with their line"""
+        menu = CSV_MENU.replace("14.00", "cheap")
+        with self.assertRaisesMessage(CommandError, "line 3: invalid price 'cheap'"):
+            with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as file:
+                file.write(menu)
+            try:
+                call_command("import_menu", file.name, stdout=StringIO())
+            finally:
+                os.remove(file.name)
+
+    def test_category_slugs(self):
+        """Test new categories whose names have the same slug get unique slugs"""
+        Category.objects.create(name="Soft Drinks", slug="drinks")
+        menu = CSV_MENU + ",Fanta,drinks!,,2.50,,,\n,Kvas,Напитки,,3.00,,,\n"
+        self.import_menu(menu)
+        self.assertEqual(
+            dict(Category.objects.values_list("name", "slug")),
+            {
+                "Soft Drinks": "drinks",
+                "Drinks": "drinks-2",
+                "drinks!": "drinks-3",
+                "Напитки": "напитки",
+                "Pizza": "pizza",
+            },
+        )
+
+    def test_export_round_trip(self):
+        """Test an exported menu imports without changes"""
+        self.import_menu(CSV_MENU)
+        for format in ("csv", "jsonl"):
+            output = StringIO()
+            self.assertEqual(write_menu(output, format, export_records()), 2)
+            importer = self.import_menu(output.getvalue(), format)
+            self.assertEqual(importer.changes, [], format)
+        self.assertEqual(ProductVariant.objects.count(), 2)
+
+    def test_commands(self):
+        """Test the export and import commands"""
+        self.import_menu(CSV_MENU)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "menu.jsonl")
+            call_command("export_menu", path, stderr=StringIO())
+            with open(path) as file:
+                self.assertEqual(len(file.readlines()), 2)
+            Product.objects.filter(name="Cola").update(price=Decimal("3"))
+
+            output = StringIO()
+            call_command("import_menu", path, dry_run=True, stdout=output)
+            self.assertIn("~ product Cola: price", output.getvalue())
+            self.assertIn(
+                "Would change 0 categories, 0 sizes, 1 products", output.getvalue()
+            )
+            self.assertEqual(Product.objects.get(name="Cola").price, Decimal("3"))
@@ -0,0 +1,85 @@
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+
+class TestVariantUniqueMigration(TransactionTestCase):
+    """Test duplicate variants are merged before the unique constraint"""
+
+    before = [
+        ("store", "0006_product_sales"),
+        ("order", "0002_initial"),
+        ("users", "0001_initial"),
+    ]
+    after = [
+        ("store", "0007_productvariant_product_size_unique"),
+        ("order", "0002_initial"),
+        ("users", "0001_initial"),
+    ]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        # back to the latest migrations for the other tests
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def create_variants(self, complete, prices):
+        """Variants of one product and size with an order item of the first"""
+        apps = self.migrate(self.before)
+        Product = apps.get_model("store", "Product")
+        Size = apps.get_model("store", "Size")
+        ProductVariant = apps.get_model("store", "ProductVariant")
+        Order = apps.get_model("order", "Order")
+        OrderItem = apps.get_model("order", "OrderItem")
+        Customer = apps.get_model("users", "Customer")
+        pizza = Product.objects.create(name="Test Pizza")
+        large = Size.objects.create(name="Large")
+        variants = [
+            ProductVariant.objects.create(product=pizza, size=large, price=price)
+            for price in prices
+        ]
+        customer = Customer.objects.create(device="Test")
+        item = OrderItem.objects.create(
+            order=Order.objects.create(customer=customer, complete=complete),
+            product=pizza,
+            variation=variants[0],
+            quantity=1,
+        )
+        return variants, item
+
+    def assertMerged(self, variants, item):
+        apps = self.migrate(self.after)
+        ProductVariant = apps.get_model("store", "ProductVariant")
+        OrderItem = apps.get_model("order", "OrderItem")
+        self.assertEqual(
+            list(ProductVariant.objects.values_list("pk", flat=True)),
+            [variants[-1].pk],
+        )
+        if item:
+            self.assertEqual(
+                OrderItem.objects.get(pk=item.pk).variation_id, variants[-1].pk
+            )
+
+    def test_duplicates_removed(self):
+        """Test items of open orders move to the newest variant"""
+        self.assertMerged(*self.create_variants(complete=False, prices=[10, 12]))
+
+    def test_completed_order_same_price(self):
+        """Test items of completed orders move to a variant with their price"""
+        self.assertMerged(*self.create_variants(complete=True, prices=[12, 12]))
+
+    def test_completed_order_other_price(self):
+        """Test a variant sold at another price stops the migration"""
+        variants, item = self.create_variants(complete=True, prices=[10, 12])
+        with self.assertRaisesMessage(
+            RuntimeError, f"variants [{variants[0].pk}] duplicate variant"
+        ):
+            self.migrate(self.after)
+        # the rows are left for a fix by hand
+        item.order.orderitem_set.all().delete()
+        self.assertMerged(variants, item=None)
@@ -105,3 +105,23 @@ class TestStoreModels(TestCase):
 
         self.assertQuerysetEqual(list(product.get_product_variants), variants)
         self.assertEqual(len(variants), len(product.get_product_variants))
+
+    def test_product_with_variant_info_queryset(self):
+        """
+        Test with_variant_info annotates variant count and prefetches
+        variants, so the properties do not query per product
+        """
+        product = Product.objects.create(**self.product_data)
+        Product.objects.create(name="Test product without variants", price=5)
+        size = Size.objects.create(name="Small")
+        ProductVariant.objects.create(
+            title="Test Variant", product=product, size=size, price=10.2
+        )
+
+        # one query for products and one for variants with their sizes
+        with self.assertNumQueries(2):
+            products = {p.name: p for p in Product.objects.with_variant_info()}
+            self.assertTrue(products["Test product"].has_variants)
+            self.assertFalse(products["Test product without variants"].has_variants)
+            variants = products["Test product"].get_product_variants
+            self.assertEqual(variants[0].get_size, "Small")
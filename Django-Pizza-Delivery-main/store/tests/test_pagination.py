@@ -0,0 +1,71 @@
+from django.test import SimpleTestCase, TestCase, Client, override_settings
+from django.urls import reverse
+from store.models import Product, Category
+from store.pagination import KeysetPaginator, encode_cursor, decode_cursor
+
+
+class TestKeysetPaginator(SimpleTestCase):
+    """Test cursor based pagination of a sorted list"""
+
+    def setUp(self):
+        self.items = [(category, f"id-{n}") for category in (1, 2) for n in range(5)]
+        self.paginator = KeysetPaginator(self.items, 4, key=lambda item: item)
+
+    def test_cursor_round_trip(self):
+        """Test cursor decodes to the encoded key and direction"""
+        cursor = encode_cursor((2, "id-3"), "next")
+        self.assertEqual(decode_cursor(cursor), ((2, "id-3"), "next"))
+
+    def test_invalid_cursor_is_ignored(self):
+        """Test invalid cursors are not decoded and give the first page"""
+        self.assertIsNone(decode_cursor("not a cursor"))
+        self.assertIsNone(decode_cursor(encode_cursor((1, "a"), "sideways")))
+        page = self.paginator.get_page(encode_cursor(("x", 1, 2), "next"))
+        self.assertEqual(list(page), self.items[:4])
+
+    def test_walk_forward_and_back(self):
+        """Test following next and previous cursors through the list"""
+        first = self.paginator.get_page(None)
+        self.assertEqual(list(first), self.items[:4])
+        self.assertFalse(first.has_previous())
+        self.assertTrue(first.has_next())
+
+        second = self.paginator.get_page(first.next_cursor)
+        self.assertEqual(list(second), self.items[4:8])
+
+        last = self.paginator.get_page(second.next_cursor)
+        self.assertEqual(list(last), self.items[8:])
+        self.assertFalse(last.has_next())
+        self.assertIsNone(last.next_cursor)
+
+        back = self.paginator.get_page(last.previous_cursor)
+        self.assertEqual(list(back), self.items[4:8])
+        self.assertEqual(
+            list(self.paginator.get_page(back.previous_cursor)), self.items[:4]
+        )
+
+
+@override_settings(STORE_PAGINATION="cursor")
+class TestProductsCursorPagination(TestCase):
+    """Test products view in cursor pagination mode"""
+
+    @classmethod
+    def setUpTestData(cls):
+        pizza = Category.objects.create(name="Pizza")
+        for n in range(15):
+            Product.objects.create(name=f"Pizza {n}", price=10, product_category=pizza)
+
+    def test_products_view_cursor_pages(self):
+        """Test products are listed once across cursor pages"""
+        client = Client()
+        response = client.get(reverse("store:products"))
+        self.assertEqual(response.context["pagination"], "cursor")
+        first = response.context["products"]
+        self.assertEqual(len(first), 12)
+
+        response = client.get(reverse("store:products"), {"page": first.next_cursor})
+        second = response.context["products"]
+        self.assertEqual(len(second), 3)
+        self.assertFalse(second.has_next())
+        names = {p.name for p in first} | {p.name for p in second}
+        self.assertEqual(len(names), 15)
@@ -0,0 +1,55 @@
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.core.cache import cache
+from store.models import Product, ProductVariant, Size
+
+
+class TestProductCardCache(TestCase):
+    """Test cached product cards are versioned on Product.updated_at"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.size = Size.objects.create(name="Small")
+        cls.product = Product.objects.create(name="Test Pizza")
+        cls.variant = ProductVariant.objects.create(
+            title="Test Variant", product=cls.product, size=cls.size, price=10
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_variant_save_bumps_product_version(self):
+        """Test saving a variant updates updated_at of its product"""
+        updated_at = Product.objects.get(pk=self.product.pk).updated_at
+        self.variant.price = 11
+        self.variant.save()
+        self.product.refresh_from_db()
+        self.assertGreater(self.product.updated_at, updated_at)
+
+    def test_size_save_bumps_product_version(self):
+        """Test renaming a size updates updated_at of products using it"""
+        updated_at = Product.objects.get(pk=self.product.pk).updated_at
+        self.size.name = "Large"
+        self.size.save()
+        self.product.refresh_from_db()
+        self.assertGreater(self.product.updated_at, updated_at)
+
+    def test_card_not_stale_after_variant_change(self):
+        """Test product page shows the new price after a variant change"""
+        response = self.client.get(reverse("store:products"))
+        self.assertContains(response, "$10.0")
+
+        self.variant.price = 12
+        self.variant.save()
+        response = self.client.get(reverse("store:products"))
+        self.assertContains(response, "$12.0")
+        self.assertNotContains(response, "$10.0")
+
+    def test_card_is_cached(self):
+        """Test card is served from the cache while the product is unchanged"""
+        self.client.get(reverse("store:products"))
+        # change the price without bumping the product version
+        ProductVariant.objects.filter(pk=self.variant.pk).update(price=99)
+        response = self.client.get(reverse("store:products"))
+        self.assertContains(response, "$10.0")
@@ -0,0 +1,97 @@
+from unittest import mock
+from django.test import TestCase, Client
+from django.urls import reverse
+from store.models import Product
+from store.search import (
+    search_product_ids,
+    cached_search_product_ids,
+    normalize,
+    result_cache,
+)
+
+
+class TestProductSearch(TestCase):
+    """Test full-text product search"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.pepperoni = Product.objects.create(
+            name="Pepperoni", price=12, desc="Classic pizza with spicy salami"
+        )
+        cls.salami = Product.objects.create(
+            name="Salami Special", price=14, desc="Mozzarella and pepperoni"
+        )
+        cls.coke = Product.objects.create(name="Coca-Cola", price=2)
+
+    def test_search_matches_name_and_description(self):
+        """Test products are found by words in name and description"""
+        self.assertEqual(
+            set(search_product_ids("salami")), {self.pepperoni.pk, self.salami.pk}
+        )
+
+    def test_search_ranks_name_matches_first(self):
+        """Test name matches are ranked above description matches"""
+        self.assertEqual(
+            search_product_ids("pepperoni"), [self.pepperoni.pk, self.salami.pk]
+        )
+
+    def test_search_matches_word_prefixes(self):
+        """Test every searched word matches as a prefix"""
+        self.assertEqual(search_product_ids("coca"), [self.coke.pk])
+        self.assertEqual(search_product_ids("pizza pep"), [self.pepperoni.pk])
+        self.assertEqual(search_product_ids("pizza coke"), [])
+
+    def test_search_index_kept_in_sync(self):
+        """Test index follows product updates and deletes"""
+        self.coke.name = "Sprite"
+        self.coke.save()
+        self.assertEqual(search_product_ids("coca"), [])
+        self.assertEqual(search_product_ids("sprite"), [self.coke.pk])
+
+        self.coke.delete()
+        self.assertEqual(search_product_ids("sprite"), [])
+
+    def test_search_ignores_query_syntax(self):
+        """Test punctuation in the query is not parsed as search syntax"""
+        self.assertEqual(search_product_ids('"pepperoni" OR *'), [])
+        self.assertEqual(search_product_ids("!!!"), [])
+
+    def test_normalize(self):
+        """Test queries are casefolded without accents and punctuation"""
+        self.assertEqual(normalize("  Jalapeño-POPPER! "), "jalapeno popper")
+        self.assertEqual(normalize(None), "")
+
+    def test_cached_search(self):
+        """Test results are cached per normalized query and catalog version"""
+        result_cache.clear()
+        product_ids = cached_search_product_ids("pepperoni", "v1")
+        self.assertEqual(product_ids, (self.pepperoni.pk, self.salami.pk))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                cached_search_product_ids(" PEPPERONI! ", "v1"), product_ids
+            )
+        self.assertEqual(result_cache.info()["hits"], 1)
+        self.assertEqual(result_cache.info()["misses"], 1)
+
+        # a new catalog version searches again
+        self.pepperoni.delete()
+        self.assertEqual(
+            cached_search_product_ids("pepperoni", "v2"), (self.salami.pk,)
+        )
+        self.assertEqual(cached_search_product_ids("!!!", "v2"), ())
+
+    def test_cached_search_without_index(self):
+        """Test the fallback searches the normalized query the entry is cached by"""
+        result_cache.clear()
+        popper = Product.objects.create(name="Jalapeno Popper", price=6)
+        with mock.patch("store.search.has_search_index", return_value=False):
+            self.assertEqual(cached_search_product_ids("Jalapeño", "v1"), (popper.pk,))
+            self.assertEqual(cached_search_product_ids("jalapeno", "v1"), (popper.pk,))
+
+    def test_products_view_search(self):
+        """Test products view lists search results by relevance"""
+        url = reverse("store:products") + "?product=pepperoni"
+        response = Client().get(url)
+        products = list(response.context["products"])
+        self.assertEqual([p.id for p in products], [self.pepperoni.pk, self.salami.pk])
@@ -0,0 +1,196 @@
+import gzip
+import os
+import shutil
+import tempfile
+from django.test import SimpleTestCase, RequestFactory, override_settings
+from django.core.management import call_command
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.http import Http404
+from epizza import fileserver
+from epizza.storage import brotli
+
+STATIC_ROOT = tempfile.mkdtemp()
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(
+    STATIC_ROOT=STATIC_ROOT,
+    STATICFILES_STORAGE="epizza.storage.CompressedManifestStaticFilesStorage",
+)
+class TestStaticBuild(SimpleTestCase):
+    """Test hashed, precompressed static build and how it is served"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command("collectstatic", interactive=False, verbosity=0)
+        staticfiles_storage._setup()
+        cls.hashed = staticfiles_storage.stored_name("store/src/styles.css")
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(STATIC_ROOT, ignore_errors=True)
+        fileserver._hashed_names = None
+        super().tearDownClass()
+
+    def setUp(self):
+        fileserver._hashed_names = None
+        fileserver._stat_cache.clear()
+        self.factory = RequestFactory()
+
+    def get(self, path, encoding="", **headers):
+        request = self.factory.get(
+            "/static/" + path, HTTP_ACCEPT_ENCODING=encoding, **headers
+        )
+        return fileserver.serve_static(request, path)
+
+    def test_build_hashes_and_compresses(self):
+        """Test files get hashed names and gzip siblings of the same content"""
+        self.assertRegex(self.hashed, r"^store/src/styles\.[0-9a-f]{12}\.css$")
+        path = os.path.join(STATIC_ROOT, self.hashed)
+        with open(path, "rb") as file, gzip.open(path + ".gz") as compressed:
+            self.assertEqual(compressed.read(), file.read())
+        self.assertEqual(os.path.isfile(path + ".br"), brotli is not None)
+        # images are not compressed again
+        image = staticfiles_storage.stored_name("store/images/cart1.png")
+        self.assertFalse(os.path.isfile(os.path.join(STATIC_ROOT, image + ".gz")))
+
+    def test_serve_precompressed(self):
+        """Test compressed copy is chosen by Accept-Encoding"""
+        response = self.get(self.hashed, "gzip, deflate")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Content-Type"], "text/css")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        response.close()
+
+        response = self.get(self.hashed, "gzip;q=0")
+        self.assertFalse(response.has_header("Content-Encoding"))
+        response.close()
+
+    def test_cache_headers(self):
+        """Test hashed names are immutable, the others are revalidated"""
+        response = self.get(self.hashed)
+        self.assertEqual(response["Cache-Control"], fileserver.IMMUTABLE)
+        response.close()
+
+        response = self.get("store/src/styles.css")
+        self.assertEqual(response["Cache-Control"], fileserver.REVALIDATE)
+        response.close()
+
+    def test_missing_and_outside_files(self):
+        """Test unknown files and paths outside STATIC_ROOT are not found"""
+        with self.assertRaises(Http404):
+            self.get("store/missing.css")
+        with self.assertRaises(Http404):
+            fileserver.find_file(STATIC_ROOT, "../etc/passwd", self.factory.get("/"))
+
+    def test_conditional_get(self):
+        """Test ETag and Last-Modified give 304 Not Modified"""
+        response = self.get(self.hashed)
+        response.close()
+        etag = response["ETag"]
+        self.assertTrue(response.has_header("Last-Modified"))
+
+        response = self.get(self.hashed, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["Cache-Control"], fileserver.IMMUTABLE)
+
+        modified = response["Last-Modified"]
+        response = self.get(self.hashed, HTTP_IF_MODIFIED_SINCE=modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_byte_ranges(self):
+        """Test single byte ranges give 206 with the requested bytes"""
+        with open(os.path.join(STATIC_ROOT, self.hashed), "rb") as file:
+            content = file.read()
+        size = len(content)
+
+        response = self.get(self.hashed, HTTP_RANGE="bytes=10-19")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 10-19/{size}")
+        self.assertEqual(response["Content-Length"], "10")
+        self.assertEqual(b"".join(response.streaming_content), content[10:20])
+        response.close()
+
+        response = self.get(self.hashed, HTTP_RANGE="bytes=-5")
+        self.assertEqual(b"".join(response.streaming_content), content[-5:])
+        response.close()
+
+        response = self.get(self.hashed, HTTP_RANGE=f"bytes={size}-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], f"bytes */{size}")
+
+        # a range of an older version of the file gives the whole file
+        response = self.get(self.hashed, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"old"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        response.close()
+
+    def test_stat_cached(self):
+        """Test stat results are reused"""
+        path = os.path.join(STATIC_ROOT, self.hashed)
+        info = fileserver.stat_file(path)
+        self.assertEqual(info.size, os.path.getsize(path))
+        self.assertIs(fileserver.stat_file(path), info)
+        self.assertIsNone(fileserver.stat_file(STATIC_ROOT))
+
+    @override_settings(FILESERVER_OFFLOAD="x-accel-redirect")
+    def test_offload_x_accel_redirect(self):
+        """Test nginx is told to send the file from its internal location"""
+        response = self.get(self.hashed, "gzip")
+        self.assertEqual(
+            response["X-Accel-Redirect"], f"/internal/static/{self.hashed}.gz"
+        )
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response.content, b"")
+
+    @override_settings(FILESERVER_OFFLOAD="x-sendfile")
+    def test_offload_x_sendfile(self):
+        """Test the web server is told the path of the file"""
+        response = self.get(self.hashed)
+        self.assertEqual(response["X-Sendfile"], os.path.join(STATIC_ROOT, self.hashed))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class TestMediaFiles(SimpleTestCase):
+    """Test uploaded files are served through the file server"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        os.makedirs(os.path.join(MEDIA_ROOT, "images"), exist_ok=True)
+        with open(os.path.join(MEDIA_ROOT, "images", "pizza.jpg"), "wb") as file:
+            file.write(b"x" * 1000)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_media_url(self):
+        """Test media files are served with validators and no compression"""
+        response = self.client.get("/media/images/pizza.jpg", HTTP_RANGE="bytes=0-99")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Type"], "image/jpeg")
+        self.assertEqual(response["Cache-Control"], fileserver.REVALIDATE)
+        self.assertTrue(response.has_header("ETag"))
+        self.assertFalse(response.has_header("Vary"))
+        self.assertEqual(b"".join(response.streaming_content), b"x" * 100)
+
+    def test_media_missing(self):
+        """Test missing files are 404"""
+        response = self.client.get("/media/images/missing.jpg")
+        self.assertEqual(response.status_code, 404)
+
+    def test_media_removed(self):
+        """Test a file removed while its stat result is cached is 404"""
+        path = os.path.join(MEDIA_ROOT, "images", "removed.jpg")
+        with open(path, "wb") as file:
+            file.write(b"x")
+        response = self.client.get("/media/images/removed.jpg")
+        self.assertEqual(response.status_code, 200)
+        response.close()
+        os.remove(path)
+        response = self.client.get("/media/images/removed.jpg")
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn(path, fileserver._stat_cache)
@@ -0,0 +1,111 @@
+import os
+from unittest import mock
+import django
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from store.catalog import invalidate_catalog
+from store.models import Category, Product
+from store.streaming import DJANGO_VERSION, FLUSH_EVERY, stream_template
+
+LOCMEM_TEMPLATES = {
+    "BACKEND": "django.template.backends.django.DjangoTemplates",
+    "OPTIONS": {
+        "loaders": [
+            (
+                "django.template.loaders.locmem.Loader",
+                {
+                    "base": "<{% block a %}base{% endblock %}>",
+                    "middle": '{% extends "base" %}{% block a %}middle{% endblock %}',
+                    "child": '{% extends "middle" %}'
+                    "{% block a %}{{ block.super }}-child{% endblock %}",
+                    "loop": "{% for x in items reversed %}{{ forloop.counter }}{{ x }}"
+                    "{% for y in x %}{{ forloop.parentloop.first }}{% endfor %}"
+                    "{% empty %}none{% endfor %}",
+                },
+            )
+        ]
+    },
+}
+
+
+class TestStreamingRender(TestCase):
+    """Test streamed rendering of the products page"""
+
+    def setUp(self):
+        category = Category.objects.create(name="Pizza", slug="pizza")
+        for i in range(3):
+            Product.objects.create(
+                name=f"Test Pizza {i}", price=10, product_category=category
+            )
+        invalidate_catalog()
+
+    def test_same_page_as_render(self):
+        """Test the streamed page is the page render() makes"""
+        url = reverse("store:products")
+        rendered = self.client.get(url).content.decode()
+        with override_settings(STORE_STREAMING_RENDER=True):
+            response = self.client.get(url)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/html; charset=utf-8")
+        streamed = b"".join(response.streaming_content).decode()
+        # the CSRF tokens are masked differently on every request
+        strip = lambda page: [
+            line for line in page.splitlines() if "csrfmiddlewaretoken" not in line
+        ]
+        self.assertEqual(strip(streamed), strip(rendered))
+        self.assertIn("csrftoken", response.cookies)
+
+    def test_django_version(self):
+        """
+        Test the walk follows the installed Django, a new version needs its
+        template code checked before DJANGO_VERSION is updated
+        """
+        self.assertEqual(django.VERSION[:2], DJANGO_VERSION)
+        path = os.path.join(settings.BASE_DIR, "requirements.txt")
+        with open(path) as file:
+            pin = next(line for line in file if line.startswith("Django=="))
+        self.assertEqual(
+            tuple(int(part) for part in pin[8:].split(".")[:2]), DJANGO_VERSION
+        )
+
+    @override_settings(STORE_STREAMING_RENDER=True)
+    def test_other_django_version(self):
+        """Test pages are rendered at once on Django versions not checked"""
+        with mock.patch("store.streaming.DJANGO_VERSION", (1, 0)):
+            response = self.client.get(reverse("store:products"))
+        self.assertFalse(response.streaming)
+        self.assertContains(response, "Test Pizza 0")
+
+    def test_head_flushed_before_content(self):
+        """Test the head and navigation are a chunk of their own"""
+        chunks = list(stream_template("store/products.html", {"products": []}, None))
+        self.assertGreater(len(chunks), 1)
+        self.assertIn("</head>", chunks[0])
+        self.assertNotIn("Test Pizza", chunks[0])
+
+    @override_settings(TEMPLATES=[LOCMEM_TEMPLATES])
+    def test_block_super(self):
+        """Test blocks overridden twice and block.super render like render()"""
+        self.assertEqual("".join(stream_template("child")), "<middle-child>")
+
+    @override_settings(TEMPLATES=[LOCMEM_TEMPLATES])
+    def test_for_loop(self):
+        """Test loops render like render(), flushed every FLUSH_EVERY iterations"""
+        items = ["ab"] * (FLUSH_EVERY + 1)
+        chunks = list(stream_template("loop", {"items": items}))
+        self.assertEqual(len(chunks), 2)
+        expected = "".join(f"{i}ab{i == 1}{i == 1}" for i in range(1, FLUSH_EVERY + 2))
+        self.assertEqual("".join(chunks), expected)
+        self.assertEqual("".join(stream_template("loop", {"items": []})), "none")
+
+    def test_product_cards_streamed(self):
+        """Test the product cards of the page are spread over several chunks"""
+        for i in range(3, FLUSH_EVERY * 2):
+            Product.objects.create(name=f"Test Pizza {i}", price=10)
+        invalidate_catalog()
+        with override_settings(STORE_STREAMING_RENDER=True):
+            response = self.client.get(reverse("store:products"))
+        chunks = [chunk.decode() for chunk in response.streaming_content]
+        with_cards = [chunk for chunk in chunks if "Test Pizza" in chunk]
+        self.assertGreater(len(with_cards), 1)
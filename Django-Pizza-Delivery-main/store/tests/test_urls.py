@@ -1,6 +1,6 @@
 from django.test import SimpleTestCase
 from django.urls import reverse, resolve
-from store.views import products, pizzas, drinks, sides
+from store.views import products, pizzas, drinks, sides, category
 
 
 class TestStoreUrls(SimpleTestCase):
@@ -25,3 +25,8 @@ class TestStoreUrls(SimpleTestCase):
         """Test sides url is resolved"""
         url = reverse("store:sides")
         self.assertEqual(resolve(url).func, sides)
+
+    def test_category_url_is_resolved(self):
+        """Test category url is resolved"""
+        url = reverse("store:category", args=["pizza"])
+        self.assertEqual(resolve(url).func, category)
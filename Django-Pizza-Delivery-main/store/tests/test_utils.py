@@ -0,0 +1,37 @@
+from django.test import SimpleTestCase
+from store.utils import LRUCache
+
+
+class TestLRUCache(SimpleTestCase):
+    """Test bounded least recently used cache"""
+
+    def test_get_and_set(self):
+        """Test stored values are returned and hits/misses are counted"""
+        cache = LRUCache(2)
+        self.assertIsNone(cache.get("a"))
+        cache.set("a", 1)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("b", 0), 0)
+        self.assertEqual(
+            cache.info(), {"hits": 1, "misses": 2, "maxsize": 2, "currsize": 1}
+        )
+
+    def test_least_recently_used_dropped(self):
+        """Test the entry used longest ago is dropped first"""
+        cache = LRUCache(2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertEqual(len(cache), 2)
+
+    def test_clear(self):
+        """Test clear removes entries and resets counters"""
+        cache = LRUCache(2)
+        cache.set("a", 1)
+        cache.get("a")
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.hits, 0)
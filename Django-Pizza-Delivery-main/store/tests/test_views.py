@@ -1,6 +1,6 @@
 from django.test import TestCase, Client
 from django.urls import reverse
-from store.models import Product
+from store.models import Product, Category
 from django.core.files.uploadedfile import SimpleUploadedFile
 
 
@@ -29,19 +29,69 @@ class TestStoreViews(TestCase):
         """Test GET response in pizzas view"""
         response = self.client.get(reverse("store:pizzas"))
         self.assertEqual(response.status_code, 200)
-        self.assertTemplateUsed(response, "store/pizzas.html")
+        self.assertTemplateUsed(response, "store/category.html")
         self.assertIn("products", response.context)
 
     def test_drinks_view_GET(self):
         """Test GET response in drinks view"""
         response = self.client.get(reverse("store:drinks"))
         self.assertEqual(response.status_code, 200)
-        self.assertTemplateUsed(response, "store/drinks.html")
+        self.assertTemplateUsed(response, "store/category.html")
         self.assertIn("products", response.context)
 
     def test_sides_view_GET(self):
         """Test GET response in sides view"""
         response = self.client.get(reverse("store:sides"))
         self.assertEqual(response.status_code, 200)
-        self.assertTemplateUsed(response, "store/sides.html")
+        self.assertTemplateUsed(response, "store/category.html")
         self.assertIn("products", response.context)
+
+    def test_category_view_GET(self):
+        """Test GET response in category view"""
+        pizza = Category.objects.create(name="Pizza")
+        product = Product.objects.create(name="Test Pizza", product_category=pizza)
+        Product.objects.create(name="Test Drink", price=2)
+
+        response = self.client.get(reverse("store:category", args=["pizza"]))
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, "store/category.html")
+        self.assertEqual(response.context["category"].name, "Pizza")
+        self.assertEqual([p.id for p in response.context["products"]], [product.pk])
+
+    def test_category_alias_view_GET(self):
+        """Test old category urls list products of the category"""
+        pizza = Category.objects.create(name="Pizza")
+        product = Product.objects.create(name="Test Pizza", product_category=pizza)
+
+        response = self.client.get(reverse("store:pizzas"))
+        self.assertEqual([p.id for p in response.context["products"]], [product.pk])
+
+    def test_category_view_GET_unknown_slug(self):
+        """Test GET response in category view for unexisting category"""
+        response = self.client.get(reverse("store:category", args=["unknown"]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_new_category_in_menu(self):
+        """Test a new category is listed in the menu without code changes"""
+        Category.objects.create(name="Desserts")
+        response = self.client.get(reverse("store:products"))
+        self.assertContains(response, reverse("store:category", args=["desserts"]))
+
+    def test_non_ascii_category(self):
+        """Test categories with non-ASCII names get slugs the menu links to"""
+        drinks = Category.objects.create(name="Напитки")
+        # slugify() keeps no letter of this name
+        Category.objects.create(name="???")
+        Category.objects.create(name="!!!")
+        self.assertEqual(drinks.slug, "напитки")
+        self.assertEqual(
+            list(Category.objects.order_by("pk").values_list("slug", flat=True)),
+            ["напитки", "category", "category-2"],
+        )
+
+        response = self.client.get(reverse("store:products"))
+        self.assertEqual(response.status_code, 200)
+        url = reverse("store:category", args=["напитки"])
+        self.assertContains(response, url)
+        response = self.client.get(url)
+        self.assertEqual(response.context["category"].name, "Напитки")
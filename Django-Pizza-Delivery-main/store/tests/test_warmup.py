@@ -0,0 +1,81 @@
+import asyncio
+from unittest import mock
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from epizza import warmup
+from store.catalog import invalidate_catalog
+from store.models import Product
+
+
+class TestWarmUp(TestCase):
+    """Test worker warm-up and the readiness endpoint"""
+
+    def setUp(self):
+        Product.objects.create(name="Test Pizza", price=10)
+        invalidate_catalog()
+        warmup.status.update(ready=False, seconds=None, steps={})
+
+    def test_warm_up(self):
+        """Test every step runs and its duration is reported"""
+        status = warmup.warm_up()
+        self.assertTrue(status["ready"])
+        self.assertEqual(set(status["steps"]), {"database", "catalog", "templates"})
+        self.assertGreaterEqual(status["seconds"], 0)
+
+        # the catalog is built, a request does not rebuild it
+        with mock.patch("store.catalog.build_catalog") as build_catalog:
+            self.client.get(reverse("store:products"))
+        build_catalog.assert_not_called()
+
+    def test_failed_warm_up(self):
+        """Test a failing step is logged and leaves the worker not ready"""
+        with mock.patch.object(
+            warmup, "HOT_TEMPLATES", ["store/missing.html"]
+        ), self.assertLogs("epizza.warmup", "ERROR"):
+            status = warmup.warm_up()
+        self.assertFalse(status["ready"])
+        self.assertIn("catalog", status["steps"])
+
+    def test_readiness(self):
+        """Test the endpoint is 503 until a warm-up succeeds"""
+        url = reverse("readiness")
+        with mock.patch.object(warmup, "HOT_TEMPLATES", ["store/missing.html"]):
+            with self.assertLogs("epizza.warmup", "ERROR"):
+                response = self.client.get(url)
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(response.json()["ready"])
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["ready"])
+
+    @override_settings(WARM_UP_ON_START=False)
+    def test_warm_up_on_start_setting(self):
+        """Test the warm-up on start can be turned off"""
+        warmup.warm_up_on_start()
+        self.assertFalse(warmup.status["ready"])
+
+
+class TestWarmUpOnStart(TransactionTestCase):
+    """Test the warm-up run when the WSGI or ASGI application is loaded"""
+
+    def setUp(self):
+        Product.objects.create(name="Test Pizza", price=10)
+        invalidate_catalog()
+        warmup.status.update(ready=False, seconds=None, steps={})
+
+    def test_running_event_loop(self):
+        """Test the warm-up works while an event loop runs, as under uvicorn"""
+
+        async def load_application():
+            warmup.warm_up_on_start()
+
+        asyncio.run(load_application())
+        self.assertTrue(warmup.status["ready"])
+
+    def test_connections_closed(self):
+        """Test the connections of the warm-up are closed once it is done"""
+        with mock.patch.object(warmup.connections, "close_all") as close_all:
+            warmup.warm_up_on_start()
+        self.assertTrue(warmup.status["ready"])
+        close_all.assert_called_once()
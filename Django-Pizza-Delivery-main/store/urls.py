@@ -7,4 +7,7 @@ urlpatterns = [
     path("pizza/", views.pizzas, name="pizzas"),
     path("drinks/", views.drinks, name="drinks"),
     path("sides/", views.sides, name="sides"),
+    path("category/<str:slug>/", views.category, name="category"),
+    path("api/menu/", views.menu_api, name="menu_api"),
+    path("api/autocomplete/", views.autocomplete, name="autocomplete"),
 ]
@@ -1,41 +1,167 @@
 from django.shortcuts import render
-from .models import Product
+from django.http import Http404, HttpResponse, JsonResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_safe
+from django.utils.http import quote_etag
 from django.core.paginator import Paginator
+from django.conf import settings
+from .catalog import get_catalog, get_catalog_version
+from .search import cached_search_product_ids
+from .pagination import KeysetPaginator
+from .autocomplete import DEFAULT_LIMIT, MAX_LIMIT
+from .decorators import cache_for_guests
+from .facets import FACETS
+from .streaming import render_page
 
+# number of products in the best sellers strip of the products page
+BEST_SELLERS = 6
 
+
+@cache_for_guests(params=("product", "sort", "page", *FACETS))
 def products(request):
-    products = Product.objects.all()
+    # products are read from the catalog snapshot, not from the database
+    catalog = get_catalog()
+    products = catalog.products
     # get the keywords from the search field to alter products list
     product_name = request.GET.get("product")
     if product_name != "" and product_name is not None:
-        products = products.filter(name__icontains=product_name)
+        # search index returns ids ordered by relevance
+        product_ids = cached_search_product_ids(product_name, catalog.version)
+        products = [catalog.by_id[pk] for pk in product_ids if pk in catalog.by_id]
     else:
         # if no item is searched input value is empty
         product_name = ""
 
-    # pagination
-    paginator = Paginator(products, 12)
-    page_number = request.GET.get("page")
-    products = paginator.get_page(page_number)
+    # facet filters (?category=pizza&size=Large&price=10-20) and their
+    # counts come from bitsets of the snapshot, they need no queries
+    selected = {facet: request.GET.getlist(facet) for facet in FACETS}
+    filtered = any(selected.values())
+    index = catalog.facets
+    bits, facets = index.apply(
+        selected, base=index.bits_of(products) if product_name else None
+    )
+    if filtered:
+        products = index.filter(products, bits)
+
+    # ?sort=popular lists best sellers first, the ranking is materialized
+    # by the refresh_popularity command and kept in the snapshot
+    sort = request.GET.get("sort")
+    if sort == "popular":
+        if product_name or filtered:
+            rank = {product.id: i for i, product in enumerate(catalog.popular)}
+            products = sorted(products, key=lambda p: rank.get(p.id, len(rank)))
+        else:
+            products = catalog.products_by_popularity
+    else:
+        sort = ""
 
+    # pagination, search results and popular products are not in catalog
+    # order, so they always use page numbers (filtered products still are)
+    page = request.GET.get("page")
+    if settings.STORE_PAGINATION == "cursor" and not product_name and not sort:
+        paginator = KeysetPaginator(products, 12, key=lambda p: p.sort_key)
+        pagination = "cursor"
+    else:
+        paginator = Paginator(products, 12)
+        pagination = "page"
+    products = paginator.get_page(page)
+
+    # keep search and filters in the pagination links
+    query = request.GET.copy()
+    query.pop("page", None)
+    # and in the sort links, keep search and sorting in the clear filters link
+    sort_query, unfiltered_query = query.copy(), query.copy()
+    sort_query.pop("sort", None)
+    for facet in FACETS:
+        unfiltered_query.pop(facet, None)
+
+    # best sellers strip on the first page of the whole menu
+    show_best_sellers = not product_name and not filtered and not page
     # search_string is used to display input value as searched product
-    context = {"products": products, "search_string": product_name}
-    return render(request, "store/products.html", context=context)
+    context = {
+        "products": products,
+        "search_string": product_name,
+        "sort": sort,
+        "best_sellers": catalog.popular[:BEST_SELLERS] if show_best_sellers else (),
+        "facets": facets,
+        "filtered": filtered,
+        "pagination": pagination,
+        "querystring": query.urlencode(),
+        "sort_querystring": sort_query.urlencode(),
+        "unfiltered_querystring": unfiltered_query.urlencode(),
+    }
+    return render_page(request, "store/products.html", context)
+
+
+@cache_for_guests()
+def category(request, slug):
+    """Products of one category, the slug is resolved from the catalog snapshot"""
+    catalog = get_catalog()
+    category = catalog.get_category(slug)
+    if category is None:
+        raise Http404("Category does not exist")
+    products = catalog.products_in_category(category.id)
+    context = {"products": products, "category": category, "title": category.name}
+    return render(request, "store/category.html", context=context)
+
+
+def category_alias(slug, title):
+    """
+    View for the old category urls (/pizza/, /drinks/, /sides/),
+    they render an empty page when the category does not exist
+    """
+
+    def view(request):
+        catalog = get_catalog()
+        category = catalog.get_category(slug)
+        products = catalog.products_in_category(category.id) if category else []
+        context = {"products": products, "category": category, "title": title}
+        return render(request, "store/category.html", context=context)
+
+    view.__name__ = title.lower()
+    return cache_for_guests()(view)
+
+
+pizzas = category_alias("pizza", "Pizzas")
+drinks = category_alias("drink", "Drinks")
+sides = category_alias("side", "Sides")
 
 
-def pizzas(request):
-    products = Product.objects.filter(product_category__name="Pizza")
-    context = {"products": products}
-    return render(request, "store/pizzas.html", context=context)
+def menu_etag(request):
+    # the catalog version changes whenever the menu does
+    return get_catalog_version()
 
 
-def drinks(request):
-    products = Product.objects.filter(product_category__name="Drink")
-    context = {"products": products}
-    return render(request, "store/drinks.html", context=context)
+@cache_control(public=True, no_cache=True)
+@require_safe
+@condition(etag_func=menu_etag)
+def menu_api(request):
+    """
+    Read-only JSON menu for the mobile app and kiosks. Clients send back
+    the ETag in If-None-Match and get 304 Not Modified until the catalog
+    changes, which costs only a cache lookup.
+    """
+    catalog = get_catalog()
+    response = HttpResponse(catalog.menu_json, content_type="application/json")
+    # tag the body with the version it was built from
+    response.headers["ETag"] = quote_etag(catalog.version)
+    return response
 
 
-def sides(request):
-    products = Product.objects.filter(product_category__name="Side")
-    context = {"products": products}
-    return render(request, "store/sides.html", context=context)
+@require_safe
+def autocomplete(request):
+    """
+    Search suggestions for the products search box, looked up in the
+    prefix index of the catalog snapshot
+    """
+    query = request.GET.get("q", "")
+    try:
+        limit = min(int(request.GET.get("limit", DEFAULT_LIMIT)), MAX_LIMIT)
+    except ValueError:
+        limit = DEFAULT_LIMIT
+    matches = get_catalog().autocomplete.search(query, limit)
+    results = [
+        {"id": product.id, "name": product.name, "category": product.category_name}
+        for product in matches
+    ]
+    return JsonResponse({"query": query, "results": results})
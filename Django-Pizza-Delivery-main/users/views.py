@@ -7,7 +7,8 @@ from django.views.generic.edit import CreateView
 from django.contrib.auth import logout
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import redirect
-from order.models import Order
+from django.db.models import Prefetch
+from order.models import Order, OrderItem
 
 
 class SignUpView(CreateView):
@@ -38,7 +39,12 @@ def my_orders(request):
     """Display orders for authenticated user"""
     customer = request.user.customer
     # orders query set - list of orders
-    orders = Order.objects.filter(customer=customer, complete=True).order_by(
-        "-date_modified"
+    items = OrderItem.objects.with_product_info()
+    orders = (
+        Order.objects.filter(customer=customer, complete=True)
+        .with_totals()
+        .select_related("coupon")
+        .prefetch_related(Prefetch("orderitem_set", queryset=items))
+        .order_by("-date_modified")
     )
     return render(request, "users/orders.html", context={"orders": orders})